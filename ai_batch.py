@@ -0,0 +1,84 @@
+"""
+ProjektCoPilot — Batch AI Generation
+====================================
+FS/TS üretimi öğe başına bir HTTP çağrısıydı; bir WRICEF backlog'u için
+yüzlerce ardışık tıklama gerekiyordu. run_batch() bir öğe listesini tek
+bir AI job'u içinde işler:
+
+- Üretim sınırlı eşzamanlılıkla (`concurrency` thread) çalışır.
+- Sonuçlar `flush_size`'lık gruplar halinde flush() ile toplu yazılır
+  (grup başına tek transaction).
+- Her biten öğe progress() ile raporlanır; snapshot o ana kadar biten tüm
+  öğelerin durumunu taşır (SSE istemcileri ara olayları kaçırsa da eksiksiz):
+    {"total", "completed", "failed", "cached", "items": [{"id", "status", ...}]}
+
+  POST /api/ai/generate-fs/batch   {"ids": [...]} veya {"project_id": ..., "only_missing": true}
+  POST /api/ai/generate-ts/batch
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def run_batch(tasks, generate, flush, concurrency=4, flush_size=25, progress=None, ready=()):
+    """tasks: [(item_id, params)] üretilecekler; ready: [(item_id, result)] zaten hazır (cache).
+    generate(params) → result dict, worker thread'lerinde çalışır.
+    flush([(item_id, result)]) çağıranın thread'inde çalışır ve grubu kalıcı yazar.
+    Öğe başına durum listesi ile özet döner."""
+    state = {'total': len(tasks) + len(ready), 'completed': 0, 'failed': 0, 'cached': 0}
+    statuses = {}
+    pending = []
+
+    def report():
+        if progress is not None:
+            progress(dict(state, items=list(statuses.values())))
+
+    def write(batch):
+        try:
+            flush(batch)
+        except Exception as e:
+            for item_id, _ in batch:
+                _fail(state, statuses, item_id, f"save failed: {e}")
+            report()
+            return
+        for item_id, result in batch:
+            state['completed'] += 1
+            state['cached'] += 1 if result.get('cached') else 0
+            statuses[item_id] = {'id': item_id, 'status': 'done', 'cached': bool(result.get('cached')),
+                                 'tokens_used': result.get('tokens_used')}
+        report()
+
+    def timed(params):
+        started = time.perf_counter()
+        result = generate(params)
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000)
+        return result
+
+    for item_id, result in ready:
+        pending.append((item_id, result))
+        if len(pending) >= flush_size:
+            write(pending)
+            pending = []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='ai-batch') as executor:
+        futures = {executor.submit(timed, params): item_id for item_id, params in tasks}
+        for future in as_completed(futures):
+            item_id = futures[future]
+            try:
+                pending.append((item_id, future.result()))
+            except Exception as e:
+                _fail(state, statuses, item_id, str(e))
+                report()
+                continue
+            if len(pending) >= flush_size:
+                write(pending)
+                pending = []
+    if pending:
+        write(pending)
+
+    return dict(state, items=[statuses[item_id] for item_id in sorted(statuses)])
+
+
+def _fail(state, statuses, item_id, error):
+    state['failed'] += 1
+    statuses[item_id] = {'id': item_id, 'status': 'failed', 'error': error}
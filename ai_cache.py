@@ -0,0 +1,167 @@
+"""
+ProjektCoPilot — AI Response Cache
+==================================
+Aynı requirement_code/title/module için FS/TS her "Generate" tıklamasında
+sıfırdan üretiliyordu. Sonuçlar burada içerik adresli olarak saklanır:
+
+  ai_response_cache(cache_key, kind, model, content, tokens, size_bytes,
+                    created_at, last_used_at, hits)
+
+- cache_key = sha256(endpoint, prompt girdileri, model) — aynı girdi + aynı
+  model her zaman aynı anahtarı verir; model değişince eski sonuçlar
+  kullanılmaz.
+- TTL: created_at'ten `ttl` saniye sonra kayıt geçersizdir.
+- LRU + boyut sınırı: put() sonrası kayıt sayısı `max_entries`'i veya
+  toplam içerik `max_bytes`'ı aşarsa en uzun süredir kullanılmayanlar silinir.
+- enabled=False (AI_CACHE_ENABLED=0, testler) iken get() hep ıska döner,
+  put() hiçbir şey yazmaz.
+
+Her üretim (cache hit dahil) ai_interaction_log'a yazılır; cached = 1
+satırları isabetlerdir. report() proje başına hit oranı ve tasarruf edilen
+token sayısını bu log'dan hesaplar.
+
+  GET /api/system/ai-cache[?project_id=]
+"""
+
+import hashlib
+import json
+import time
+
+CACHE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS ai_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        model TEXT,
+        content TEXT NOT NULL,
+        tokens INTEGER,
+        size_bytes INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+CACHE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_ai_response_cache_lru ON ai_response_cache(last_used_at)'
+
+REPORT_SQL = '''
+    SELECT project_id,
+           COUNT(*) AS requests,
+           SUM(CASE WHEN cached = 1 THEN 1 ELSE 0 END) AS hits,
+           SUM(CASE WHEN cached = 1 THEN COALESCE(tokens_in, 0) + COALESCE(tokens_out, 0) ELSE 0 END) AS tokens_saved
+    FROM ai_interaction_log
+    WHERE interaction_type IN ({kinds}) {where}
+    GROUP BY project_id
+    ORDER BY project_id
+'''
+
+
+def install(conn):
+    conn.execute(CACHE_TABLE_SQL)
+    conn.execute(CACHE_INDEX_SQL)
+
+
+def cache_key(endpoint, params, model):
+    """Girdilerin sıralı JSON'unun sha256'sı."""
+    payload = json.dumps({'endpoint': endpoint, 'params': params, 'model': model},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AIResponseCache:
+    """Tablo üzerinde TTL + LRU politikası; tüm metotlar çağıranın bağlantısını kullanır."""
+
+    def __init__(self, ttl=7 * 24 * 3600, max_entries=1000, max_bytes=50 * 1024 * 1024,
+                 kinds=('generate-fs', 'generate-ts'), enabled=True):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.kinds = kinds
+
+    def get(self, conn, key, now=None):
+        """Geçerli kayıt varsa {"content", "tokens", "model"} döner ve LRU zamanını günceller."""
+        return self.lookup(conn, key, now)[0]
+
+    def lookup(self, conn, key, now=None):
+        """(get() sonucu, yazdı mı); ıskada yazma olmaz, çağıran yalnızca yazdıysa commit eder."""
+        if not self.enabled:
+            return None, False
+        now = time.time() if now is None else now
+        row = conn.execute(
+            "SELECT content, tokens, model, created_at FROM ai_response_cache WHERE cache_key = ?",
+            (key,)).fetchone()
+        if row is None:
+            return None, False
+        content, tokens, model, created_at = row[0], row[1], row[2], row[3]
+        if created_at < now - self.ttl:
+            conn.execute("DELETE FROM ai_response_cache WHERE cache_key = ?", (key,))
+            return None, True
+        conn.execute("UPDATE ai_response_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                     (now, key))
+        return {'content': content, 'tokens': tokens, 'model': model}, True
+
+    def put(self, conn, key, kind, model, content, tokens, now=None):
+        if not self.enabled:
+            return 0
+        now = time.time() if now is None else now
+        conn.execute('''
+            INSERT INTO ai_response_cache
+                (cache_key, kind, model, content, tokens, size_bytes, created_at, last_used_at, hits)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT (cache_key) DO UPDATE SET
+                content = excluded.content, tokens = excluded.tokens, size_bytes = excluded.size_bytes,
+                created_at = excluded.created_at, last_used_at = excluded.last_used_at
+        ''', (key, kind, model, content, tokens, len(content.encode('utf-8')), now, now))
+        return self.evict(conn, now)
+
+    def evict(self, conn, now=None):
+        """Süresi dolanları, sonra sınırlar aşılıyorsa en eski kullanılanları siler; silinen sayısını döner."""
+        now = time.time() if now is None else now
+        removed = conn.execute("DELETE FROM ai_response_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        count, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ai_response_cache").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return removed
+        victims = []
+        for key, size_bytes in conn.execute(
+                "SELECT cache_key, size_bytes FROM ai_response_cache ORDER BY last_used_at ASC").fetchall():
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            size -= size_bytes
+        conn.executemany("DELETE FROM ai_response_cache WHERE cache_key = ?", victims)
+        return removed + len(victims)
+
+    def report(self, conn, project_id=None):
+        """Cache doluluğu + proje başına istek, isabet, hit oranı ve tasarruf edilen token."""
+        count, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ai_response_cache").fetchone()
+        where, params = '', list(self.kinds)
+        if project_id is not None:
+            where = 'AND project_id = ?'
+            params.append(project_id)
+        sql = REPORT_SQL.format(kinds=', '.join('?' * len(self.kinds)), where=where)
+        projects = []
+        for pid, requests, hits, tokens_saved in conn.execute(sql, params).fetchall():
+            projects.append({
+                'project_id': pid,
+                'requests': requests,
+                'hits': hits,
+                'hit_rate': round(hits / requests, 3) if requests else 0.0,
+                'tokens_saved': tokens_saved,
+            })
+        requests = sum(p['requests'] for p in projects)
+        hits = sum(p['hits'] for p in projects)
+        return {
+            'entries': count,
+            'size_bytes': size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'requests': requests,
+            'hits': hits,
+            'hit_rate': round(hits / requests, 3) if requests else 0.0,
+            'tokens_saved': sum(p['tokens_saved'] for p in projects),
+            'projects': projects,
+        }
@@ -0,0 +1,194 @@
+"""
+ProjektCoPilot — AI Generation Jobs
+===================================
+/api/ai/generate-fs ve generate-ts, üretimi istek thread'inde bekliyordu;
+her çağrı üretim süresince bir WSGI worker'ını meşgul ediyordu.
+
+Burada üretim sınırlı bir worker havuzunda (ThreadPoolExecutor) çalışır:
+
+  POST /api/ai/generate-fs        → 202 {"job_id": ...}
+  GET  /api/ai/jobs/<id>          → durum + sonuç
+  GET  /api/ai/jobs/<id>/events   → SSE ile durum değişiklikleri
+  GET  /api/system/ai-jobs        → kuyruk derinliği, bekleme / çalışma süreleri
+
+Durumlar: queued → running → done | failed. Kuyrukta bekleyen iş sayısı
+max_queue'ya ulaşırsa submit() JobQueueFull fırlatır (503). Biten işler
+bellekte en fazla `retain` adet tutulur; eskiler silinir.
+
+Uzun süren başka işler (ör. data_export) AI kuyruğunu tıkamasın diye
+kendi JobManager'larıyla (name='Export') çalışır.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+FINISHED = ('done', 'failed')
+
+
+class JobQueueFull(RuntimeError):
+    """Kuyruk dolu; istemci daha sonra tekrar denemeli (503)."""
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Her durum değişikliğinde artar; SSE istemcileri bununla bekler
+        self.version = 0
+
+    @property
+    def wait_ms(self):
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.created_at) * 1000, 1)
+
+    @property
+    def run_ms(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'wait_ms': self.wait_ms,
+            'run_ms': self.run_ms,
+            'version': self.version,
+        }
+
+
+class JobManager:
+    def __init__(self, workers=2, max_queue=50, retain=500, name='AI'):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retain = retain
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name.lower()}-job')
+        self._jobs = OrderedDict()
+        self._changed = threading.Condition()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        self._run_ms_total = 0.0
+        self._run_ms_max = 0.0
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """fn(*args, progress=..., **kwargs) worker'da çalışır; dönüş değeri job.result olur."""
+        with self._changed:
+            if self._count('queued') >= self.max_queue:
+                self._rejected += 1
+                raise JobQueueFull(f"{self.name} job queue is full ({self.max_queue} waiting)")
+            job = Job(kind)
+            self._jobs[job.id] = job
+            self._submitted += 1
+            self._evict()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def wait_for_change(self, job_id, version, timeout):
+        """job.version > version olana kadar bekler; snapshot veya (zaman aşımı/silinmiş) None döner."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job.version > version:
+                    return job.to_dict()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    def metrics(self):
+        with self._changed:
+            finished = self._completed + self._failed
+            started = finished + self._count('running')
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self._count('queued'),
+                'running': self._count('running'),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'wait_ms_avg': round(self._wait_ms_total / started, 1) if started else 0.0,
+                'wait_ms_max': self._wait_ms_max,
+                'run_ms_avg': round(self._run_ms_total / finished, 1) if finished else 0.0,
+                'run_ms_max': self._run_ms_max,
+            }
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
+
+    # -- worker -------------------------------------------------------------
+
+    def _run(self, job, fn, args, kwargs):
+        with self._changed:
+            job.status = 'running'
+            job.started_at = time.time()
+            self._wait_ms_total += job.wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, job.wait_ms)
+            self._touch(job)
+        try:
+            result = fn(*args, progress=lambda message: self._progress(job, message), **kwargs)
+        except Exception as e:
+            self._finish(job, 'failed', error=str(e))
+        else:
+            self._finish(job, 'done', result=result)
+
+    def _progress(self, job, message):
+        with self._changed:
+            job.progress = message
+            self._touch(job)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._changed:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            if status == 'done':
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._run_ms_total += job.run_ms
+            self._run_ms_max = max(self._run_ms_max, job.run_ms)
+            self._touch(job)
+
+    def _touch(self, job):
+        job.version += 1
+        self._changed.notify_all()
+
+    def _count(self, status):
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.retain)]:
+            del self._jobs[job_id]
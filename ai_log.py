@@ -0,0 +1,368 @@
+"""
+ProjektCoPilot — AI Interaction Log Buffer & Usage Rollups
+==========================================================
+Her AI çağrısı ai_interaction_log'a bir satır yazar; bunu istek içinde
+yapmak her AI yanıtına bir commit ekliyordu. LogBuffer satırları bellekte
+toplar ve arka planda toplu yazar:
+
+- `max_rows` satır birikince veya en geç `interval_ms` sonra flush edilir.
+- Flush tek transaction'dır: log satırları executemany ile eklenir ve aynı
+  transaction'da günlük rollup'lar güncellenir.
+- Flush başarısız olursa satırlar tampona geri konur ve sonraki turda
+  tekrar denenir. `max_attempts`'inci ardışık denemede satırlar tek tek
+  (SAVEPOINT ile) yazılır; hata veren satırlar atılır, diğerleri yazılır.
+  O deneme de başarısız olursa (ör. veritabanı erişilemez) tamponun tamamı
+  atılır. Tampon `max_pending` satırla sınırlıdır; aşılırsa en eski
+  satırlar atılır. Atılan satırlar stats()['dropped_rows']'ta sayılır.
+
+Rollup tablosu (gün × model × interaction_type):
+
+  ai_usage_daily(day, model, interaction_type, calls, cached_calls,
+                 tokens_in, tokens_out, cost_usd, response_ms_sum,
+                 latency_hist)
+
+latency_hist, LATENCY_BUCKETS_MS sınırlarına göre sabit bir histogramdır
+(JSON sayı dizisi); histogramlar toplanabildiği için p50/p95/p99 herhangi
+bir tarih aralığı için yalnızca rollup'lardan hesaplanır.
+
+cost_usd verilmezse MODEL_PRICES'tan (1M token başına USD) hesaplanır.
+
+  GET /api/ai/usage?from=YYYY-MM-DD&to=YYYY-MM-DD[&model=][&interaction_type=]
+
+CLI:
+  python ai_log.py rebuild   # rollup'ları ai_interaction_log'dan yeniden hesapla
+"""
+
+import bisect
+import json
+import threading
+import time
+from datetime import datetime
+
+# Üst sınırlar (ms); son kova bunların üstü
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# model → (input, output) USD / 1M token
+MODEL_PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'text-embedding-3-small': (0.02, 0.0),
+}
+
+ROLLUP_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS ai_usage_daily (
+        day TEXT NOT NULL,
+        model TEXT NOT NULL,
+        interaction_type TEXT NOT NULL,
+        calls INTEGER NOT NULL DEFAULT 0,
+        cached_calls INTEGER NOT NULL DEFAULT 0,
+        tokens_in INTEGER NOT NULL DEFAULT 0,
+        tokens_out INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        response_ms_sum INTEGER NOT NULL DEFAULT 0,
+        latency_hist TEXT NOT NULL,
+        PRIMARY KEY (day, model, interaction_type)
+    ) WITHOUT ROWID
+'''
+
+LOG_COLUMNS = ('interaction_type', 'project_id', 'input_text', 'output_text', 'model_used', 'tokens_in',
+               'tokens_out', 'cost_usd', 'response_time_ms', 'cached', 'created_at')
+
+INSERT_LOG_SQL = (f"INSERT INTO ai_interaction_log ({', '.join(LOG_COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(LOG_COLUMNS))})")
+
+
+def install(conn):
+    conn.execute(ROLLUP_TABLE_SQL)
+
+
+def estimate_cost(model, tokens_in, tokens_out):
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return round(((tokens_in or 0) * price_in + (tokens_out or 0) * price_out) / 1_000_000, 6)
+
+
+def _bucket(response_ms):
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, response_ms or 0)
+
+
+def _empty_hist():
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def percentile(hist, q):
+    """Histogramdan q (0-1) yüzdeliği; kova içinde doğrusal enterpolasyon."""
+    total = sum(hist)
+    if total == 0:
+        return None
+    target = q * total
+    seen = 0
+    for index, count in enumerate(hist):
+        if count and seen + count >= target:
+            low = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            high = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else LATENCY_BUCKETS_MS[-1]
+            return round(low + (high - low) * (target - seen) / count, 1)
+        seen += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def _rollup_deltas(rows):
+    """Log satırları → {(day, model, type): delta}"""
+    deltas = {}
+    for row in rows:
+        key = (row['created_at'][:10], row['model_used'] or '', row['interaction_type'])
+        delta = deltas.setdefault(key, {'calls': 0, 'cached_calls': 0, 'tokens_in': 0, 'tokens_out': 0,
+                                        'cost_usd': 0.0, 'response_ms_sum': 0, 'hist': _empty_hist()})
+        delta['calls'] += 1
+        delta['cached_calls'] += 1 if row['cached'] else 0
+        delta['tokens_in'] += row['tokens_in'] or 0
+        delta['tokens_out'] += row['tokens_out'] or 0
+        delta['cost_usd'] += row['cost_usd'] or 0.0
+        delta['response_ms_sum'] += row['response_time_ms'] or 0
+        delta['hist'][_bucket(row['response_time_ms'])] += 1
+    return deltas
+
+
+def apply_rollups(conn, rows):
+    """Satırların rollup katkısını ai_usage_daily'ye ekler (çağıranın transaction'ında)."""
+    for (day, model, interaction_type), delta in _rollup_deltas(rows).items():
+        existing = conn.execute(
+            "SELECT latency_hist FROM ai_usage_daily WHERE day = ? AND model = ? AND interaction_type = ?",
+            (day, model, interaction_type)).fetchone()
+        hist = json.loads(existing[0]) if existing else _empty_hist()
+        hist = [a + b for a, b in zip(hist, delta['hist'])]
+        conn.execute('''
+            INSERT INTO ai_usage_daily (day, model, interaction_type, calls, cached_calls, tokens_in, tokens_out,
+                                        cost_usd, response_ms_sum, latency_hist)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, model, interaction_type) DO UPDATE SET
+                calls = calls + excluded.calls,
+                cached_calls = cached_calls + excluded.cached_calls,
+                tokens_in = tokens_in + excluded.tokens_in,
+                tokens_out = tokens_out + excluded.tokens_out,
+                cost_usd = cost_usd + excluded.cost_usd,
+                response_ms_sum = response_ms_sum + excluded.response_ms_sum,
+                latency_hist = excluded.latency_hist
+        ''', (day, model, interaction_type, delta['calls'], delta['cached_calls'], delta['tokens_in'],
+              delta['tokens_out'], delta['cost_usd'], delta['response_ms_sum'], json.dumps(hist)))
+
+
+def rebuild(conn):
+    """Rollup'ları ai_interaction_log'dan sıfırdan hesaplar; işlenen log satırı sayısını döner."""
+    conn.execute("DELETE FROM ai_usage_daily")
+    cursor = conn.execute(f"SELECT {', '.join(LOG_COLUMNS)} FROM ai_interaction_log")
+    count = 0
+    while True:
+        batch = cursor.fetchmany(1000)
+        if not batch:
+            return count
+        apply_rollups(conn, [dict(zip(LOG_COLUMNS, row), created_at=str(row[-1])) for row in batch])
+        count += len(batch)
+
+
+def usage(conn, date_from=None, date_to=None, model=None, interaction_type=None):
+    """Yalnızca ai_usage_daily'den: satır bazında ve toplam kullanım + gecikme yüzdelikleri."""
+    where, params = [], []
+    for column, op, value in (('day', '>=', date_from), ('day', '<=', date_to),
+                              ('model', '=', model), ('interaction_type', '=', interaction_type)):
+        if value:
+            where.append(f"{column} {op} ?")
+            params.append(value)
+    rows = conn.execute(f'''
+        SELECT day, model, interaction_type, calls, cached_calls, tokens_in, tokens_out, cost_usd,
+               response_ms_sum, latency_hist
+        FROM ai_usage_daily
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY day, model, interaction_type
+    ''', params).fetchall()
+
+    def summarize(calls, cached_calls, tokens_in, tokens_out, cost_usd, response_ms_sum, hist):
+        return {
+            'calls': calls,
+            'cached_calls': cached_calls,
+            'tokens_in': tokens_in,
+            'tokens_out': tokens_out,
+            'cost_usd': round(cost_usd, 6),
+            'response_ms_avg': round(response_ms_sum / calls, 1) if calls else None,
+            'response_ms_p50': percentile(hist, 0.50),
+            'response_ms_p95': percentile(hist, 0.95),
+            'response_ms_p99': percentile(hist, 0.99),
+        }
+
+    result, totals = [], [0, 0, 0, 0, 0.0, 0, _empty_hist()]
+    for day, row_model, row_type, calls, cached_calls, tokens_in, tokens_out, cost_usd, ms_sum, hist in rows:
+        hist = json.loads(hist)
+        result.append(dict(summarize(calls, cached_calls, tokens_in, tokens_out, cost_usd, ms_sum, hist),
+                           day=day, model=row_model, interaction_type=row_type))
+        for index, value in enumerate((calls, cached_calls, tokens_in, tokens_out, cost_usd, ms_sum)):
+            totals[index] += value
+        totals[6] = [a + b for a, b in zip(totals[6], hist)]
+    return {'rows': result, 'totals': summarize(*totals)}
+
+
+class LogBuffer:
+    """ai_interaction_log için write-behind tampon; connect() her flush'ta bir sqlite bağlantısı verir."""
+
+    def __init__(self, connect, max_rows=50, interval_ms=1000, max_pending=10000, max_attempts=3):
+        self.connect = connect
+        self.max_rows = max_rows
+        self.interval_ms = interval_ms
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._rows = []
+        self._failed_attempts = 0
+        self._changed = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._stats = {'buffered': 0, 'flushed_rows': 0, 'flushes': 0, 'failures': 0, 'dropped_rows': 0}
+        self._last_flush_ms = None
+        self._last_error = None
+
+    def add(self, interaction_type, model_used, tokens_in=None, tokens_out=None, response_time_ms=None,
+            project_id=None, input_text=None, output_text=None, cached=False, cost_usd=None):
+        row = {
+            'interaction_type': interaction_type,
+            'project_id': project_id,
+            'input_text': input_text,
+            'output_text': output_text,
+            'model_used': model_used,
+            'tokens_in': tokens_in,
+            'tokens_out': tokens_out,
+            'cost_usd': 0.0 if cached else (cost_usd if cost_usd is not None
+                                             else estimate_cost(model_used, tokens_in, tokens_out)),
+            'response_time_ms': response_time_ms,
+            'cached': 1 if cached else 0,
+            'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f'),
+        }
+        with self._changed:
+            self._rows.append(row)
+            self._stats['buffered'] += 1
+            self._trim()
+            if len(self._rows) >= self.max_rows:
+                self._changed.notify_all()
+
+    def _trim(self):
+        """max_pending'i aşan en eski satırları atar (self._changed tutulurken çağrılır)."""
+        overflow = len(self._rows) - self.max_pending
+        if overflow > 0:
+            del self._rows[:overflow]
+            self._stats['dropped_rows'] += overflow
+
+    def flush(self):
+        """Tampondaki satırları tek transaction'da yazar; yazılan satır sayısını döner."""
+        with self._flush_lock:
+            with self._changed:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            started = time.perf_counter()
+            last_attempt = self._failed_attempts + 1 >= self.max_attempts
+            conn = None
+            try:
+                conn = self.connect()
+                if last_attempt:
+                    written = self._write_each(conn, rows)
+                else:
+                    conn.executemany(INSERT_LOG_SQL, [tuple(row[c] for c in LOG_COLUMNS) for row in rows])
+                    apply_rollups(conn, rows)
+                    written = rows
+                conn.commit()
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                with self._changed:
+                    self._stats['failures'] += 1
+                    self._last_error = str(e)
+                    if last_attempt:
+                        self._failed_attempts = 0
+                        self._stats['dropped_rows'] += len(rows)
+                    else:
+                        self._failed_attempts += 1
+                        self._rows[:0] = rows
+                        self._trim()
+                raise
+            finally:
+                if conn is not None:
+                    conn.close()
+            with self._changed:
+                self._failed_attempts = 0
+                self._stats['flushed_rows'] += len(written)
+                self._stats['dropped_rows'] += len(rows) - len(written)
+                self._stats['flushes'] += 1
+                self._last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+            return len(written)
+
+    def _write_each(self, conn, rows):
+        """Satırları tek tek yazar; INSERT'i hata veren satır atlanır. Yazılan satırlar döner."""
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        written = []
+        for row in rows:
+            conn.execute("SAVEPOINT ai_log_row")
+            try:
+                conn.execute(INSERT_LOG_SQL, tuple(row[c] for c in LOG_COLUMNS))
+            except Exception as e:
+                conn.execute("ROLLBACK TO ai_log_row")
+                with self._changed:
+                    self._last_error = str(e)
+            else:
+                written.append(row)
+            conn.execute("RELEASE ai_log_row")
+        apply_rollups(conn, written)
+        return written
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='ai-log-buffer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join(5)
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _run(self):
+        while True:
+            with self._changed:
+                deadline = time.monotonic() + self.interval_ms / 1000
+                while len(self._rows) < self.max_rows and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                pass  # satırlar tampona geri kondu veya atıldı; _last_error'da görünür
+
+    def stats(self):
+        with self._changed:
+            return dict(self._stats, pending=len(self._rows), max_rows=self.max_rows,
+                        max_pending=self.max_pending, interval_ms=self.interval_ms,
+                        failed_attempts=self._failed_attempts, last_flush_ms=self._last_flush_ms,
+                        last_error=self._last_error)
+
+
+if __name__ == '__main__':
+    import os
+    import sqlite3
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print("Usage: python ai_log.py rebuild")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    install(conn)
+    count = rebuild(conn)
+    conn.commit()
+    conn.close()
+    print(f"✓ ai_usage_daily rebuilt from {count} log row(s)")
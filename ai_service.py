@@ -0,0 +1,304 @@
+"""
+ProjektCoPilot — AI Service
+===========================
+FS/TS üretimi ve chat. Metin, değiştirilebilir bir backend tarafından
+parça parça (stream) üretilir:
+
+  MockBackend    — yerel şablonlar; LLM yerine MOCK_LATENCY_S boyunca parça
+                   parça döner (varsayılan, AI_BACKEND=mock)
+  OpenAIBackend  — openai client (requirements.txt); AI_BACKEND=openai,
+                   OPENAI_API_KEY ve opsiyonel OPENAI_MODEL
+
+Backend'ler stream(kind, params) → metin parçaları iterator'ı sağlar;
+kind: 'fs' | 'ts' | 'chat'. generate_*() (ai_jobs worker'ları, JSON
+endpoint'leri) aynı akışı birleştirir; SSE endpoint'leri parçaları
+üretildikçe gönderir.
+
+progress: opsiyonel geri çağırım, progress("mesaj") — job durumuna yansır.
+"""
+
+import os
+import random
+import time
+
+MOCK_LATENCY_S = 1.0
+MOCK_CHUNK_COUNT = 20
+
+KINDS = ('fs', 'ts', 'chat')
+
+
+# ---------------------------------------------------------------------------
+# Mock şablonlar
+# ---------------------------------------------------------------------------
+
+def fs_template(requirement_code='REQ-001', requirement_title='Requirement', module='MM'):
+    return f"""# Functional Specification
+## {requirement_code} - {requirement_title}
+
+### 1. Document Information
+- **Module:** {module}
+- **Author:** AI Co-Pilot
+- **Version:** 1.0
+- **Status:** Draft
+
+### 2. Business Requirements
+This functional specification describes the business requirements for {requirement_title}.
+
+#### 2.1 Business Context
+The business process requires implementation of {requirement_title} to support daily operations in the {module} module.
+
+#### 2.2 Scope
+- In Scope: Core functionality for {requirement_title}
+- Out of Scope: Integration with external systems (Phase 2)
+
+### 3. Functional Requirements
+
+#### 3.1 Process Flow
+1. User initiates the process via transaction
+2. System validates input data
+3. Business logic is executed
+4. Results are displayed/stored
+
+#### 3.2 Business Rules
+- Rule 1: All mandatory fields must be filled
+- Rule 2: Authorization check required
+- Rule 3: Document number range must be configured
+
+### 4. Data Requirements
+| Field | Type | Length | Required |
+|-------|------|--------|----------|
+| Document No | CHAR | 10 | Yes |
+| Description | CHAR | 40 | Yes |
+| Status | CHAR | 1 | Yes |
+
+### 5. Authorization
+- Authorization Object: Z_{module}_AUTH
+- Required Activities: Create, Change, Display
+
+### 6. Testing Requirements
+- Unit testing required
+- Integration testing with related processes
+- UAT sign-off needed
+
+---
+*Generated by AI Co-Pilot*
+"""
+
+
+def ts_template(requirement_code='REQ-001', requirement_title='Requirement', module='MM'):
+    return f"""# Technical Specification
+## {requirement_code} - {requirement_title}
+
+### 1. Technical Overview
+- **Development Type:** Enhancement
+- **Package:** Z{module}_CUSTOM
+- **Transport:** To be assigned
+
+### 2. Development Objects
+
+#### 2.1 Custom Tables
+```
+Table: Z{module}_CUSTOM_DATA
+Fields:
+  - MANDT (Client)
+  - DOCNR (Document Number) - Key
+  - BUKRS (Company Code)
+  - ERDAT (Created Date)
+  - ERNAM (Created By)
+  - STATUS (Status)
+```
+
+#### 2.2 Function Modules
+```abap
+FUNCTION Z_{module}_PROCESS_DATA
+  IMPORTING
+    IV_DOCNR TYPE ZDOCNR
+    IV_BUKRS TYPE BUKRS
+  EXPORTING
+    EV_STATUS TYPE ZSTATUS
+  EXCEPTIONS
+    NOT_FOUND
+    INVALID_INPUT.
+```
+
+### 3. Implementation Details
+
+#### 3.1 Main Logic (Pseudo-code)
+```abap
+METHOD process_document.
+  " 1. Validate input
+  IF iv_docnr IS INITIAL.
+    RAISE EXCEPTION invalid_input.
+  ENDIF.
+  
+  " 2. Read master data
+  SELECT SINGLE * FROM z{module.lower()}_custom_data
+    INTO @DATA(ls_data)
+    WHERE docnr = @iv_docnr.
+    
+  " 3. Execute business logic
+  CASE ls_data-status.
+    WHEN '01'. " New
+      perform_initial_processing( ).
+    WHEN '02'. " In Process
+      perform_update_processing( ).
+  ENDCASE.
+  
+  " 4. Update status
+  UPDATE z{module.lower()}_custom_data
+    SET status = '03'
+    WHERE docnr = iv_docnr.
+ENDMETHOD.
+```
+
+### 4. Error Handling
+| Error Code | Message | Action |
+|------------|---------|--------|
+| 001 | Document not found | Display error, return |
+| 002 | Invalid status | Log warning, skip |
+| 003 | Authorization failed | Raise exception |
+
+### 5. Performance Considerations
+- Use buffered tables where possible
+- Implement parallel processing for mass operations
+- Add appropriate indexes
+
+### 6. Unit Test Cases
+- Test Case 1: Valid document processing
+- Test Case 2: Invalid input handling
+- Test Case 3: Authorization check
+
+---
+*Generated by AI Co-Pilot*
+"""
+
+
+def chat_template(message='', context=''):
+    responses = [
+        f"Based on your question about '{message[:50]}...', I recommend reviewing the standard SAP functionality first. This approach typically reduces development effort by 40%.",
+        f"Great question! For '{message[:30]}...', the best practice in SAP S/4HANA is to use Fiori apps where possible. This ensures future compatibility.",
+        f"I've analyzed your request. The technical implementation for '{message[:30]}...' would require a custom enhancement. I can help you draft the technical specification.",
+        f"Looking at '{message[:30]}...', this seems like a common requirement. SAP provides standard solutions through Business Add-Ins (BAdIs) that we can leverage.",
+        f"For '{message[:30]}...', I suggest we break this down into smaller components. This will make testing and maintenance easier."
+    ]
+    return random.choice(responses)
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class MockBackend:
+    name = 'mock'
+    model = 'mock'
+    templates = {'fs': fs_template, 'ts': ts_template, 'chat': chat_template}
+    latency_factor = {'fs': 1.0, 'ts': 1.0, 'chat': 0.5}
+
+    def stream(self, kind, params):
+        text = self.templates[kind](**params)
+        chunks = _split_chunks(text, MOCK_CHUNK_COUNT)
+        delay = MOCK_LATENCY_S * self.latency_factor[kind] / len(chunks)
+        for chunk in chunks:
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+
+class OpenAIBackend:
+    name = 'openai'
+
+    def __init__(self, model=None):
+        try:
+            from openai import OpenAI
+        except ImportError:
+            raise RuntimeError("AI_BACKEND=openai requires the openai package (pip install -r requirements.txt)")
+        self.client = OpenAI()
+        self.model = model or os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+
+    def stream(self, kind, params):
+        response = self.client.chat.completions.create(
+            model=self.model, messages=_prompt(kind, params), stream=True)
+        for event in response:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+
+
+BACKENDS = {'mock': MockBackend, 'openai': OpenAIBackend}
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = os.environ.get('AI_BACKEND', 'mock')
+        if name not in BACKENDS:
+            raise RuntimeError(f"Unknown AI_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    """Backend'i değiştir (test veya özel entegrasyon için); None → AI_BACKEND'den yeniden seç."""
+    global _backend
+    _backend = backend
+
+
+def _split_chunks(text, count):
+    """Metni satır sınırlarında yaklaşık `count` parçaya böler (birleşimi metnin kendisidir)."""
+    lines = text.splitlines(keepends=True)
+    size = max(1, -(-len(lines) // count))
+    return [''.join(lines[i:i + size]) for i in range(0, len(lines), size)] or ['']
+
+
+def _prompt(kind, params):
+    if kind == 'chat':
+        messages = [{"role": "system", "content": "You are an SAP S/4HANA implementation co-pilot."}]
+        if params.get('context'):
+            messages.append({"role": "system", "content": f"Document context:\n{params['context']}"})
+        messages.append({"role": "user", "content": params.get('message', '')})
+        return messages
+    doc = 'Functional Specification' if kind == 'fs' else 'Technical Specification'
+    return [
+        {"role": "system", "content": f"You write SAP {doc} documents in Markdown."},
+        {"role": "user", "content": f"Write the {doc} for {params.get('requirement_code')} - "
+                                    f"{params.get('requirement_title')} in the {params.get('module')} module."},
+    ]
+
+
+def estimate_tokens(text):
+    """Kaba token tahmini (~4 karakter / token)."""
+    return max(1, len(text or '') // 4)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def stream(kind, **params):
+    return get_backend().stream(kind, params)
+
+
+def generate(kind, progress=None, **params):
+    """Akışı birleştirip {"content", "tokens_used", "model"} döner."""
+    _report(progress, 'generating')
+    backend = get_backend()
+    content = ''.join(backend.stream(kind, params))
+    # SSE yolu, cache anahtarı ve kullanım rollup'ları da backend.model kullanır
+    return {"content": content, "tokens_used": estimate_tokens(content), "model": backend.model}
+
+
+def generate_fs(requirement_code='REQ-001', requirement_title='Requirement', module='MM', progress=None):
+    """Functional Spec içeriği üret; {"content", "tokens_used", "model"} döner."""
+    return generate('fs', progress, requirement_code=requirement_code,
+                    requirement_title=requirement_title, module=module)
+
+
+def generate_ts(requirement_code='REQ-001', requirement_title='Requirement', module='MM', progress=None):
+    """Technical Spec içeriği üret; {"content", "tokens_used", "model"} döner."""
+    return generate('ts', progress, requirement_code=requirement_code,
+                    requirement_title=requirement_title, module=module)
+
+
+def _report(progress, message):
+    if progress is not None:
+        progress(message)
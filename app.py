@@ -1,26 +1,143 @@
-from flask import Flask, render_template, jsonify, request
+from flask import (Flask, Response, render_template, jsonify, request, g, has_app_context,
+                   send_from_directory, stream_with_context, url_for)
+from contextlib import contextmanager
 from datetime import datetime, date
-import sqlite3
+import atexit
+import json
 import os
-
-from models import db, Project, Scenario, Requirement, WricefItem, ConfigItem, TestCase, Analysis
+import shutil
+import tempfile
+
+from sqlalchemy import insert
+from sqlalchemy.pool import NullPool
+
+from models import (db, Project, Scenario, Requirement, WricefItem, ConfigItem, TestCase, Analysis, generate_code,
+                    reserve_codes, scenario_test_case, CODE_PREFIXES)
+from db_pool import SQLitePool
+from repository import SessionConnection
+from sequences import AUTO_ID_SOURCES, next_value
+from pagination import (PageError, parse_page_args, fetch_page, rows_response,
+                        query_page, objects_response, project_row, stream_response)
+from list_queries import (REQUIREMENTS_SQL, REQUIREMENTS_KEYSET, SESSIONS_SQL, SESSIONS_KEYSET, QUESTIONS_SQL,
+                          QUESTIONS_KEYSET, QUESTIONS_BY_SESSION_KEYSET, FITGAP_SQL, FITGAP_KEYSET, ACTIONS_SQL,
+                          ACTIONS_BY_PROJECT_SQL, ACTIONS_KEYSET, DECISIONS_SQL, DECISIONS_KEYSET, RISKS_SQL,
+                          RISKS_KEYSET, WRICEF_SQL, WRICEF_BY_PROJECT_SQL)
+from stats_cache import StatsCache, load_project_stats, load_global_stats
+from counters import read_counters
+from query_audit import audit as audit_query_plans
+from ai_jobs import JobManager, JobQueueFull
+from ai_cache import AIResponseCache, cache_key as ai_cache_key
+from ai_batch import run_batch
+from vector_index import VectorIndex, DEFAULT_DIR as VECTOR_INDEX_DEFAULT_DIR
+from embedding_pipeline import EmbeddingPipeline, UPSERT as EMBEDDING_UPSERT, SOURCES as EMBEDDING_SOURCES
+import ai_log
+import search_index
+import requirement_import
+import data_export
+import scenario_graph
+import traceability
+import load_profiles
+import ai_service
+from database import run_migrations
 
 app = Flask(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'project_copilot.db')
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+pool = SQLitePool(DB_PATH, size=app.config['DB_POOL_SIZE'], timeout=app.config['DB_POOL_TIMEOUT'])
+atexit.register(pool.close_all)
+
+app.config['STATS_CACHE_TTL'] = float(os.environ.get('STATS_CACHE_TTL', 300))
+stats_cache = StatsCache(ttl=app.config['STATS_CACHE_TTL'])
+# Composite senaryo kapanisi (scenario_graph.ProjectGraph) proje basina; senaryo yazmalari invalidate eder
+scenario_graph_cache = StatsCache(ttl=app.config['STATS_CACHE_TTL'])
+# Izlenebilirlik matrisi; trace_versions trigger sayaci ile dogrulanir, TTL yok
+trace_cache = traceability.TraceCache(max_projects=int(os.environ.get('TRACE_CACHE_PROJECTS', 32)))
+
+app.config['AI_JOB_WORKERS'] = int(os.environ.get('AI_JOB_WORKERS', 2))
+app.config['AI_JOB_QUEUE_LIMIT'] = int(os.environ.get('AI_JOB_QUEUE_LIMIT', 50))
+AI_JOB_KEEPALIVE_S = 15
+ai_jobs = JobManager(workers=app.config['AI_JOB_WORKERS'], max_queue=app.config['AI_JOB_QUEUE_LIMIT'])
+atexit.register(ai_jobs.shutdown)
+
+app.config['AI_CACHE_TTL'] = float(os.environ.get('AI_CACHE_TTL', 7 * 24 * 3600))
+app.config['AI_CACHE_MAX_ENTRIES'] = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 1000))
+app.config['AI_CACHE_MAX_BYTES'] = int(os.environ.get('AI_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+app.config['AI_CACHE_ENABLED'] = os.environ.get('AI_CACHE_ENABLED', '1') != '0'
+app.config['AI_BATCH_CONCURRENCY'] = int(os.environ.get('AI_BATCH_CONCURRENCY', 4))
+app.config['AI_BATCH_FLUSH_SIZE'] = int(os.environ.get('AI_BATCH_FLUSH_SIZE', 25))
+app.config['VECTOR_INDEX_DIR'] = os.environ.get('VECTOR_INDEX_DIR', VECTOR_INDEX_DEFAULT_DIR)
+vector_index = VectorIndex(app.config['VECTOR_INDEX_DIR'], entity_types=EMBEDDING_SOURCES)
+app.config['EXPORT_DIR'] = os.environ.get('EXPORT_DIR', data_export.DEFAULT_DIR)
+app.config['EXPORT_JOB_QUEUE_LIMIT'] = int(os.environ.get('EXPORT_JOB_QUEUE_LIMIT', 10))
+# Export'lar dakikalar surebilir; AI uretim kuyrugunu bloklamamasi icin tek worker'li ayri havuz
+export_jobs = JobManager(workers=1, max_queue=app.config['EXPORT_JOB_QUEUE_LIMIT'], name='Export')
+atexit.register(export_jobs.shutdown)
+
+app.config['EMBEDDING_PIPELINE'] = os.environ.get('EMBEDDING_PIPELINE', '1') == '1'
+app.config['EMBEDDING_BATCH_SIZE'] = int(os.environ.get('EMBEDDING_BATCH_SIZE', 32))
+embedding_pipeline = EmbeddingPipeline(app, batch_size=app.config['EMBEDDING_BATCH_SIZE'])
+if app.config['EMBEDDING_PIPELINE']:
+    embedding_pipeline.start()
+    atexit.register(embedding_pipeline.stop)
+
+ai_cache = AIResponseCache(ttl=app.config['AI_CACHE_TTL'], max_entries=app.config['AI_CACHE_MAX_ENTRIES'],
+                           max_bytes=app.config['AI_CACHE_MAX_BYTES'], enabled=app.config['AI_CACHE_ENABLED'])
+
+app.config['AI_LOG_FLUSH_ROWS'] = int(os.environ.get('AI_LOG_FLUSH_ROWS', 50))
+app.config['AI_LOG_FLUSH_MS'] = int(os.environ.get('AI_LOG_FLUSH_MS', 1000))
+app.config['AI_LOG_MAX_PENDING'] = int(os.environ.get('AI_LOG_MAX_PENDING', 10000))
+app.config['AI_LOG_MAX_ATTEMPTS'] = int(os.environ.get('AI_LOG_MAX_ATTEMPTS', 3))
+ai_log_buffer = ai_log.LogBuffer(pool.acquire, max_rows=app.config['AI_LOG_FLUSH_ROWS'],
+                                 interval_ms=app.config['AI_LOG_FLUSH_MS'],
+                                 max_pending=app.config['AI_LOG_MAX_PENDING'],
+                                 max_attempts=app.config['AI_LOG_MAX_ATTEMPTS'])
+ai_log_buffer.start()
+atexit.register(ai_log_buffer.stop)
+
+# ORM ve raw SQL ayni havuzdan beslenir: SQLAlchemy kendi havuzunu tutmaz,
+# baglantiyi pool'dan alir ve close() ile geri birakir.
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'creator': pool.acquire, 'poolclass': NullPool}
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
+run_migrations()
 
 @app.teardown_appcontext
 def shutdown_session(exception=None):
+    g.pop('db_conn', None)
     db.session.remove()
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, timeout=10)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
+    """Istek icinde db.session ile ayni baglanti/transaction; istek disinda havuz baglantisi."""
+    if not has_app_context():
+        return pool.acquire()
+    if 'db_conn' not in g:
+        g.db_conn = SessionConnection(db.session)
+    return g.db_conn
+
+@contextmanager
+def db_conn():
+    """with db_conn() as conn: ... — istek disinda (CLI, test) havuz baglantisi."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@app.errorhandler(PageError)
+@app.errorhandler(load_profiles.IncludeError)
+def handle_page_error(e):
+    return jsonify({"error": str(e)}), 400
+
+def _includes(model, page=None):
+    """?include= → (loader option'lari, serializer); fields= verildiyse include adlari da korunur"""
+    tree = load_profiles.parse_include(model, request.args.get('include'))
+    if tree and page is not None and page.fields is not None:
+        page.fields |= set(tree)
+    return load_profiles.options(model, tree), lambda item: load_profiles.serialize(item, tree)
 
 def parse_date(value):
     if value is None or value == "":
@@ -36,56 +153,18 @@ def generate_auto_id(project_id, item_type):
     """
     Proje bazlı otomatik ID üretir
     item_type: Q (Question), G (Gap), D (Decision), R (Risk), I (Issue), A (Action), W (Workshop)
+    Numara id_sequences sayacindan, istegin transaction'i icinde atomik olarak alinir.
     """
+    if item_type not in AUTO_ID_SOURCES:
+        return None
+
     conn = get_db_connection()
     
     # Proje kodunu al
     project = conn.execute("SELECT project_code FROM projects WHERE id = ?", (project_id,)).fetchone()
     project_code = project["project_code"] if project else f"P{project_id}"
     
-    # Tabloya göre sayacı bul
-    table_map = {
-        "Q": ("questions", "question_id"),
-        "G": ("fitgap", "gap_id"),
-        "D": ("decisions", "decision_id"),
-        "R": ("risks_issues", "item_id"),
-        "I": ("risks_issues", "item_id"),
-        "A": ("action_items", "action_id"),
-        "W": ("analysis_sessions", "session_code"),
-        "S": ("scenarios", "scenario_id"),
-        "WR": ("wricef", "wricef_id"),
-        "C": ("configs", "config_id"),
-    }
-    
-    if item_type not in table_map:
-        conn.close()
-        return None
-    
-    table, id_column = table_map[item_type]
-    
-    # Bu proje için bu tipteki son ID yi bul
-    pattern = f"{project_code}-{item_type}%"
-    
-    if table == "risks_issues":
-        type_filter = "Risk" if item_type == "R" else "Issue"
-        result = conn.execute(f"SELECT {id_column} FROM {table} WHERE {id_column} LIKE ? AND type = ? ORDER BY id DESC LIMIT 1", (pattern, type_filter)).fetchone()
-    elif table == "analysis_sessions":
-        result = conn.execute(f"SELECT session_code FROM {table} WHERE project_id = ? ORDER BY id DESC LIMIT 1", (project_id,)).fetchone()
-    else:
-        result = conn.execute(f"SELECT {id_column} FROM {table} WHERE {id_column} LIKE ? ORDER BY id DESC LIMIT 1", (pattern,)).fetchone()
-    
-    conn.close()
-    
-    # Yeni numara hesapla
-    if result and result[0]:
-        try:
-            last_num = int(result[0].split("-")[-1][1:])
-            new_num = last_num + 1
-        except:
-            new_num = 1
-    else:
-        new_num = 1
-    
+    new_num = next_value(conn, project_id, item_type)
     return f"{project_code}-{item_type}{new_num:03d}"
 
 @app.route('/')
@@ -113,14 +192,17 @@ def index():
 def get_requirements():
     """Tum requirementlari listele"""
     project_id = request.args.get('project_id')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
+        query = REQUIREMENTS_SQL
+        params = []
         if project_id:
-            requirements = conn.execute('SELECT * FROM requirements WHERE project_id = ? ORDER BY id DESC', (project_id,)).fetchall()
-        else:
-            requirements = conn.execute('SELECT * FROM requirements ORDER BY id DESC').fetchall()
+            query += ' AND project_id = ?'
+            params.append(project_id)
+        requirements = fetch_page(conn, query, params, REQUIREMENTS_KEYSET, page)
         conn.close()
-        return jsonify([dict(row) for row in requirements])
+        return rows_response(requirements, REQUIREMENTS_KEYSET, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -134,6 +216,7 @@ def add_requirement():
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (data.get('project_id'), data['code'], data['title'], data['module'], data['complexity'], 'Draft'))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"}), 200
     except Exception as e:
@@ -162,9 +245,12 @@ def chat():
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
     """Tum projeleri listele"""
+    page = parse_page_args(request.args)
+    options, serialize = _includes(Project, page)
     try:
-        projects = Project.query.order_by(Project.created_at.desc()).all()
-        return jsonify([project.to_dict() for project in projects])
+        projects, next_cursor = query_page(Project.query.options(*options), Project,
+                                           [Project.created_at, Project.id], page)
+        return objects_response(projects, next_cursor, page, serialize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -198,6 +284,7 @@ def add_project():
         )
         db.session.add(project)
         db.session.commit()
+        stats_cache.invalidate()
         new_id = project.id
         return jsonify({"status": "success", "id": new_id}), 201
     except Exception as e:
@@ -207,10 +294,11 @@ def add_project():
 @app.route('/api/projects/<int:project_id>', methods=['GET'])
 def get_project_detail(project_id):
     """Tek bir projenin detayini getir"""
+    options, serialize = _includes(Project)
     try:
-        project = Project.query.get(project_id)
+        project = Project.query.options(*options).filter(Project.id == project_id).first()
         if project:
-            return jsonify(project.to_dict())
+            return jsonify(serialize(project))
         return jsonify({"error": "Not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -245,6 +333,7 @@ def update_project(id):
         project.phase = data.get("current_phase", project.phase)
         project.completion_percent = data.get("completion_percent", project.completion_percent)
         db.session.commit()
+        stats_cache.invalidate(id)
         return jsonify({"status": "success"})
     except Exception as e:
         db.session.rollback()
@@ -257,6 +346,8 @@ def delete_project(id):
         if deleted == 0:
             return jsonify({"error": "Not found"}), 404
         db.session.commit()
+        stats_cache.invalidate()
+        scenario_graph_cache.invalidate(id)
         return jsonify({"status": "success"})
     except Exception as e:
         db.session.rollback()
@@ -269,27 +360,17 @@ def delete_project(id):
 def get_sessions():
     """Tum analiz oturumlarini listele"""
     project_id = request.args.get('project_id')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
+        query = SESSIONS_SQL
+        params = []
         if project_id:
-            sessions = conn.execute("""
-                SELECT s.*, p.project_name, sc.name as scenario_name, sc.scenario_id as scenario_code
-                FROM analysis_sessions s
-                LEFT JOIN projects p ON s.project_id = p.id
-                LEFT JOIN scenarios sc ON s.scenario_id = sc.id
-                WHERE s.project_id = ?
-                ORDER BY s.created_at DESC
-            """, (project_id,)).fetchall()
-        else:
-            sessions = conn.execute("""
-                SELECT s.*, p.project_name, sc.name as scenario_name, sc.scenario_id as scenario_code
-                FROM analysis_sessions s
-                LEFT JOIN projects p ON s.project_id = p.id
-                LEFT JOIN scenarios sc ON s.scenario_id = sc.id
-                ORDER BY s.created_at DESC
-            """).fetchall()
+            query += ' AND s.project_id = ?'
+            params.append(project_id)
+        sessions = fetch_page(conn, query, params, SESSIONS_KEYSET, page)
         conn.close()
-        return jsonify([dict(row) for row in sessions])
+        return rows_response(sessions, SESSIONS_KEYSET, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -325,6 +406,7 @@ def add_session():
         ''', (data['project_id'], data.get('scenario_id'), data['session_name'], data.get('module'), 
               data.get('process_name'), data.get('facilitator'), data.get('status', 'Planned'), data.get('notes')))
         conn.commit()
+        stats_cache.invalidate(data['project_id'])
         conn.close()
         return jsonify({"status": "success"}), 200
     except Exception as e:
@@ -336,25 +418,20 @@ def add_session():
 def get_questions():
     """Sorulari listele"""
     session_id = request.args.get('session_id')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
+        query = QUESTIONS_SQL
+        params = []
         if session_id:
-            questions = conn.execute('''
-                SELECT q.*, a.answer_text
-                FROM questions q
-                LEFT JOIN answers a ON q.id = a.question_id
-                WHERE q.session_id = ?
-                ORDER BY q.created_at ASC
-            ''', (session_id,)).fetchall()
+            query += ' AND q.session_id = ?'
+            params.append(session_id)
+            keyset = QUESTIONS_BY_SESSION_KEYSET
         else:
-            questions = conn.execute('''
-                SELECT q.*, a.answer_text
-                FROM questions q
-                LEFT JOIN answers a ON q.id = a.question_id
-                ORDER BY q.created_at DESC
-            ''').fetchall()
+            keyset = QUESTIONS_KEYSET
+        questions = fetch_page(conn, query, params, keyset, page)
         conn.close()
-        return jsonify([dict(row) for row in questions])
+        return rows_response(questions, keyset, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -379,6 +456,7 @@ def add_question():
               data.get("status", "Open"), data.get("assigned_to"), data.get("due_date")))
         
         conn.commit()
+        stats_cache.invalidate(project_id)
         conn.close()
         return jsonify({"success": True, "id": cursor.lastrowid, "question_id": auto_id}), 201
     except Exception as e:
@@ -390,14 +468,17 @@ def add_question():
 def get_fitgap():
     """Tum FitGap kayitlarini listele"""
     session_id = request.args.get('session_id')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
+        query = FITGAP_SQL
+        params = []
         if session_id:
-            gaps = conn.execute('SELECT * FROM fitgap WHERE session_id = ? ORDER BY created_at DESC', (session_id,)).fetchall()
-        else:
-            gaps = conn.execute('SELECT * FROM fitgap ORDER BY created_at DESC').fetchall()
+            query += ' AND session_id = ?'
+            params.append(session_id)
+        gaps = fetch_page(conn, query, params, FITGAP_KEYSET, page)
         conn.close()
-        return jsonify([dict(row) for row in gaps])
+        return rows_response(gaps, FITGAP_KEYSET, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -425,6 +506,7 @@ def add_fitgap():
               data.get("status", "Gap"), data.get("decision_rationale"), data.get("module")))
         
         conn.commit()
+        stats_cache.invalidate(project_id)
         conn.close()
         return jsonify({"status": "success", "gap_id": auto_id}), 201
     except Exception as e:
@@ -435,62 +517,46 @@ def add_fitgap():
 @app.route('/api/dashboard/stats', methods=['GET'])
 def get_dashboard_stats():
     """Dashboard icin istatistikler - proje bazli filtreleme destekli"""
-    project_id = request.args.get('project_id')
+    project_id = request.args.get('project_id', type=int)
     try:
         conn = get_db_connection()
-        
         if project_id:
             # Proje seçiliyse sadece o projenin verileri
-            total_sessions = conn.execute('SELECT COUNT(*) FROM analysis_sessions WHERE project_id = ?', (project_id,)).fetchone()[0]
-            total_gaps = conn.execute('''
-                SELECT COUNT(*) FROM fitgap f
-                JOIN analysis_sessions s ON f.session_id = s.id
-                WHERE s.project_id = ?
-            ''', (project_id,)).fetchone()[0]
-            total_questions = conn.execute('''
-                SELECT COUNT(*) FROM questions q
-                JOIN analysis_sessions s ON q.session_id = s.id
-                WHERE s.project_id = ?
-            ''', (project_id,)).fetchone()[0]
-            
-            # Recent activities for this project
-            recent_activities = conn.execute('''
-                SELECT * FROM analysis_sessions 
-                WHERE project_id = ? 
-                ORDER BY created_at DESC LIMIT 5
-            ''', (project_id,)).fetchall()
-            
-            # Project info
-            project = conn.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
-            project_name = project['project_name'] if project else 'Unknown'
-            project_status = project['status'] if project else 'Unknown'
+            stats = stats_cache.get(project_id, lambda: load_project_stats(conn, project_id))
+            project_name = stats['project_name'] or 'Unknown'
+            project_status = stats['project_status'] or 'Unknown'
+            recent_activities = stats['recent_activities']
         else:
             # Proje seçili değilse genel istatistikler
-            total_sessions = conn.execute('SELECT COUNT(*) FROM analysis_sessions').fetchone()[0]
-            total_gaps = conn.execute('SELECT COUNT(*) FROM fitgap').fetchone()[0]
-            total_questions = conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
-            recent_activities = []
+            stats = stats_cache.get(None, lambda: load_global_stats(conn))
             project_name = 'All Projects'
             project_status = '-'
-        
-        # Genel sayılar (her zaman)
-        total_projects = conn.execute('SELECT COUNT(*) FROM projects').fetchone()[0]
-        total_requirements = conn.execute('SELECT COUNT(*) FROM requirements').fetchone()[0]
-        
+            recent_activities = []
         conn.close()
         
         return jsonify({
-            "total_projects": total_projects,
-            "total_requirements": total_requirements,
-            "total_sessions": total_sessions,
-            "total_gaps": total_gaps,
-            "total_questions": total_questions,
+            "total_projects": stats['total_projects'],
+            "total_requirements": stats['total_requirements'],
+            "total_sessions": stats['total_sessions'],
+            "total_gaps": stats['total_gaps'],
+            "total_questions": stats['total_questions'],
             "project_name": project_name,
             "project_status": project_status,
-            "recent_activities": [dict(row) for row in recent_activities]
+            "recent_activities": recent_activities
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+@app.route('/api/projects/<int:project_id>/counters', methods=['GET'])
+def get_project_counters(project_id):
+    """Proje sayaclari: {counter: {bucket: value}} (wricef/test_cases durum, defects severity...)"""
+    try:
+        conn = get_db_connection()
+        values = read_counters(conn, project_id, include_global=False)
+        conn.close()
+        return jsonify(values)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
     # ============== FS/TS DOCUMENTS API ==============
 
 @app.route('/api/documents', methods=['GET'])
@@ -655,179 +721,331 @@ def update_testcase(tc_id):
 import time
 import random
 
-@app.route('/api/ai/generate-fs', methods=['POST'])
-def generate_fs_content():
-    """AI ile Functional Spec içeriği üret (Mock)"""
-    try:
-        data = request.json
-        requirement_code = data.get('requirement_code', 'REQ-001')
-        requirement_title = data.get('requirement_title', 'Requirement')
-        module = data.get('module', 'MM')
-        
-        # Simüle edilmiş gecikme (gerçekçilik için)
-        time.sleep(1)
-        
-        # Mock FS içeriği
-        content = f"""# Functional Specification
-## {requirement_code} - {requirement_title}
-
-### 1. Document Information
-- **Module:** {module}
-- **Author:** AI Co-Pilot
-- **Version:** 1.0
-- **Status:** Draft
-
-### 2. Business Requirements
-This functional specification describes the business requirements for {requirement_title}.
-
-#### 2.1 Business Context
-The business process requires implementation of {requirement_title} to support daily operations in the {module} module.
-
-#### 2.2 Scope
-- In Scope: Core functionality for {requirement_title}
-- Out of Scope: Integration with external systems (Phase 2)
-
-### 3. Functional Requirements
-
-#### 3.1 Process Flow
-1. User initiates the process via transaction
-2. System validates input data
-3. Business logic is executed
-4. Results are displayed/stored
-
-#### 3.2 Business Rules
-- Rule 1: All mandatory fields must be filled
-- Rule 2: Authorization check required
-- Rule 3: Document number range must be configured
-
-### 4. Data Requirements
-| Field | Type | Length | Required |
-|-------|------|--------|----------|
-| Document No | CHAR | 10 | Yes |
-| Description | CHAR | 40 | Yes |
-| Status | CHAR | 1 | Yes |
-
-### 5. Authorization
-- Authorization Object: Z_{module}_AUTH
-- Required Activities: Create, Change, Display
-
-### 6. Testing Requirements
-- Unit testing required
-- Integration testing with related processes
-- UAT sign-off needed
-
----
-*Generated by AI Co-Pilot*
-"""
-        return jsonify({
-            "status": "success",
-            "content": content,
-            "tokens_used": random.randint(500, 1500)
-        })
+def _sse(event, data, event_id=None):
+    """Tek bir Server-Sent Events mesaji"""
+    head = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(generator):
+    return Response(stream_with_context(generator), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _log_ai_interaction(interaction_type, input_text, output_text, model, tokens_out,
+                        response_time_ms, project_id=None, cached=False):
+    """ai_interaction_log satirini write-behind tampona ekler (istek yolunda commit yok)"""
+    ai_log_buffer.add(interaction_type, model, tokens_in=ai_service.estimate_tokens(input_text),
+                      tokens_out=tokens_out, response_time_ms=response_time_ms, project_id=project_id,
+                      input_text=input_text, output_text=output_text, cached=cached)
+
+def _stream_ai(interaction_type, kind, params, input_text, extra=None, project_id=None, cache_key=None):
+    """Backend parcalarini uretildikce 'chunk' olarak gonderir, sonunda 'done' (veya 'error').
+    Bitince log tamponuna (ve cache_key verildiyse ai_response_cache'e) yazar;
+    response_time_ms = time-to-first-token."""
+    def generate():
+        backend = ai_service.get_backend()
+        started = time.perf_counter()
+        first_token_ms = None
+        parts = []
+        try:
+            for chunk in backend.stream(kind, params):
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - started) * 1000)
+                parts.append(chunk)
+                yield _sse('chunk', {"text": chunk})
+        except Exception as e:
+            yield _sse('error', {"error": str(e)})
+            return
+        content = ''.join(parts)
+        summary = {
+            "tokens_in": ai_service.estimate_tokens(input_text),
+            "tokens_out": ai_service.estimate_tokens(content),
+            "time_to_first_token_ms": first_token_ms,
+            "total_ms": round((time.perf_counter() - started) * 1000),
+            "model": backend.model,
+            "cached": False,
+        }
+        summary.update(extra or {})
+        _log_ai_interaction(interaction_type, input_text, content, backend.model,
+                            summary['tokens_out'], first_token_ms, project_id=project_id)
+        if cache_key is not None:
+            try:
+                ai_cache.put(get_db_connection(), cache_key, interaction_type, backend.model,
+                             content, summary['tokens_out'])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+        yield _sse('done', summary)
+
+    return _sse_response(generate())
+
+def _spec_params(data):
+    return {
+        'requirement_code': data.get('requirement_code', 'REQ-001'),
+        'requirement_title': data.get('requirement_title', 'Requirement'),
+        'module': data.get('module', 'MM'),
+    }
+
+def _ai_project_id(data):
+    """Istekteki project_id; yoksa requirement_id'nin projesi"""
+    if data.get('project_id') is not None:
+        return int(data['project_id'])
+    if data.get('requirement_id') is not None:
+        row = get_db_connection().execute('SELECT project_id FROM requirements WHERE id = ?',
+                                          (data['requirement_id'],)).fetchone()
+        return row[0] if row else None
+    return None
+
+def _cached_spec(interaction_type, params, project_id):
+    """(cache isabeti veya None, cache_key); isabette log satiri cached=1 olarak yazilir"""
+    started = time.perf_counter()
+    model = ai_service.get_backend().model
+    key = ai_cache_key(interaction_type, params, model)
+    if not ai_cache.enabled:
+        return None, key
+    hit, wrote = ai_cache.lookup(get_db_connection(), key)
+    if wrote:
+        db.session.commit()  # hits/last_used_at guncellendi veya suresi dolmus kayit silindi
+    if hit is None:
+        return None, key
+    elapsed_ms = round((time.perf_counter() - started) * 1000)
+    _log_ai_interaction(interaction_type, json.dumps(params), hit['content'], hit['model'],
+                        hit['tokens'], elapsed_ms, project_id=project_id, cached=True)
+    return {"content": hit['content'], "tokens_used": hit['tokens'], "model": hit['model'],
+            "cached": True}, key
+
+def _run_spec_job(interaction_type, kind, params, project_id, key, progress=None):
+    """Job worker: uretir, sonucu ai_response_cache'e ve ai_interaction_log'a yazar"""
+    started = time.perf_counter()
+    result = ai_service.generate(kind, progress, **params)
+    elapsed_ms = round((time.perf_counter() - started) * 1000)
+    _log_ai_interaction(interaction_type, json.dumps(params), result['content'], result['model'],
+                        result['tokens_used'], elapsed_ms, project_id=project_id)
+    with app.app_context():
+        try:
+            ai_cache.put(get_db_connection(), key, interaction_type, result['model'],
+                         result['content'], result['tokens_used'])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    result['cached'] = False
+    return result
+
+def _submit_spec(interaction_type, kind):
+    """Cache isabetinde 200 + sonuc; aksi halde 202 + job"""
+    try:
+        data = request.json or {}
+        params = _spec_params(data)
+        project_id = _ai_project_id(data)
+        hit, key = _cached_spec(interaction_type, params, project_id)
+        if hit is not None:
+            return jsonify({"status": "done", "cached": True, "result": hit})
+        job = ai_jobs.submit(interaction_type, _run_spec_job, interaction_type, kind, params, project_id, key)
+        return _ai_job_accepted(job)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def _stream_spec(interaction_type, kind):
+    """Cache isabetinde icerik tek 'chunk' + 'done' olarak doner; aksi halde canli akis"""
+    data = request.json or {}
+    params = _spec_params(data)
+    project_id = _ai_project_id(data)
+    hit, key = _cached_spec(interaction_type, params, project_id)
+    input_text = json.dumps(params)
+    if hit is not None:
+        summary = {
+            "tokens_in": ai_service.estimate_tokens(input_text),
+            "tokens_out": hit['tokens_used'],
+            "time_to_first_token_ms": 0,
+            "total_ms": 0,
+            "model": hit['model'],
+            "cached": True,
+        }
+        return _sse_response(iter([_sse('chunk', {"text": hit['content']}), _sse('done', summary)]))
+    return _stream_ai(interaction_type, kind, params, input_text, project_id=project_id, cache_key=key)
+
+def _ai_job_accepted(job, status_endpoint='get_ai_job', events_endpoint='stream_ai_job', **extra):
+    """202 + job id; istemci status_url'i poll eder veya events_url'e (SSE) baglanir"""
+    status_url = url_for(status_endpoint, job_id=job.id)
+    response = jsonify({
+        "status": "queued",
+        "job_id": job.id,
+        "status_url": status_url,
+        "events_url": url_for(events_endpoint, job_id=job.id),
+        **extra
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+@app.route('/api/ai/generate-fs', methods=['POST'])
+def generate_fs_content():
+    """AI ile Functional Spec içeriği üret (Mock) - cache'te yoksa arka planda job olarak calisir"""
+    return _submit_spec('generate-fs', 'fs')
+
+@app.route('/api/ai/generate-fs/stream', methods=['POST'])
+def stream_fs_content():
+    """Functional Spec icerigini SSE ile parca parca uret"""
+    return _stream_spec('generate-fs', 'fs')
+
 @app.route('/api/ai/generate-ts', methods=['POST'])
 def generate_ts_content():
-    """AI ile Technical Spec içeriği üret (Mock)"""
-    try:
-        data = request.json
-        requirement_code = data.get('requirement_code', 'REQ-001')
-        requirement_title = data.get('requirement_title', 'Requirement')
-        module = data.get('module', 'MM')
-        
-        time.sleep(1)
-        
-        # Mock TS içeriği
-        content = f"""# Technical Specification
-## {requirement_code} - {requirement_title}
-
-### 1. Technical Overview
-- **Development Type:** Enhancement
-- **Package:** Z{module}_CUSTOM
-- **Transport:** To be assigned
-
-### 2. Development Objects
-
-#### 2.1 Custom Tables
-```
-Table: Z{module}_CUSTOM_DATA
-Fields:
-  - MANDT (Client)
-  - DOCNR (Document Number) - Key
-  - BUKRS (Company Code)
-  - ERDAT (Created Date)
-  - ERNAM (Created By)
-  - STATUS (Status)
-```
-
-#### 2.2 Function Modules
-```abap
-FUNCTION Z_{module}_PROCESS_DATA
-  IMPORTING
-    IV_DOCNR TYPE ZDOCNR
-    IV_BUKRS TYPE BUKRS
-  EXPORTING
-    EV_STATUS TYPE ZSTATUS
-  EXCEPTIONS
-    NOT_FOUND
-    INVALID_INPUT.
-```
-
-### 3. Implementation Details
-
-#### 3.1 Main Logic (Pseudo-code)
-```abap
-METHOD process_document.
-  " 1. Validate input
-  IF iv_docnr IS INITIAL.
-    RAISE EXCEPTION invalid_input.
-  ENDIF.
-  
-  " 2. Read master data
-  SELECT SINGLE * FROM z{module.lower()}_custom_data
-    INTO @DATA(ls_data)
-    WHERE docnr = @iv_docnr.
-    
-  " 3. Execute business logic
-  CASE ls_data-status.
-    WHEN '01'. " New
-      perform_initial_processing( ).
-    WHEN '02'. " In Process
-      perform_update_processing( ).
-  ENDCASE.
-  
-  " 4. Update status
-  UPDATE z{module.lower()}_custom_data
-    SET status = '03'
-    WHERE docnr = iv_docnr.
-ENDMETHOD.
-```
-
-### 4. Error Handling
-| Error Code | Message | Action |
-|------------|---------|--------|
-| 001 | Document not found | Display error, return |
-| 002 | Invalid status | Log warning, skip |
-| 003 | Authorization failed | Raise exception |
-
-### 5. Performance Considerations
-- Use buffered tables where possible
-- Implement parallel processing for mass operations
-- Add appropriate indexes
-
-### 6. Unit Test Cases
-- Test Case 1: Valid document processing
-- Test Case 2: Invalid input handling
-- Test Case 3: Authorization check
-
----
-*Generated by AI Co-Pilot*
-"""
+    """AI ile Technical Spec içeriği üret (Mock) - cache'te yoksa arka planda job olarak calisir"""
+    return _submit_spec('generate-ts', 'ts')
+
+@app.route('/api/ai/generate-ts/stream', methods=['POST'])
+def stream_ts_content():
+    """Technical Spec icerigini SSE ile parca parca uret"""
+    return _stream_spec('generate-ts', 'ts')
+
+def _wricef_spec_params(item):
+    return {'requirement_code': item.code, 'requirement_title': item.title, 'module': item.module or 'MM'}
+
+def _run_spec_batch(interaction_type, kind, item_ids, progress=None):
+    """Batch job worker: cache isabetleri hemen, kalanlar sinirli eszamanlilikla uretilir;
+    sonuclar wricef_items.fs_content/ts_content'e gruplar halinde yazilir"""
+    column = 'fs_content' if kind == 'fs' else 'ts_content'
+    with app.app_context():
+        conn = get_db_connection()
+        model = ai_service.get_backend().model
+        items = {item.id: item for item in WricefItem.query.filter(WricefItem.id.in_(item_ids)).all()}
+        requests_by_id, ready, tasks = {}, [], []
+        for item_id in item_ids:
+            item = items.get(item_id)
+            if item is None:
+                continue
+            params = _wricef_spec_params(item)
+            key = ai_cache_key(interaction_type, params, model)
+            requests_by_id[item_id] = (item.project_id, params, key)
+            hit = ai_cache.get(conn, key)
+            if hit is not None:
+                ready.append((item_id, {"content": hit['content'], "tokens_used": hit['tokens'],
+                                        "model": hit['model'], "cached": True, "elapsed_ms": 0}))
+            else:
+                tasks.append((item_id, params))
+        db.session.commit()
+
+        def generate(params):
+            return ai_service.generate(kind, **params)
+
+        def flush(batch):
+            try:
+                conn.executemany(f"UPDATE wricef_items SET {column} = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                                 [(result['content'], item_id) for item_id, result in batch])
+                for item_id, result in batch:
+                    project_id, params, key = requests_by_id[item_id]
+                    if not result.get('cached'):
+                        ai_cache.put(conn, key, interaction_type, result['model'], result['content'],
+                                     result['tokens_used'])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            for item_id, result in batch:
+                project_id, params, key = requests_by_id[item_id]
+                _log_ai_interaction(interaction_type, json.dumps(params), result['content'], result['model'],
+                                    result['tokens_used'], result['elapsed_ms'], project_id=project_id,
+                                    cached=bool(result.get('cached')))
+
+        result = run_batch(tasks, generate, flush, concurrency=app.config['AI_BATCH_CONCURRENCY'],
+                           flush_size=app.config['AI_BATCH_FLUSH_SIZE'], progress=progress, ready=ready)
+        missing = [item_id for item_id in item_ids if item_id not in items]
+        result['items'].extend({'id': item_id, 'status': 'failed', 'error': 'Not found'} for item_id in missing)
+        result['failed'] += len(missing)
+        result['total'] += len(missing)
+        return result
+
+def _submit_spec_batch(interaction_type, kind):
+    """{"ids": [...]} veya {"project_id": ..., "only_missing": bool} → 202 + batch job"""
+    try:
+        data = request.json or {}
+        column = WricefItem.fs_content if kind == 'fs' else WricefItem.ts_content
+        if data.get('ids'):
+            item_ids = [int(item_id) for item_id in data['ids']]
+        elif data.get('project_id') is not None:
+            query = db.session.query(WricefItem.id).filter(WricefItem.project_id == data['project_id'])
+            if data.get('only_missing'):
+                query = query.filter((column.is_(None)) | (column == ''))
+            item_ids = [row.id for row in query.order_by(WricefItem.id)]
+        else:
+            return jsonify({"error": "ids or project_id is required"}), 400
+        if not item_ids:
+            return jsonify({"error": "No WRICEF items matched"}), 400
+        job = ai_jobs.submit(f'{interaction_type}-batch', _run_spec_batch, interaction_type, kind, item_ids)
+        return _ai_job_accepted(job, total=len(item_ids))
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ai/generate-fs/batch', methods=['POST'])
+def generate_fs_batch():
+    """WRICEF ogeleri icin toplu Functional Spec uretimi (tek job)"""
+    return _submit_spec_batch('generate-fs', 'fs')
+
+@app.route('/api/ai/generate-ts/batch', methods=['POST'])
+def generate_ts_batch():
+    """WRICEF ogeleri icin toplu Technical Spec uretimi (tek job)"""
+    return _submit_spec_batch('generate-ts', 'ts')
+
+def _job_status(jobs, job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(job)
+
+def _job_events(jobs, job_id):
+    if jobs.get(job_id) is None:
+        return jsonify({"error": "Not found"}), 404
+
+    def generate():
+        version = -1
+        while True:
+            job = jobs.wait_for_change(job_id, version, timeout=AI_JOB_KEEPALIVE_S)
+            if job is None:
+                if jobs.get(job_id) is None:
+                    return
+                yield ": keepalive\n\n"
+                continue
+            version = job['version']
+            yield _sse(job['status'], job, event_id=version)
+            if job['status'] in ('done', 'failed'):
+                return
+
+    return _sse_response(generate())
+
+@app.route('/api/ai/jobs/<job_id>', methods=['GET'])
+def get_ai_job(job_id):
+    """AI job durumu ve sonucu"""
+    return _job_status(ai_jobs, job_id)
+
+@app.route('/api/ai/jobs/<job_id>/events', methods=['GET'])
+def stream_ai_job(job_id):
+    """AI job durum degisiklikleri (Server-Sent Events); job bitince akis kapanir"""
+    return _job_events(ai_jobs, job_id)
+
+@app.route('/api/ai/similar', methods=['GET'])
+def get_similar_entities():
+    """ai_embedding uzerinden top-k cosine benzerligi (ornegin duplicate defect, benzer requirement)"""
+    entity_type = request.args.get('entity_type')
+    entity_id = request.args.get('entity_id', type=int)
+    k = request.args.get('k', 10, type=int)
+    project_id = request.args.get('project_id', type=int)
+    if not entity_type or entity_id is None:
+        return jsonify({"error": "entity_type and entity_id are required"}), 400
+    if entity_type not in EMBEDDING_SOURCES:
+        return jsonify({"error": f"entity_type must be one of {', '.join(EMBEDDING_SOURCES)}"}), 400
+    if not 1 <= k <= 100:
+        return jsonify({"error": "k must be between 1 and 100"}), 400
+    try:
+        results = vector_index.similar(get_db_connection(), entity_type, entity_id, k=k, project_id=project_id)
+        if results is None:
+            return jsonify({"error": "No embedding for this entity"}), 404
         return jsonify({
-            "status": "success", 
-            "content": content,
-            "tokens_used": random.randint(800, 2000)
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "results": [{"entity_id": other_id, "score": round(score, 4)} for other_id, score in results]
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -873,36 +1091,49 @@ def analyze_gap():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/ai/usage', methods=['GET'])
+def get_ai_usage():
+    """Gunluk AI kullanimi (model x interaction_type): token, maliyet, gecikme yuzdelikleri.
+    Yalnizca ai_usage_daily rollup'larini okur; ?from=&to= (YYYY-MM-DD), ?model=, ?interaction_type="""
+    try:
+        conn = get_db_connection()
+        return jsonify(ai_log.usage(conn, request.args.get('from'), request.args.get('to'),
+                                    request.args.get('model'), request.args.get('interaction_type')))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+AI_CHAT_SUGGESTIONS = [
+    "Generate Technical Spec",
+    "Show similar requirements",
+    "Estimate effort"
+]
+
 @app.route('/api/ai/chat', methods=['POST'])
 def ai_chat():
-    """AI Chat endpoint (Mock)"""
+    """AI Chat endpoint (Mock) - tek JSON yanit; akis icin /api/ai/chat/stream"""
     try:
         data = request.json
         message = data.get('message', '')
-        context = data.get('context', '')
-        
-        time.sleep(0.5)
-        
-        # Mock yanıtlar
-        responses = [
-            f"Based on your question about '{message[:50]}...', I recommend reviewing the standard SAP functionality first. This approach typically reduces development effort by 40%.",
-            f"Great question! For '{message[:30]}...', the best practice in SAP S/4HANA is to use Fiori apps where possible. This ensures future compatibility.",
-            f"I've analyzed your request. The technical implementation for '{message[:30]}...' would require a custom enhancement. I can help you draft the technical specification.",
-            f"Looking at '{message[:30]}...', this seems like a common requirement. SAP provides standard solutions through Business Add-Ins (BAdIs) that we can leverage.",
-            f"For '{message[:30]}...', I suggest we break this down into smaller components. This will make testing and maintenance easier."
-        ]
+        started = time.perf_counter()
+        result = ai_service.generate('chat', message=message, context=data.get('context', ''))
+        _log_ai_interaction('chat', message, result['content'], result['model'], result['tokens_used'],
+                            round((time.perf_counter() - started) * 1000))
         
         return jsonify({
             "status": "success",
-            "response": random.choice(responses),
-            "suggestions": [
-                "Generate Technical Spec",
-                "Show similar requirements",
-                "Estimate effort"
-            ]
+            "response": result['content'],
+            "suggestions": AI_CHAT_SUGGESTIONS
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ai/chat/stream', methods=['POST'])
+def ai_chat_stream():
+    """AI Chat yanitini SSE ile parca parca gonder"""
+    data = request.json or {}
+    message = data.get('message', '')
+    return _stream_ai('chat', 'chat', {'message': message, 'context': data.get('context', '')}, message,
+                      extra={"suggestions": AI_CHAT_SUGGESTIONS})
     cat >> app.py << 'APIEOF'
 
 # ============== ATTENDEES API ==============
@@ -1054,20 +1285,21 @@ def delete_minute(id):
 def get_actions():
     session_id = request.args.get('session_id')
     project_id = request.args.get('project_id')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
         if session_id:
-            actions = conn.execute('SELECT * FROM action_items WHERE session_id = ? ORDER BY due_date', (session_id,)).fetchall()
+            query = ACTIONS_SQL + ' AND a.session_id = ?'
+            params = [session_id]
         elif project_id:
-            actions = conn.execute('''
-                SELECT a.* FROM action_items a
-                JOIN analysis_sessions s ON a.session_id = s.id
-                WHERE s.project_id = ? ORDER BY a.due_date
-            ''', (project_id,)).fetchall()
+            query = ACTIONS_BY_PROJECT_SQL
+            params = [project_id]
         else:
-            actions = conn.execute('SELECT * FROM action_items ORDER BY due_date').fetchall()
+            query = ACTIONS_SQL
+            params = []
+        actions = fetch_page(conn, query, params, ACTIONS_KEYSET, page)
         conn.close()
-        return jsonify([dict(row) for row in actions])
+        return rows_response(actions, ACTIONS_KEYSET, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1094,6 +1326,7 @@ def add_action():
               data.get("priority", "Medium"), data.get("status", "Open"), data.get("notes")))
         
         conn.commit()
+        stats_cache.invalidate(project_id)
         conn.close()
         return jsonify({"status": "success", "action_id": auto_id}), 201
     except Exception as e:
@@ -1107,6 +1340,7 @@ def update_action(id):
         conn.execute('UPDATE action_items SET status = ?, completion_date = ?, notes = ? WHERE id = ?',
             (data.get('status'), data.get('completion_date'), data.get('notes'), id))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"}), 200
     except Exception as e:
@@ -1118,6 +1352,7 @@ def delete_action(id):
         conn = get_db_connection()
         conn.execute('DELETE FROM action_items WHERE id = ?', (id,))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"}), 200
     except Exception as e:
@@ -1129,16 +1364,20 @@ def delete_action(id):
 def get_decisions():
     session_id = request.args.get('session_id')
     project_id = request.args.get('project_id')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
+        query = DECISIONS_SQL
+        params = []
         if session_id:
-            decisions = conn.execute('SELECT * FROM decisions WHERE session_id = ? ORDER BY created_at DESC', (session_id,)).fetchall()
+            query += ' AND session_id = ?'
+            params.append(session_id)
         elif project_id:
-            decisions = conn.execute('SELECT * FROM decisions WHERE project_id = ? ORDER BY created_at DESC', (project_id,)).fetchall()
-        else:
-            decisions = conn.execute('SELECT * FROM decisions ORDER BY created_at DESC').fetchall()
+            query += ' AND project_id = ?'
+            params.append(project_id)
+        decisions = fetch_page(conn, query, params, DECISIONS_KEYSET, page)
         conn.close()
-        return jsonify([dict(row) for row in decisions])
+        return rows_response(decisions, DECISIONS_KEYSET, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1179,9 +1418,10 @@ def get_risks():
     session_id = request.args.get('session_id')
     project_id = request.args.get('project_id')
     item_type = request.args.get('type')
+    page = parse_page_args(request.args)
     try:
         conn = get_db_connection()
-        query = 'SELECT * FROM risks_issues WHERE 1=1'
+        query = RISKS_SQL
         params = []
         if session_id:
             query += ' AND session_id = ?'
@@ -1192,10 +1432,9 @@ def get_risks():
         if item_type:
             query += ' AND type = ?'
             params.append(item_type)
-        query += ' ORDER BY risk_score DESC, created_at DESC'
-        risks = conn.execute(query, params).fetchall()
+        risks = fetch_page(conn, query, params, RISKS_KEYSET, page)
         conn.close()
-        return jsonify([dict(row) for row in risks])
+        return rows_response(risks, RISKS_KEYSET, page)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1236,6 +1475,7 @@ def add_risk():
               data.get("status", "Open"), data.get("target_resolution_date"), data.get("notes")))
         
         conn.commit()
+        stats_cache.invalidate(project_id)
         conn.close()
         return jsonify({"status": "success", "item_id": auto_id}), 201
     except Exception as e:
@@ -1245,26 +1485,21 @@ def add_risk():
 
 @app.route('/api/analysis/stats', methods=['GET'])
 def get_analysis_stats():
-    project_id = request.args.get('project_id')
+    project_id = request.args.get('project_id', type=int)
     try:
+        if not project_id:
+            return jsonify({"total_sessions": 0, "fit_count": 0, "gap_count": 0,
+                            "open_questions": 0, "open_actions": 0, "high_risks": 0})
         conn = get_db_connection()
-        if project_id:
-            total_sessions = conn.execute('SELECT COUNT(*) FROM analysis_sessions WHERE project_id = ?', (project_id,)).fetchone()[0]
-            fit_count = conn.execute('''SELECT COUNT(*) FROM fitgap f JOIN analysis_sessions s ON f.session_id = s.id WHERE s.project_id = ? AND f.status = 'Fit' ''', (project_id,)).fetchone()[0]
-            gap_count = conn.execute('''SELECT COUNT(*) FROM fitgap f JOIN analysis_sessions s ON f.session_id = s.id WHERE s.project_id = ? AND f.status != 'Fit' ''', (project_id,)).fetchone()[0]
-            open_questions = conn.execute('''SELECT COUNT(*) FROM questions q JOIN analysis_sessions s ON q.session_id = s.id WHERE s.project_id = ?''', (project_id,)).fetchone()[0]
-            open_actions = conn.execute('''SELECT COUNT(*) FROM action_items a JOIN analysis_sessions s ON a.session_id = s.id WHERE s.project_id = ? AND a.status = 'Open' ''', (project_id,)).fetchone()[0]
-            high_risks = conn.execute("SELECT COUNT(*) FROM risks_issues WHERE project_id = ? AND risk_score >= 6", (project_id,)).fetchone()[0]
-        else:
-            total_sessions = fit_count = gap_count = open_questions = open_actions = high_risks = 0
+        stats = stats_cache.get(project_id, lambda: load_project_stats(conn, project_id))
         conn.close()
         return jsonify({
-            "total_sessions": total_sessions,
-            "fit_count": fit_count,
-            "gap_count": gap_count,
-            "open_questions": open_questions,
-            "open_actions": open_actions,
-            "high_risks": high_risks
+            "total_sessions": stats['total_sessions'],
+            "fit_count": stats['fit_count'],
+            "gap_count": stats['gap_count'],
+            "open_questions": stats['total_questions'],
+            "open_actions": stats['open_actions'],
+            "high_risks": stats['high_risks']
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1294,6 +1529,7 @@ def update_question(id):
             (data.get('question_text'), data.get('answer_text'), data.get('status'),
              data.get('assigned_to'), data.get('due_date'), id))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"})
     except Exception as e:
@@ -1325,6 +1561,7 @@ def update_fitgap(id):
              data.get("sap_standard_solution"), data.get("decision_rationale"),
              data.get("related_decision_id"), data.get("related_wricef_id"), id))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"})
     except Exception as e:
@@ -1353,6 +1590,7 @@ def update_action_full(id):
             (data.get('title'), data.get('description'), data.get('assigned_to'),
              data.get('due_date'), data.get('priority'), data.get('status'), id))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"})
     except Exception as e:
@@ -1420,6 +1658,7 @@ def update_risk(id):
              data.get('contingency_plan'), data.get('owner'), data.get('status'),
              data.get('scenario_id'), data.get('related_gap_id'), data.get('related_wricef_id'), id))
         conn.commit()
+        stats_cache.invalidate()
         conn.close()
         return jsonify({"status": "success"})
     except Exception as e:
@@ -1427,15 +1666,28 @@ def update_risk(id):
 
 # ============== SCENARIOS API ==============
 
+def _sync_scenario_edges(scenario):
+    """included_scenario_ids → scenario_edge; (cozulemeyen token'lar, dongu hatasi veya None)"""
+    conn = get_db_connection()
+    _, unresolved = scenario_graph.sync(conn, scenario.id, scenario.project_id, scenario.included_scenario_ids,
+                                        bool(scenario.is_composite))
+    cycle = scenario_graph.load(conn, scenario.project_id).cycle_of(scenario.id)
+    if cycle:
+        codes = [code or str(scenario_id) for scenario_id, code in
+                 db.session.query(Scenario.id, Scenario.code).filter(Scenario.id.in_(cycle)).order_by(Scenario.id)]
+        return unresolved, f"Inclusion cycle between scenarios {', '.join(codes)}"
+    return unresolved, None
+
 @app.route('/api/scenarios', methods=['GET'])
 def get_scenarios():
     project_id = request.args.get('project_id')
+    options, serialize = _includes(Scenario)
     try:
-        query = Scenario.query
+        query = Scenario.query.options(*options)
         if project_id:
             query = query.filter(Scenario.project_id == project_id)
         scenarios = query.order_by(Scenario.created_at.desc()).all()
-        return jsonify([scenario.to_dict() for scenario in scenarios])
+        return jsonify([serialize(scenario) for scenario in scenarios])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1458,18 +1710,26 @@ def add_scenario():
             included_scenario_ids=data.get('included_scenario_ids')
         )
         db.session.add(scenario)
+        db.session.flush()
+        unresolved, cycle = _sync_scenario_edges(scenario)
+        if cycle:
+            db.session.rollback()
+            return jsonify({"error": cycle}), 400
         db.session.commit()
-        return jsonify({"status": "success", "scenario_id": auto_id, "id": scenario.id}), 201
+        scenario_graph_cache.invalidate(scenario.project_id)
+        return jsonify({"status": "success", "scenario_id": auto_id, "id": scenario.id,
+                        "unresolved_inclusions": unresolved}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/scenarios/<int:id>', methods=['GET'])
 def get_scenario_by_id(id):
+    options, serialize = _includes(Scenario)
     try:
-        scenario = Scenario.query.get(id)
+        scenario = Scenario.query.options(*options).filter(Scenario.id == id).first()
         if scenario:
-            return jsonify(scenario.to_dict())
+            return jsonify(serialize(scenario))
         return jsonify({"error": "Not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1490,8 +1750,15 @@ def update_scenario(id):
         if 'is_composite' in data:
             scenario.is_composite = bool(data.get('is_composite'))
         scenario.included_scenario_ids = data.get('included_scenario_ids', scenario.included_scenario_ids)
+        unresolved = []
+        if 'included_scenario_ids' in data or 'is_composite' in data:
+            unresolved, cycle = _sync_scenario_edges(scenario)
+            if cycle:
+                db.session.rollback()
+                return jsonify({"error": cycle}), 400
         db.session.commit()
-        return jsonify({"status": "success"})
+        scenario_graph_cache.invalidate(scenario.project_id)
+        return jsonify({"status": "success", "unresolved_inclusions": unresolved})
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -1499,15 +1766,40 @@ def update_scenario(id):
 @app.route('/api/scenarios/<int:id>', methods=['DELETE'])
 def delete_scenario(id):
     try:
+        project_id = db.session.query(Scenario.project_id).filter(Scenario.id == id).scalar()
         deleted = Scenario.query.filter(Scenario.id == id).delete()
         if deleted == 0:
             return jsonify({"error": "Not found"}), 404
+        scenario_graph.remove(get_db_connection(), id)
         db.session.commit()
+        scenario_graph_cache.invalidate(project_id)
         return jsonify({"status": "success"})
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/scenarios/<int:id>/expanded', methods=['GET'])
+def get_expanded_scenario(id):
+    """Composite senaryonun tum yaprak senaryolari ve bagli test case'leri (tekillestirilmis)"""
+    try:
+        scenario = db.session.get(Scenario, id)
+        if not scenario:
+            return jsonify({"error": "Not found"}), 404
+        conn = get_db_connection()
+        graph = scenario_graph_cache.get(scenario.project_id, lambda: scenario_graph.load(conn, scenario.project_id))
+        descendants = graph.descendants(id)
+        leaves = Scenario.query.filter(Scenario.id.in_(graph.leaves(id))).order_by(Scenario.id).all()
+        test_cases = scenario_graph.test_cases(conn, descendants | {id})
+        return jsonify({
+            "scenario": scenario.to_dict(),
+            "descendant_count": len(descendants - {id}),
+            "leaves": [leaf.to_dict() for leaf in leaves],
+            "test_cases": test_cases,
+            "cycle": graph.cycle_of(id),
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 
 # ============== ANALYSES API (Epic A) ==============
@@ -1567,6 +1859,7 @@ def create_analysis(scenario_id):
                     (scenario.project_id, session_name, 'Planned', scenario_id)
                 )
                 conn.commit()
+                stats_cache.invalidate(scenario.project_id)
                 session_id = cursor.lastrowid
         conn.close()
 
@@ -1643,9 +1936,9 @@ def get_wricefs():
         project_id = request.args.get('project_id')
         conn = get_db_connection()
         if project_id:
-            rows = conn.execute('SELECT * FROM wricef WHERE project_id = ? ORDER BY id DESC', (project_id,)).fetchall()
+            rows = conn.execute(WRICEF_BY_PROJECT_SQL, (project_id,)).fetchall()
         else:
-            rows = conn.execute('SELECT * FROM wricef ORDER BY id DESC').fetchall()
+            rows = conn.execute(WRICEF_SQL).fetchall()
         conn.close()
         return jsonify([dict(row) for row in rows])
     except Exception as e:
@@ -1741,14 +2034,16 @@ def update_decision_full(id):
 def get_new_requirements():
     project_id = request.args.get('project_id')
     session_id = request.args.get('session_id')
+    page = parse_page_args(request.args)
+    options, serialize = _includes(Requirement, page)
     try:
-        query = Requirement.query
+        query = Requirement.query.options(*options)
         if session_id:
             query = query.filter(Requirement.session_id == session_id)
         elif project_id:
             query = query.filter(Requirement.project_id == project_id)
-        requirements = query.order_by(Requirement.created_at.desc()).all()
-        return jsonify([requirement.to_dict() for requirement in requirements])
+        requirements, next_cursor = query_page(query, Requirement, [Requirement.created_at, Requirement.id], page)
+        return objects_response(requirements, next_cursor, page, serialize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1778,12 +2073,56 @@ def add_new_requirement():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/new_requirements/import', methods=['POST'])
+def import_new_requirements():
+    """CSV/XLSX workshop export'unu toplu ice aktar (multipart `file` veya ham govde).
+    ?project_id=&format=csv|xlsx&dry_run=1 — satir bazli hata raporu doner"""
+    project_id = request.args.get('project_id', type=int) or request.form.get('project_id', type=int)
+    if project_id is None:
+        return jsonify({"error": "project_id is required"}), 400
+    if db.session.get(Project, project_id) is None:
+        return jsonify({"error": "Project not found"}), 404
+    upload = request.files.get('file')
+    filename = (upload.filename if upload else '') or ''
+    fmt = request.args.get('format') or ('xlsx' if filename.lower().endswith('.xlsx') else 'csv')
+    stream = upload.stream if upload else request.stream
+    if fmt == 'xlsx' and upload is None:
+        # openpyxl seek eder; ham govde bir kez okunabilir
+        spooled = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+        shutil.copyfileobj(request.stream, spooled)
+        spooled.seek(0)
+        stream = spooled
+    conn = get_db_connection()
+
+    def on_batch(inserted_ids, updated_codes):
+        if not app.config['EMBEDDING_PIPELINE']:
+            return
+        ids = list(inserted_ids)
+        if updated_codes:
+            placeholders = ', '.join('?' * len(updated_codes))
+            ids += [row[0] for row in conn.execute(
+                f"SELECT id FROM new_requirements WHERE project_id = ? AND code IN ({placeholders})",
+                [project_id, *updated_codes])]
+        embedding_pipeline.enqueue({('requirement', req_id): EMBEDDING_UPSERT for req_id in ids})
+
+    try:
+        report = requirement_import.import_requirements(
+            conn, stream, fmt, project_id, dry_run=request.args.get('dry_run') in ('1', 'true'),
+            on_batch=on_batch)
+        return jsonify(report)
+    except requirement_import.ImportFileError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/new_requirements/<int:req_id>', methods=['GET'])
 def get_new_requirement_detail(req_id):
+    options, serialize = _includes(Requirement)
     try:
-        requirement = Requirement.query.get(req_id)
+        requirement = Requirement.query.options(*options).filter(Requirement.id == req_id).first()
         if requirement:
-            return jsonify(requirement.to_dict())
+            return jsonify(serialize(requirement))
         return jsonify({"error": "Not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1808,6 +2147,9 @@ def update_new_requirement(req_id):
         return jsonify({"error": str(e)}), 500
 
 
+# classification → donusum hedefi; Fit standart config, Gap/PartialFit gelistirme (WRICEF)
+CONVERSION_TARGETS = {'Fit': 'config', 'Gap': 'wricef', 'PartialFit': 'wricef', 'Partial Fit': 'wricef'}
+
 @app.route('/api/new-requirements/<int:req_id>/convert', methods=['POST'])
 def convert_requirement(req_id):
     try:
@@ -1818,11 +2160,10 @@ def convert_requirement(req_id):
         if requirement.conversion_status and requirement.conversion_status.lower() == 'converted':
             return jsonify({"error": "Already converted"}), 400
 
-        classification = (requirement.classification or '').strip()
-        conversion_type = None
+        conversion_type = CONVERSION_TARGETS.get((requirement.classification or '').strip())
         created_item = None
 
-        if classification == 'Fit':
+        if conversion_type == 'config':
             created_item = ConfigItem(
                 title=requirement.title,
                 config_type=requirement.module or 'standard',
@@ -1831,8 +2172,7 @@ def convert_requirement(req_id):
                 project_id=requirement.project_id,
                 requirement_id=requirement.id
             )
-            conversion_type = 'config'
-        elif classification in ('Gap', 'PartialFit', 'Partial Fit'):
+        elif conversion_type == 'wricef':
             created_item = WricefItem(
                 title=requirement.title,
                 wricef_type='E',
@@ -1842,7 +2182,6 @@ def convert_requirement(req_id):
                 project_id=requirement.project_id,
                 requirement_id=requirement.id
             )
-            conversion_type = 'wricef'
         else:
             return jsonify({"error": "Invalid classification for conversion"}), 400
 
@@ -1866,19 +2205,121 @@ def convert_requirement(req_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def _conversion_rows(conversion_type, requirements, now):
+    """Hedef tablo icin insert satirlari; kodlar proje basina tek reserve ile ayrilir"""
+    model = ConfigItem if conversion_type == 'config' else WricefItem
+    by_project = {}
+    for requirement in requirements:
+        by_project.setdefault(requirement.project_id, []).append(requirement)
+    rows = []
+    for project_id, group in by_project.items():
+        codes = reserve_codes(model, project_id, CODE_PREFIXES[model.__name__], len(group))
+        for requirement, code in zip(group, codes):
+            row = {'project_id': project_id, 'requirement_id': requirement.id, 'code': code,
+                   'title': requirement.title, 'description': requirement.description,
+                   'module': requirement.module, 'created_at': now, 'updated_at': now}
+            if conversion_type == 'config':
+                row.update(config_type=requirement.module or 'standard', status='planned')
+            else:
+                row.update(wricef_type='E', status='identified')
+            rows.append(row)
+    return model, rows
+
+@app.route('/api/new-requirements/convert/batch', methods=['POST'])
+def convert_requirements_batch():
+    """Toplu Requirement → Config / WRICEF donusumu (tek transaction, toplu insert ve kod ayirma).
+    {"ids": [...]} veya {"analysis_id": ..., "classification": ...}; sonuc id bazinda doner,
+    daha once donusturulmus kayitlar mevcut hedefiyle 'already_converted' olarak raporlanir."""
+    try:
+        data = request.json or {}
+        classification = data.get('classification')
+        if data.get('ids'):
+            ids = list(dict.fromkeys(int(req_id) for req_id in data['ids']))
+            requirements = Requirement.query.filter(Requirement.id.in_(ids)).all()
+        elif data.get('analysis_id') is not None:
+            query = Requirement.query.filter(Requirement.analysis_id == data['analysis_id'])
+            if classification:
+                query = query.filter(Requirement.classification == classification)
+            requirements = query.order_by(Requirement.id).all()
+            ids = [requirement.id for requirement in requirements]
+        else:
+            return jsonify({"error": "ids or analysis_id is required"}), 400
+
+        found = {requirement.id: requirement for requirement in requirements}
+        results, pending = {}, {'config': [], 'wricef': []}
+        for req_id in ids:
+            requirement = found.get(req_id)
+            target = CONVERSION_TARGETS.get((requirement.classification or '').strip()) if requirement else None
+            if requirement is None:
+                results[req_id] = {"status": "failed", "error": "Not found"}
+            elif (requirement.conversion_status or '').lower() == 'converted':
+                results[req_id] = {"status": "already_converted",
+                                   "conversion_type": requirement.conversion_type or requirement.converted_item_type,
+                                   "created_item_id": requirement.converted_item_id}
+            elif classification and requirement.classification != classification:
+                results[req_id] = {"status": "skipped", "error": "Classification does not match filter"}
+            elif target is None:
+                results[req_id] = {"status": "failed", "error": "Invalid classification for conversion"}
+            elif requirement.project_id is None:
+                results[req_id] = {"status": "failed", "error": "Requirement has no project"}
+            else:
+                pending[target].append(requirement)
+
+        now = datetime.utcnow()
+        converted_by = data.get('converted_by')
+        updates = []
+        for conversion_type, group in pending.items():
+            if not group:
+                continue
+            model, rows = _conversion_rows(conversion_type, group, now)
+            item_ids = db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+            for requirement, row, item_id in zip(group, rows, item_ids):
+                updates.append(('converted', conversion_type, item_id, conversion_type, item_id,
+                                now.strftime('%Y-%m-%d %H:%M:%S.%f'), converted_by, requirement.id))
+                results[requirement.id] = {"status": "converted", "conversion_type": conversion_type,
+                                           "created_item_id": item_id, "item_code": row['code']}
+
+        if updates:
+            # Ayni kayitlari eszamanli donusturen baska bir istek varsa satir sayisi tutmaz
+            cursor = get_db_connection().executemany('''
+                UPDATE new_requirements
+                SET conversion_status = ?, conversion_type = ?, conversion_id = ?, converted_item_type = ?,
+                    converted_item_id = ?, converted_at = ?, converted_by = ?
+                WHERE id = ? AND LOWER(COALESCE(conversion_status, '')) <> 'converted'
+            ''', updates)
+            if cursor.rowcount != len(updates):
+                db.session.rollback()
+                return jsonify({"error": "Requirements were converted concurrently; retry the batch"}), 409
+        db.session.commit()
+        if updates and app.config['EMBEDDING_PIPELINE']:
+            # Toplu insert session olaylarini tetiklemez; yeni ogeler elle kuyruga konur
+            embedding_pipeline.enqueue({('config_item' if u[1] == 'config' else 'wricef', u[2]): EMBEDDING_UPSERT
+                                        for u in updates})
+
+        counts = {}
+        for result in results.values():
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        return jsonify({"total": len(ids), "counts": counts,
+                        "results": {str(req_id): results[req_id] for req_id in ids}})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 # ============== WRICEF ITEMS API (Phase 3.6 ORM) ==============
 @app.route('/api/wricef_items', methods=['GET'])
 def get_wricef_items():
     project_id = request.args.get('project_id')
     requirement_id = request.args.get('requirement_id')
+    page = parse_page_args(request.args)
+    options, serialize = _includes(WricefItem, page)
     try:
-        query = WricefItem.query
+        query = WricefItem.query.options(*options)
         if requirement_id:
             query = query.filter(WricefItem.requirement_id == requirement_id)
         elif project_id:
             query = query.filter(WricefItem.project_id == project_id)
-        items = query.order_by(WricefItem.created_at.desc()).all()
-        return jsonify([item.to_dict() for item in items])
+        items, next_cursor = query_page(query, WricefItem, [WricefItem.created_at, WricefItem.id], page)
+        return objects_response(items, next_cursor, page, serialize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1913,10 +2354,11 @@ def add_wricef_item():
 
 @app.route('/api/wricef_items/<int:item_id>', methods=['GET'])
 def get_wricef_item_detail(item_id):
+    options, serialize = _includes(WricefItem)
     try:
-        item = WricefItem.query.get(item_id)
+        item = WricefItem.query.options(*options).filter(WricefItem.id == item_id).first()
         if item:
-            return jsonify(item.to_dict())
+            return jsonify(serialize(item))
         return jsonify({"error": "Not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1972,7 +2414,7 @@ def convert_wricef_to_test(item_id):
         if not item:
             return jsonify({"error": "Not found"}), 404
 
-        code = f"TST-{int(datetime.utcnow().timestamp())}"
+        code = generate_code(TestCase, item.project_id, CODE_PREFIXES['TestCase'])
         test_case = TestCase(
             project_id=item.project_id,
             code=code,
@@ -1995,14 +2437,16 @@ def convert_wricef_to_test(item_id):
 def get_config_items():
     project_id = request.args.get('project_id')
     requirement_id = request.args.get('requirement_id')
+    page = parse_page_args(request.args)
+    options, serialize = _includes(ConfigItem, page)
     try:
-        query = ConfigItem.query
+        query = ConfigItem.query.options(*options)
         if requirement_id:
             query = query.filter(ConfigItem.requirement_id == requirement_id)
         elif project_id:
             query = query.filter(ConfigItem.project_id == project_id)
-        items = query.order_by(ConfigItem.created_at.desc()).all()
-        return jsonify([item.to_dict() for item in items])
+        items, next_cursor = query_page(query, ConfigItem, [ConfigItem.created_at, ConfigItem.id], page)
+        return objects_response(items, next_cursor, page, serialize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2032,10 +2476,11 @@ def add_config_item():
 
 @app.route('/api/config_items/<int:item_id>', methods=['GET'])
 def get_config_item_detail(item_id):
+    options, serialize = _includes(ConfigItem)
     try:
-        item = ConfigItem.query.get(item_id)
+        item = ConfigItem.query.options(*options).filter(ConfigItem.id == item_id).first()
         if item:
-            return jsonify(item.to_dict())
+            return jsonify(serialize(item))
         return jsonify({"error": "Not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -2083,7 +2528,7 @@ def convert_config_to_test(item_id):
         if not item:
             return jsonify({"error": "Not found"}), 404
 
-        code = f"TST-{int(datetime.utcnow().timestamp())}"
+        code = generate_code(TestCase, item.project_id, CODE_PREFIXES['TestCase'])
         test_case = TestCase(
             project_id=item.project_id,
             code=code,
@@ -2101,16 +2546,99 @@ def convert_config_to_test(item_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Toplu unit test uretimi: test_management.source_type → kaynak model
+UNIT_TEST_SOURCES = {'wricef': WricefItem, 'config': ConfigItem}
+
+def _has_steps(steps):
+    try:
+        return bool(json.loads(steps)) if steps else False
+    except ValueError:
+        return bool(steps.strip())
+
+@app.route('/api/test-cases/convert/batch', methods=['POST'])
+def convert_items_to_tests_batch():
+    """Proje (veya modul) icin WRICEF/Config unit_test_steps → TestCase, tek transaction.
+    {"project_id", "module"?, "source_types"?: ["wricef", "config"], "ids"?: {"wricef": [...]}}
+    Kodlar reserve_codes ile sirali ayrilir; ogenin senaryosu scenario_test_case'e baglanir.
+    Zaten test case'i olan ogeler 'already_exists', adimsiz ogeler 'skipped' raporlanir."""
+    try:
+        started = time.perf_counter()
+        data = request.json or {}
+        project_id = data.get('project_id')
+        if project_id is None:
+            return jsonify({"error": "project_id is required"}), 400
+        source_types = data.get('source_types') or list(UNIT_TEST_SOURCES)
+        unknown = [t for t in source_types if t not in UNIT_TEST_SOURCES]
+        if unknown:
+            return jsonify({"error": f"Unknown source_types: {', '.join(unknown)}"}), 400
+
+        existing = {(source_type.lower(), source_id) for source_type, source_id in db.session.query(
+            TestCase.source_type, TestCase.source_id).filter(TestCase.project_id == project_id,
+                                                             TestCase.source_id.isnot(None))}
+        results, items = {t: {} for t in source_types}, []
+        for source_type in source_types:
+            model = UNIT_TEST_SOURCES[source_type]
+            query = model.query.filter(model.project_id == project_id)
+            if data.get('module'):
+                query = query.filter(model.module == data['module'])
+            ids = (data.get('ids') or {}).get(source_type)
+            if ids is not None:
+                query = query.filter(model.id.in_([int(item_id) for item_id in ids]))
+            for item in query.order_by(model.id):
+                if (source_type, item.id) in existing:
+                    results[source_type][item.id] = {"status": "already_exists"}
+                elif not _has_steps(item.unit_test_steps):
+                    results[source_type][item.id] = {"status": "skipped", "error": "No unit_test_steps"}
+                else:
+                    items.append((source_type, item))
+
+        if items:
+            now = datetime.utcnow()
+            codes = reserve_codes(TestCase, project_id, CODE_PREFIXES['TestCase'], len(items))
+            rows = [{'project_id': project_id, 'code': code, 'test_type': 'unit', 'title': f"Unit Test: {item.title}",
+                     'source_type': source_type, 'source_id': item.id, 'status': 'not_started',
+                     'steps': item.unit_test_steps, 'created_at': now, 'updated_at': now}
+                    for (source_type, item), code in zip(items, codes)]
+            test_ids = db.session.scalars(
+                insert(TestCase).returning(TestCase.id, sort_by_parameter_order=True), rows).all()
+            links = [{'scenario_id': item.scenario_id, 'test_case_id': test_id, 'created_at': now}
+                     for (_, item), test_id in zip(items, test_ids) if item.scenario_id]
+            if links:
+                db.session.execute(insert(scenario_test_case).prefix_with('OR IGNORE'), links)
+            for (source_type, item), row, test_id in zip(items, rows, test_ids):
+                results[source_type][item.id] = {"status": "created", "test_case_id": test_id,
+                                                 "code": row['code'], "scenario_id": item.scenario_id}
+        db.session.commit()
+
+        elapsed_s = time.perf_counter() - started
+        counts = {}
+        for per_type in results.values():
+            for result in per_type.values():
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+        return jsonify({
+            "counts": counts,
+            "created": len(items),
+            "scenario_links": sum(1 for _, item in items if item.scenario_id),
+            "elapsed_ms": round(elapsed_s * 1000, 1),
+            "items_per_s": round(len(items) / elapsed_s, 1) if items else 0,
+            "results": {t: {str(item_id): r for item_id, r in per_type.items()} for t, per_type in results.items()}
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 # ============== TEST MANAGEMENT API (Phase 3.8 ORM) ==============
 @app.route('/api/test_management', methods=['GET'])
 def get_test_management():
     project_id = request.args.get('project_id')
+    page = parse_page_args(request.args)
+    options, serialize = _includes(TestCase, page)
     try:
-        query = TestCase.query
+        query = TestCase.query.options(*options)
         if project_id:
             query = query.filter(TestCase.project_id == project_id)
-        items = query.order_by(TestCase.created_at.desc()).all()
-        return jsonify([item.to_dict() for item in items])
+        items, next_cursor = query_page(query, TestCase, [TestCase.created_at, TestCase.id], page)
+        return objects_response(items, next_cursor, page, serialize)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2139,10 +2667,11 @@ def add_test_management():
 
 @app.route('/api/test_management/<int:item_id>', methods=['GET'])
 def get_test_management_detail(item_id):
+    options, serialize = _includes(TestCase)
     try:
-        item = TestCase.query.get(item_id)
+        item = TestCase.query.options(*options).filter(TestCase.id == item_id).first()
         if item:
-            return jsonify(item.to_dict())
+            return jsonify(serialize(item))
         return jsonify({"error": "Not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -2184,5 +2713,192 @@ def delete_test_management(item_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# ============== TRACEABILITY API ==============
+
+@app.route('/api/projects/<int:project_id>/traceability', methods=['GET'])
+def get_traceability(project_id):
+    """Scenario → ... → Defect matrisi; ?gap= kapsama filtresi, ?stream=ndjson|json, ?fields="""
+    gap = request.args.get('gap')
+    if gap is not None and gap not in traceability.GAPS:
+        return jsonify({"error": f"gap must be one of: {', '.join(traceability.GAPS)}"}), 400
+    page = parse_page_args(request.args)
+    try:
+        if db.session.get(Project, project_id) is None:
+            return jsonify({"error": "Project not found"}), 404
+        matrix = trace_cache.get(get_db_connection(), project_id)
+        rows = (project_row(row, page) for row in matrix.filter(gap))
+        response = stream_response(rows, page) if page.stream else jsonify(list(rows))
+        response.headers['X-Trace-Version'] = str(matrix.version)
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/projects/<int:project_id>/traceability/summary', methods=['GET'])
+def get_traceability_summary(project_id):
+    """Kapsama ozeti: requirement / deliverable / test case sayilari ve gap basina satir sayisi"""
+    try:
+        if db.session.get(Project, project_id) is None:
+            return jsonify({"error": "Project not found"}), 404
+        return jsonify(trace_cache.get(get_db_connection(), project_id).summary)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ============== SEARCH API ==============
+
+@app.route('/api/search', methods=['GET'])
+def search_entities():
+    """Requirement / WRICEF / config / dokuman / karar uzerinde FTS5 arama (bm25, highlight, sayfali)"""
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"error": "q is required"}), 400
+    types = [t for t in request.args.get('types', '').split(',') if t]
+    unknown = [t for t in types if t not in search_index.SOURCES]
+    if unknown:
+        return jsonify({"error": f"Unknown types: {', '.join(unknown)}"}), 400
+    try:
+        return jsonify(search_index.search(
+            get_db_connection(), text, project_id=request.args.get('project_id', type=int), types=types,
+            page=request.args.get('page', 1, type=int), per_page=request.args.get('per_page', 20, type=int)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ============== EXPORT API ==============
+
+def _run_export(out_dir, fmt, tables, project_id, since, progress=None):
+    """Export job worker: havuzdan ayri bir baglantiyla tablolari out_dir'e akitir"""
+    conn = pool.acquire()
+    try:
+        return data_export.export(conn, out_dir, fmt, tables=tables, project_id=project_id, since=since,
+                                  progress=progress)
+    finally:
+        conn.close()
+
+@app.route('/api/exports', methods=['POST'])
+def start_export():
+    """Parquet / Arrow export'u arka planda baslat; incremental ise son calismanin watermark'larindan devam eder"""
+    try:
+        data = request.json or {}
+        fmt = data.get('format', 'parquet')
+        if fmt not in data_export.FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(data_export.FORMATS)}"}), 400
+        tables = data.get('tables') or None
+        unknown = [name for name in tables or [] if name not in data_export.EXPORTS]
+        if unknown:
+            return jsonify({"error": f"Unknown tables: {', '.join(unknown)}"}), 400
+        project_id = data.get('project_id')
+        if project_id is not None:
+            try:
+                project_id = int(project_id)
+            except (TypeError, ValueError):
+                return jsonify({"error": "project_id must be an integer"}), 400
+        since, previous = None, None
+        if data.get('incremental'):
+            runs = data_export.list_runs(app.config['EXPORT_DIR'], project_id=project_id)
+            if runs:
+                previous = runs[0]['run_id']
+                since = data_export.watermarks(runs[0])
+        run_id = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        out_dir = os.path.join(app.config['EXPORT_DIR'], run_id)
+        job = export_jobs.submit('export', _run_export, out_dir, fmt, tables, project_id, since)
+        return _ai_job_accepted(job, 'get_export_job', 'stream_export_job', run_id=run_id,
+                                incremental_from=previous)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/exports', methods=['GET'])
+def list_exports():
+    """Tamamlanan export calismalarinin manifest'leri (en yeni once)"""
+    try:
+        return jsonify(data_export.list_runs(app.config['EXPORT_DIR'],
+                                             project_id=request.args.get('project_id', type=int)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/exports/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """Export job durumu; bitince result manifest'tir"""
+    return _job_status(export_jobs, job_id)
+
+@app.route('/api/exports/jobs/<job_id>/events', methods=['GET'])
+def stream_export_job(job_id):
+    """Export job durum degisiklikleri (Server-Sent Events)"""
+    return _job_events(export_jobs, job_id)
+
+@app.route('/api/exports/<run_id>/<filename>', methods=['GET'])
+def download_export(run_id, filename):
+    """Export dosyasini indir"""
+    return send_from_directory(app.config['EXPORT_DIR'], f'{run_id}/{filename}', as_attachment=True)
+
+# ============== SYSTEM API ==============
+@app.route('/api/system/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """Baglanti havuzu sayaclari (checkouts, waits, reuses)"""
+    return jsonify(pool.stats())
+
+@app.route('/api/system/stats-cache', methods=['GET'])
+def get_stats_cache_stats():
+    """Dashboard istatistik cache sayaclari (hits, misses, invalidations)"""
+    return jsonify(stats_cache.stats())
+
+@app.route('/api/system/trace-cache', methods=['GET'])
+def get_trace_cache_stats():
+    """Izlenebilirlik matrisi cache sayaclari"""
+    return jsonify(trace_cache.stats())
+
+@app.route('/api/system/ai-jobs', methods=['GET'])
+def get_ai_job_metrics():
+    """AI job kuyrugu: derinlik, bekleme ve calisma sureleri"""
+    return jsonify(ai_jobs.metrics())
+
+@app.route('/api/system/export-jobs', methods=['GET'])
+def get_export_job_metrics():
+    """Export job kuyrugu (tek worker): derinlik, bekleme ve calisma sureleri"""
+    return jsonify(export_jobs.metrics())
+
+@app.route('/api/system/ai-log', methods=['GET'])
+def get_ai_log_buffer_stats():
+    """AI log write-behind tamponu: bekleyen satir, flush sayisi ve hatalar"""
+    return jsonify(ai_log_buffer.stats())
+
+@app.route('/api/system/embeddings', methods=['GET'])
+def get_embedding_pipeline_metrics():
+    """Embedding pipeline: backlog, throughput, embed edilen / degismeyen / silinen sayilari"""
+    return jsonify(embedding_pipeline.metrics())
+
+@app.route('/api/system/embeddings/backfill', methods=['POST'])
+def backfill_embeddings():
+    """Tum Requirement / WRICEF / Config / Defect kayitlarini pipeline kuyruguna koy"""
+    try:
+        entity_types = (request.json or {}).get('entity_types') if request.is_json else None
+        return jsonify({"status": "queued", "queued": embedding_pipeline.backfill(entity_types)}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/system/ai-cache', methods=['GET'])
+def get_ai_cache_report():
+    """AI yanit cache'i: doluluk, proje basina hit orani ve tasarruf edilen token"""
+    try:
+        project_id = request.args.get('project_id', type=int)
+        ai_log_buffer.flush()
+        return jsonify(ai_cache.report(get_db_connection(), project_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/system/query-plans', methods=['GET'])
+def get_query_plans():
+    """Kayitli sorgular icin EXPLAIN QUERY PLAN; full scan yapanlari isaretler"""
+    try:
+        conn = get_db_connection()
+        results = audit_query_plans(conn)
+        conn.close()
+        return jsonify({
+            "queries": results,
+            "full_scans": [r['name'] for r in results if r['full_scan']]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080, debug=True)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Dual stack vs unified stack — lock waits under concurrent writes
+================================================================
+Her iş parçacığı bir istekteki tipik yazma desenini tekrarlar:
+raw SQL ile bir `questions` satırı + ORM ile bir `projects` satırı.
+
+  dual    : raw SQL kendi sqlite3 bağlantısında commit eder, ORM ayrı
+            bağlantıda commit eder (eski get_db_connection() davranışı)
+  unified : raw SQL SessionConnection ile db.session'ın bağlantısında
+            çalışır, tek commit (repository.SessionConnection)
+
+SQLite busy_timeout=0 ile açılır; "database is locked" hatası her
+alındığında kısa bir bekleme yapılıp tekrar denenir ve bu bekleme
+sayılır. Böylece iki modun yarattığı kilit beklemeleri doğrudan
+karşılaştırılabilir.
+
+Kullanım:
+  python benchmarks/bench_lock_waits.py --threads 8 --iterations 200
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from db_pool import SQLitePool
+from repository import SessionConnection
+
+RETRY_SLEEP = 0.001
+
+
+class LockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waits = 0
+        self.commits = 0
+
+    def add(self, waits=0, commits=0):
+        with self.lock:
+            self.waits += waits
+            self.commits += commits
+
+
+def with_retry(fn, stats):
+    waits = 0
+    while True:
+        try:
+            result = fn()
+            stats.add(waits=waits)
+            return result
+        except Exception as e:  # sqlite3.OperationalError / sqlalchemy OperationalError
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            waits += 1
+            time.sleep(RETRY_SLEEP)
+
+
+def setup_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY, project_code TEXT, project_name TEXT)")
+    conn.execute("CREATE TABLE questions (id INTEGER PRIMARY KEY, session_id INTEGER, question_text TEXT)")
+    conn.commit()
+    conn.close()
+
+
+def run_dual(path, session_factory, thread_no, iterations, stats):
+    for i in range(iterations):
+        def raw_write():
+            conn = sqlite3.connect(path, timeout=0)
+            try:
+                conn.execute("INSERT INTO questions (session_id, question_text) VALUES (?, ?)", (thread_no, f"q{i}"))
+                conn.commit()
+            finally:
+                conn.close()
+        with_retry(raw_write, stats)
+
+        def orm_write():
+            session = session_factory()
+            try:
+                session.execute(text("INSERT INTO projects (project_code, project_name) VALUES (:c, :n)"),
+                                {'c': f"T{thread_no}-{i}", 'n': 'bench'})
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        with_retry(orm_write, stats)
+        stats.add(commits=2)
+
+
+def run_unified(path, session_factory, thread_no, iterations, stats):
+    for i in range(iterations):
+        def write():
+            session = session_factory()
+            conn = SessionConnection(session)
+            try:
+                conn.execute("INSERT INTO questions (session_id, question_text) VALUES (?, ?)", (thread_no, f"q{i}"))
+                session.execute(text("INSERT INTO projects (project_code, project_name) VALUES (:c, :n)"),
+                                {'c': f"T{thread_no}-{i}", 'n': 'bench'})
+                conn.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        with_retry(write, stats)
+        stats.add(commits=1)
+
+
+def bench(mode, threads, iterations):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        setup_db(path)
+        pool = SQLitePool(path, size=threads, timeout=30)
+        # busy_timeout=0: kilit beklemesi Python tarafında sayılabilsin
+        pool.PRAGMAS = SQLitePool.PRAGMAS + ("PRAGMA busy_timeout=0",)
+        engine = create_engine('sqlite://', creator=pool.acquire, poolclass=NullPool)
+        session_factory = sessionmaker(bind=engine)
+        target = run_dual if mode == 'dual' else run_unified
+        stats = LockStats()
+
+        workers = [threading.Thread(target=target, args=(path, session_factory, n, iterations, stats))
+                   for n in range(threads)]
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+        pool.close_all()
+        return {
+            'mode': mode,
+            'requests': threads * iterations,
+            'commits': stats.commits,
+            'lock_waits': stats.waits,
+            'elapsed_s': round(elapsed, 3),
+            'req_per_s': round(threads * iterations / elapsed, 1),
+        }
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'requests':>8} {'commits':>8} {'lock_waits':>10} {'elapsed_s':>10} {'req/s':>8}")
+    for mode in ('dual', 'unified'):
+        r = bench(mode, args.threads, args.iterations)
+        print(f"{r['mode']:<8} {r['requests']:>8} {r['commits']:>8} {r['lock_waits']:>10} "
+              f"{r['elapsed_s']:>10} {r['req_per_s']:>8}")
+
+
+if __name__ == '__main__':
+    main()
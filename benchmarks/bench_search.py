@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+FTS5 search_index vs LIKE scan — full-text search over source tables
+=====================================================================
+Geçici bir veritabanında kaynak tablolar (new_requirements, wricef_items,
+config_items, documents, decisions) oluşturulur, search_index trigger'ları
+kurulur ve `--rows` adet sentetik satır (varsayılan 1M, tablolara dağıtılmış,
+project_id 1..50) eklenir. Ölçülenler:
+
+  insert      : trigger'lar açıkken satır ekleme hızı (rows/s)
+  size        : kaynak tablolar ve FTS index boyutu
+  like scan   : title/description/... üzerinde `LIKE '%term%'` (index öncesi)
+  fts         : search_index.search() — nadir / sık / önek / proje filtreli
+                sorgular, p50/p95; RANK_MAX_HITS üstündeki sonuçlar bm25
+                yerine rowid sırasıyla döner (bm25-ranked sütunu)
+  update      : metin kolonu değişen satırların trigger ile yeniden indekslenmesi
+
+LIKE taraması pahalı olduğu için `--scan-queries` (varsayılan 3) sorgu ile
+ölçülür.
+
+Kullanım:
+  python benchmarks/bench_search.py --rows 1000000 --queries 100
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search_index
+
+PROJECTS = 50
+VOCABULARY = 20000
+COMMON = ['pricing', 'invoice', 'approval', 'workflow', 'material', 'vendor', 'posting', 'report']
+BATCH = 10000
+
+
+def create_tables(conn):
+    for entity_type, (_, table, code, title, body) in search_index.SOURCES.items():
+        columns = ', '.join(f'{column} TEXT' for column in (code, title) + body)
+        conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, project_id INTEGER, status TEXT, {columns})")
+    search_index.install(conn)
+
+
+def words(rng, count):
+    """Zipf benzeri dağılım: sık kelimeler + uzun kuyruk (w0..wN)"""
+    out = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            out.append(rng.choice(COMMON))
+        else:
+            out.append(f'w{int(rng.paretovariate(1.1)) % VOCABULARY}')
+    return ' '.join(out)
+
+
+def populate(conn, rows, seed=1):
+    rng = random.Random(seed)
+    sources = list(search_index.SOURCES.values())
+    per_table = rows // len(sources)
+    for _, table, code, title, body in sources:
+        columns = ('project_id', 'status', code, title) + body
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        for start in range(0, per_table, BATCH):
+            conn.executemany(sql, [
+                (rng.randint(1, PROJECTS), 'Draft', f'{table[:3].upper()}-{start + i:07d}', words(rng, 6),
+                 *(words(rng, 40) for _ in body))
+                for i in range(min(BATCH, per_table - start))])
+            conn.commit()
+    return per_table * len(sources)
+
+
+def like_scan(conn, term, project_id=None):
+    """Index öncesi yol: her tabloda metin kolonlarına LIKE"""
+    found = 0
+    for _, table, code, title, body in search_index.SOURCES.values():
+        condition = ' OR '.join(f"{column} LIKE ?" for column in (code, title) + body)
+        params = [f'%{term}%'] * (2 + len(body))
+        where = f"({condition})"
+        if project_id is not None:
+            where += " AND project_id = ?"
+            params.append(project_id)
+        found += conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+    return found
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def table_bytes(conn, prefix):
+    return conn.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name LIKE ?", (f'{prefix}%',)).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--scan-queries', type=int, default=3)
+    parser.add_argument('--updates', type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_search_')
+    try:
+        conn = sqlite3.connect(os.path.join(workdir, 'bench.db'))
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_tables(conn)
+        count, ms = timed(populate, conn, args.rows)
+        print(f"insert      : {count} rows in {ms / 1000:.1f} s ({count / (ms / 1000):,.0f} rows/s, triggers on)")
+        source_bytes = sum(table_bytes(conn, source[1]) for source in search_index.SOURCES.values())
+        print(f"size        : sources {source_bytes / 2 ** 20:.0f} MiB, "
+              f"search_index {table_bytes(conn, 'search_index') / 2 ** 20:.0f} MiB")
+
+        rng = random.Random(42)
+        rare = [f'w{rng.randint(200, 2000)}' for _ in range(args.queries)]
+        scan_ms = [timed(like_scan, conn, term)[1] for term in rare[:args.scan_queries]]
+        print(f"like scan   : {statistics.mean(scan_ms):9.1f} ms / query ({len(scan_ms)} queries)")
+
+        cases = {
+            'fts rare': [(term, None) for term in rare],
+            'fts common': [(rng.choice(COMMON), None) for _ in range(args.queries)],
+            'fts 2 terms': [(f'{rng.choice(COMMON)} {rng.choice(COMMON)}', None) for _ in range(args.queries)],
+            'fts prefix': [(f'w{rng.randint(10, 99)}', None) for _ in range(args.queries)],
+            'fts +project': [(rng.choice(COMMON), rng.randint(1, PROJECTS)) for _ in range(args.queries)],
+        }
+        fts_rare_p50 = None
+        for label, queries in cases.items():
+            samples, totals, ranked = [], [], 0
+            for text, project_id in queries:
+                result, ms = timed(search_index.search, conn, text, project_id=project_id)
+                samples.append(ms)
+                totals.append(result['total'])
+                ranked += result['ranked']
+            p50, p95 = percentiles(samples)
+            fts_rare_p50 = fts_rare_p50 or p50
+            print(f"{label:<12}: p50 {p50:8.2f} ms, p95 {p95:8.2f} ms "
+                  f"(median hits {statistics.median(totals):,.0f}, bm25-ranked {ranked}/{len(queries)})")
+
+        expected = like_scan(conn, rare[0])
+        actual = search_index.search(conn, rare[0])['total']
+        print(f"hits '{rare[0]}' : LIKE {expected}, fts {actual} (LIKE also matches substrings, e.g. {rare[0]}0)")
+        print(f"speedup     : {statistics.mean(scan_ms) / fts_rare_p50:9.0f}× (rare term)")
+
+        ids = rng.sample(range(1, args.rows // len(search_index.SOURCES) + 1), args.updates)
+        _, ms = timed(conn.executemany, "UPDATE wricef_items SET description = ? WHERE id = ?",
+                      [(words(rng, 40), row_id) for row_id in ids])
+        conn.commit()
+        print(f"update      : {args.updates} text updates in {ms:.1f} ms ({ms / args.updates:.3f} ms/row)")
+        _, ms = timed(conn.executemany, "UPDATE wricef_items SET status = ? WHERE id = ?",
+                      [('Done', row_id) for row_id in ids])
+        conn.commit()
+        print(f"status only : {args.updates} updates in {ms:.1f} ms (trigger not fired)")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
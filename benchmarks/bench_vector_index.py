@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Vector index vs JSON scan — top-k similarity over ai_embedding
+==============================================================
+Geçici bir veritabanına `--vectors` adet rastgele embedding yazılır
+(varsayılan 100k × 384, metadata.project_id 1..20) ve şunlar ölçülür:
+
+  json scan   : her sorguda tüm embedding_vector JSON'larını çöz, Python'da
+                cosine hesapla (index öncesi tek seçenek)
+  build (json): VectorIndex ilk sync — JSON bir kez çözülür, memmap yazılır
+  to blob     : migration 009 dönüşümü (JSON → float32 BLOB), boyutlar
+  build (blob): aynı sync, vektörler np.frombuffer ile okunur
+  reload      : index dosyadan açılır, imza değişmediği için sync no-op
+  incremental : `--changes` entity'nin hash'i değişir + aynı sayıda yeni
+                entity eklenir; yalnızca bu satırlar çözülür
+  query       : VectorIndex.similar() — tüm tip ve proje filtresiyle, p50/p95
+
+JSON taraması pahalı olduğu için `--scan-queries` (varsayılan 3) sorgu ile
+ölçülür.
+
+Kullanım:
+  python benchmarks/bench_vector_index.py --vectors 100000 --dim 384 --queries 200
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import embeddings
+from migrate import _apply_file
+from vector_index import VectorIndex
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+SCHEMA = ('008_ai_embedding.sql', '009_embedding_blob.py')
+ENTITY_TYPE = 'defect'
+PROJECTS = 20
+
+
+def populate(conn, count, dim, start=1, hash_prefix='h'):
+    rng = np.random.default_rng(start)
+    batch = []
+    for entity_id in range(start, start + count):
+        vector = rng.standard_normal(dim).astype(np.float32).round(5).tolist()
+        batch.append((ENTITY_TYPE, entity_id, f'{hash_prefix}{entity_id}', json.dumps(vector),
+                      json.dumps({'project_id': entity_id % PROJECTS + 1})))
+        if len(batch) == 5000:
+            conn.executemany("INSERT INTO ai_embedding (entity_type, entity_id, content_hash, embedding_vector, metadata) "
+                             "VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO ai_embedding (entity_type, entity_id, content_hash, embedding_vector, metadata) "
+                         "VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+
+
+def json_scan(conn, entity_id, k):
+    """Index öncesi yol: her satırın JSON'unu çöz, Python'da cosine."""
+    rows = conn.execute("SELECT entity_id, embedding_vector FROM ai_embedding WHERE entity_type = ? ORDER BY id",
+                        (ENTITY_TYPE,)).fetchall()
+    vectors = {e: json.loads(v) for e, v in rows}
+    query = vectors[entity_id]
+    query_norm = math.sqrt(sum(x * x for x in query))
+    scores = []
+    for other_id, vector in vectors.items():
+        if other_id == entity_id:
+            continue
+        dot = sum(a * b for a, b in zip(query, vector))
+        scores.append((dot / (query_norm * math.sqrt(sum(x * x for x in vector))), other_id))
+    scores.sort(reverse=True)
+    return scores[:k]
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vectors', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--scan-queries', type=int, default=3)
+    parser.add_argument('--changes', type=int, default=100)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_vector_index_')
+    try:
+        conn = sqlite3.connect(os.path.join(workdir, 'bench.db'))
+        for filename in SCHEMA:
+            _apply_file(conn, os.path.join(MIGRATIONS, filename))
+        conn.commit()
+        _, ms = timed(populate, conn, args.vectors, args.dim)
+        print(f"populate: {args.vectors} × {args.dim} vectors in {ms / 1000:.1f} s")
+
+        rng = random.Random(42)
+        query_ids = [rng.randint(1, args.vectors) for _ in range(args.queries)]
+
+        scan_ms = [timed(json_scan, conn, entity_id, args.k)[1] for entity_id in query_ids[:args.scan_queries]]
+        print(f"json scan   : {statistics.mean(scan_ms):9.1f} ms / query ({len(scan_ms)} queries)")
+
+        index_dir = os.path.join(workdir, 'index')
+        stats, ms = timed(VectorIndex(index_dir).sync, conn, ENTITY_TYPE)
+        print(f"build (json): {ms:9.1f} ms ({stats['added']} rows)")
+
+        converted, ms = timed(embeddings.convert_json_vectors, conn)
+        conn.commit()
+        storage = embeddings.storage_stats(conn)
+        print(f"to blob     : {ms:9.1f} ms ({converted} rows; json {storage['json_bytes'] / 2 ** 20:.0f} MiB"
+              f" → blob {storage['blob_bytes'] / 2 ** 20:.0f} MiB)")
+        shutil.rmtree(index_dir)
+        stats, ms = timed(VectorIndex(index_dir).sync, conn, ENTITY_TYPE)
+        print(f"build (blob): {ms:9.1f} ms ({stats['added']} rows)")
+
+        index = VectorIndex(index_dir)
+        stats, ms = timed(index.sync, conn, ENTITY_TYPE)
+        print(f"reload      : {ms:9.1f} ms (added={stats['added']})")
+
+        changed = rng.sample(range(1, args.vectors + 1), args.changes)
+        rng_vectors = np.random.default_rng(7)
+        for e in changed:
+            embeddings.store(conn, ENTITY_TYPE, e, f'c{e}', rng_vectors.standard_normal(args.dim),
+                             metadata={'project_id': e % PROJECTS + 1})
+        populate(conn, args.changes, args.dim, start=args.vectors + 1, hash_prefix='n')
+        stats, ms = timed(index.sync, conn, ENTITY_TYPE)
+        print(f"incremental : {ms:9.1f} ms (updated={stats['updated']}, added={stats['added']})")
+
+        query_ms = [timed(index.similar, conn, ENTITY_TYPE, e, k=args.k)[1] for e in query_ids]
+        p50, p95 = percentiles(query_ms)
+        print(f"query       : p50 {p50:7.2f} ms, p95 {p95:7.2f} ms ({len(query_ms)} queries)")
+
+        project_ms = [timed(index.similar, conn, ENTITY_TYPE, e, k=args.k, project_id=e % PROJECTS + 1)[1]
+                      for e in query_ids]
+        p50, p95 = percentiles(project_ms)
+        print(f"query+proj  : p50 {p50:7.2f} ms, p95 {p95:7.2f} ms")
+
+        expected = [e for _, e in json_scan(conn, query_ids[0], args.k)]
+        actual = [e for e, _ in index.similar(conn, ENTITY_TYPE, query_ids[0], k=args.k)]
+        print(f"top-{args.k} matches json scan: {'yes' if expected == actual else 'NO'}")
+        print(f"speedup     : {statistics.mean(scan_ms) / statistics.median(query_ms):9.0f}×")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
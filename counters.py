@@ -0,0 +1,183 @@
+"""
+ProjektCoPilot — Project Counters
+=================================
+Dashboard sayaçları (fit/gap, sorular, aksiyonlar, yüksek riskler, WRICEF
+ve test case durumları, defect severity) her okumada base tablolardan
+sayılıyordu. `project_counters` tablosu bunları proje başına hazır tutar:
+
+  project_counters(project_id, counter, bucket, value)
+    ('fitgap', 'Fit') / ('fitgap', 'Gap')        → fit/gap sayıları
+    ('actions', 'Open')                           → açık aksiyonlar
+    ('risks', 'high')                             → risk_score >= 6
+    ('wricef', <status>), ('test_cases', <status>), ('defects', <severity>) ...
+
+Sayaçlar base tablolar üzerindeki AFTER INSERT/UPDATE/DELETE trigger'ları
+ile güncellenir; trigger'lar handler'ın kendi transaction'ı içinde çalışır,
+bu yüzden raw SQL ve ORM yazmaları aynı şekilde kapsanır ve rollback
+sayaçları da geri alır. Okuma, primary key üzerinden tek bir aralık
+taramasıdır (read_counters).
+
+project_id = 0 satırları proje bağımsız toplamlardır (projects, requirements).
+
+CLI:
+  python counters.py rebuild   # tüm sayaçları base tablolardan yeniden hesapla
+  python counters.py check     # tabloyu base tablolarla karşılaştır
+"""
+
+import sqlite3
+
+COUNTER_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS project_counters (
+        project_id INTEGER NOT NULL,
+        counter TEXT NOT NULL,
+        bucket TEXT NOT NULL DEFAULT '',
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (project_id, counter, bucket)
+    ) WITHOUT ROWID
+'''
+
+GLOBAL_PROJECT_ID = 0
+
+_SESSION_PROJECT = '(SELECT project_id FROM analysis_sessions WHERE id = {r}.session_id)'
+
+# (sayaç, tablo, proje ifadesi, bucket ifadesi, gereken kolonlar)
+# {r}: trigger'da NEW/OLD, rebuild'de tablo takma adı
+COUNTER_SOURCES = (
+    ('sessions', 'analysis_sessions', '{r}.project_id', "''", ('project_id',)),
+    ('fitgap', 'fitgap', _SESSION_PROJECT, "COALESCE({r}.status, '')", ('session_id', 'status')),
+    ('questions', 'questions', _SESSION_PROJECT, "COALESCE({r}.status, '')", ('session_id', 'status')),
+    ('actions', 'action_items', _SESSION_PROJECT, "COALESCE({r}.status, '')", ('session_id', 'status')),
+    ('risks', 'risks_issues', '{r}.project_id',
+     "CASE WHEN {r}.risk_score >= 6 THEN 'high' ELSE 'other' END", ('project_id', 'risk_score')),
+    ('wricef', 'wricef_items', '{r}.project_id', "COALESCE({r}.status, '')", ('project_id', 'status')),
+    ('test_cases', 'test_management', '{r}.project_id', "COALESCE({r}.status, '')", ('project_id', 'status')),
+    ('defects', 'defect', '{r}.project_id', "COALESCE({r}.severity, '')", ('project_id', 'severity')),
+    ('projects', 'projects', str(GLOBAL_PROJECT_ID), "''", ()),
+    ('requirements', 'requirements', str(GLOBAL_PROJECT_ID), "''", ()),
+)
+
+_BUMP_SQL = '''
+    INSERT INTO project_counters (project_id, counter, bucket, value)
+    SELECT {project}, '{counter}', {bucket}, {delta} WHERE {project} IS NOT NULL
+    ON CONFLICT (project_id, counter, bucket) DO UPDATE SET value = value + excluded.value;'''
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _available_sources(conn):
+    for source in COUNTER_SOURCES:
+        counter, table, project, bucket, required = source
+        columns = _columns(conn, table)
+        if columns and set(required) <= columns:
+            yield source
+
+
+def _bump(project, counter, bucket, row, delta):
+    return _BUMP_SQL.format(project=project.format(r=row), counter=counter,
+                            bucket=bucket.format(r=row), delta=delta)
+
+
+def _trigger_sql(counter, table, project, bucket):
+    name = f'trg_counters_{counter}'
+    changed = (f"{project.format(r='OLD')} IS NOT {project.format(r='NEW')} "
+               f"OR {bucket.format(r='OLD')} IS NOT {bucket.format(r='NEW')}")
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ins AFTER INSERT ON {table} BEGIN"
+        f"{_bump(project, counter, bucket, 'NEW', 1)}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_del AFTER DELETE ON {table} BEGIN"
+        f"{_bump(project, counter, bucket, 'OLD', -1)}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_upd AFTER UPDATE ON {table} WHEN {changed} BEGIN"
+        f"{_bump(project, counter, bucket, 'OLD', -1)}"
+        f"{_bump(project, counter, bucket, 'NEW', 1)}\nEND",
+    )
+
+
+def install(conn):
+    """project_counters tablosunu ve mevcut tablolar için trigger'ları oluşturur."""
+    conn.execute(COUNTER_TABLE_SQL)
+    for counter, table, project, bucket, _ in _available_sources(conn):
+        for sql in _trigger_sql(counter, table, project, bucket):
+            conn.execute(sql)
+
+
+def _expected(conn):
+    expected = {}
+    for counter, table, project, bucket, _ in _available_sources(conn):
+        rows = conn.execute(f'''
+            SELECT {project.format(r='r')} AS project_id, {bucket.format(r='r')} AS bucket, COUNT(*)
+            FROM {table} r
+            WHERE {project.format(r='r')} IS NOT NULL
+            GROUP BY 1, 2
+        ''').fetchall()
+        for project_id, bucket_value, value in rows:
+            expected[(project_id, counter, bucket_value)] = value
+    return expected
+
+
+def rebuild(conn):
+    """Tüm sayaçları base tablolardan yeniden hesaplar; yazılan satır sayısını döner."""
+    expected = _expected(conn)
+    conn.execute("DELETE FROM project_counters")
+    conn.executemany(
+        "INSERT INTO project_counters (project_id, counter, bucket, value) VALUES (?, ?, ?, ?)",
+        [(project_id, counter, bucket, value) for (project_id, counter, bucket), value in expected.items()])
+    return len(expected)
+
+
+def check(conn):
+    """Tutarsız sayaçları (project_id, counter, bucket, beklenen, mevcut) listesi olarak döner."""
+    expected = _expected(conn)
+    actual = {(row[0], row[1], row[2]): row[3] for row in conn.execute(
+        "SELECT project_id, counter, bucket, value FROM project_counters").fetchall()}
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: tuple(str(part) for part in k)):
+        want, have = expected.get(key, 0), actual.get(key, 0)
+        if want != have:
+            mismatches.append(key + (want, have))
+    return mismatches
+
+
+def read_counters(conn, project_id, include_global=True):
+    """{counter: {bucket: value}} — projenin satırları (+ genel toplamlar, project_id 0)."""
+    project_ids = (project_id, GLOBAL_PROJECT_ID) if include_global else (project_id, project_id)
+    result = {}
+    for counter, bucket, value in conn.execute(
+            "SELECT counter, bucket, value FROM project_counters WHERE project_id IN (?, ?)",
+            project_ids).fetchall():
+        result.setdefault(counter, {})[bucket] = value
+    return result
+
+
+def read_totals(conn):
+    """Tüm projelerin toplamı: {counter: {bucket: value}}."""
+    result = {}
+    for counter, bucket, value in conn.execute(
+            "SELECT counter, bucket, SUM(value) FROM project_counters GROUP BY counter, bucket").fetchall():
+        result.setdefault(counter, {})[bucket] = value
+    return result
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('rebuild', 'check'):
+        print("Usage: python counters.py rebuild|check")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    install(conn)
+    if sys.argv[1] == 'rebuild':
+        count = rebuild(conn)
+        conn.commit()
+        print(f"✓ {count} counter(s) rebuilt")
+    else:
+        mismatches = check(conn)
+        for project_id, counter, bucket, want, have in mismatches:
+            print(f"✗ project {project_id} {counter}[{bucket}]: expected {want}, stored {have}")
+        if mismatches:
+            sys.exit(1)
+        print("✓ project_counters consistent")
+    conn.close()
@@ -0,0 +1,387 @@
+"""
+ProjektCoPilot — Columnar Export (Parquet / Arrow)
+==================================================
+PMO raporları tüm projelerin requirement / WRICEF / test / defect
+verisini JSON API'lerinden çekiyordu; her satır to_dict() ile serialize
+ediliyor ve sayfa sayfa taşınıyordu. Bu modül model tablolarını BI
+araçlarının doğrudan okuyabildiği kolon bazlı dosyalara yazar:
+
+- Her tablo tek bir SELECT ile (proje / senaryo / requirement kodları
+  LEFT JOIN ile eklenmiş) okunur ve cursor.fetchmany(batch_size) ile
+  RecordBatch'ler halinde dosyaya akıtılır; tablo belleğe alınmaz.
+- Arrow şeması models.py kolon tiplerinden türetilir (DateTime →
+  timestamp, Date → date32, JSON → string ...); veritabanında henüz
+  olmayan kolonlar / tablolar atlanır ve manifest'te raporlanır.
+- Artımlı export: tablonun updated_at kolonu varsa o, yoksa created_at
+  watermark'tır. Her çalışma manifest.json'a tablo başına en büyük
+  watermark'ı ve o değere sahip satırların id'lerini (watermark_ids)
+  yazar; sonraki çalışma `watermark >= önceki` satırları, o id'ler hariç
+  export eder. Böylece aynı zaman damgasıyla export'tan sonra yazılan
+  satırlar kaçmaz, sınırdaki satırlar da iki kez yazılmaz. created_at'i olan ama updated_at'i olmayan
+  tablolarda (new_requirements, scenarios ...) güncellemeler artımlı
+  export'a girmez; bunlar için tam export alınmalıdır.
+- Dosyalar önce geçici adla yazılır, bitince os.replace ile yerine konur.
+- pyarrow yalnızca export için gerekir ve ilk kullanımda import edilir.
+
+  POST /api/exports   {"format": "parquet", "tables": [...], "project_id": 1, "incremental": true}
+                      → 202 + job (export_jobs, tek worker); çıktı EXPORT_DIR/<run_id>/
+  GET  /api/exports/jobs/<job_id>  → job durumu, bitince manifest
+  GET  /api/exports   → çalışmaların manifest'leri (en yeni önce)
+
+CLI:
+  python data_export.py exports/full [--format arrow] [--project-id 1] [--tables defects,test_cases]
+  python data_export.py exports/delta --since exports/full      # önceki manifest'ten watermark
+"""
+
+import json
+import os
+import time
+from datetime import date, datetime
+
+from sqlalchemy import JSON, Boolean, Date, DateTime, Float, Integer
+
+from models import (db, Project, Scenario, Requirement, WricefItem, ConfigItem, TestCase, TestCycle, TestExecution,
+                    Defect, SafeDate)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+MANIFEST = 'manifest.json'
+BATCH_SIZE = 10000
+PARQUET_COMPRESSION = 'zstd'
+
+# export adı → (model, [(kolon adı, join tablosu, join alias, yerel FK ifadesi, seçilen kolon)], proje kolonu)
+EXPORTS = {
+    'projects': (Project, [], 't.id'),
+    'scenarios': (Scenario, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+    ], 't.project_id'),
+    'requirements': (Requirement, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+        ('analysis_title', 'analyses', 'a', 't.analysis_id', 'title'),
+    ], 't.project_id'),
+    'wricef_items': (WricefItem, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+        ('scenario_code', 'scenarios', 's', 't.scenario_id', 'scenario_id'),
+        ('requirement_code', 'new_requirements', 'r', 't.requirement_id', 'code'),
+    ], 't.project_id'),
+    'config_items': (ConfigItem, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+        ('scenario_code', 'scenarios', 's', 't.scenario_id', 'scenario_id'),
+        ('requirement_code', 'new_requirements', 'r', 't.requirement_id', 'code'),
+    ], 't.project_id'),
+    'test_cases': (TestCase, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+    ], 't.project_id'),
+    'test_cycles': (TestCycle, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+    ], 't.project_id'),
+    'test_executions': (TestExecution, [
+        ('test_case_code', 'test_management', 'tc', 't.test_case_id', 'code'),
+        ('test_cycle_code', 'test_cycle', 'cy', 't.test_cycle_id', 'code'),
+        ('project_id', 'test_management', 'tc', 't.test_case_id', 'project_id'),
+    ], 'tc.project_id'),
+    'defects': (Defect, [
+        ('project_code', 'projects', 'p', 't.project_id', 'project_code'),
+        ('wricef_code', 'wricef_items', 'w', 't.wricef_id', 'code'),
+        ('test_execution_code', 'test_execution', 'te', 't.test_execution_id', 'code'),
+    ], 't.project_id'),
+}
+
+
+class ExportError(RuntimeError):
+    """Export başlatılamadı (pyarrow yok, bilinmeyen format / tablo)."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportError("pyarrow is required for exports (pip install pyarrow)") from e
+    return pyarrow
+
+
+# ---------------------------------------------------------------------------
+# Şema ve dönüşüm
+# ---------------------------------------------------------------------------
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return datetime.fromisoformat(value).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_bool(value):
+    return None if value is None else bool(value)
+
+
+def _arrow_type(pa, column_type):
+    """SQLAlchemy kolon tipi → (arrow tipi, değer dönüştürücü veya None)"""
+    if isinstance(column_type, SafeDate) or isinstance(column_type, Date):
+        return pa.date32(), _parse_date
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us'), _parse_datetime
+    if isinstance(column_type, Boolean):
+        return pa.bool_(), _parse_bool
+    if isinstance(column_type, Integer):
+        return pa.int64(), None
+    if isinstance(column_type, Float):
+        return pa.float64(), None
+    if isinstance(column_type, JSON):
+        return pa.string(), None  # SQLite'ta JSON metin olarak saklanır
+    return pa.string(), None
+
+
+def _table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def plan(conn, name, pa):
+    """Export için (SELECT, alanlar, dönüştürücüler, watermark kolonu, eksik kolonlar); tablo yoksa None."""
+    model, joins, project_column = EXPORTS[name]
+    table = model.__tablename__
+    existing = _table_columns(conn, table)
+    if not existing:
+        return None
+    select, fields, converters, missing = [], [], [], []
+    for column in model.__table__.columns:
+        if column.name not in existing:
+            missing.append(column.name)
+            continue
+        arrow_type, converter = _arrow_type(pa, column.type)
+        select.append(f't.{column.name}')
+        fields.append(pa.field(column.key, arrow_type))
+        converters.append(converter)
+    join_sql, joined = [], set()
+    for field_name, join_table, alias, local, remote in joins:
+        if local.split('.', 1)[1] not in existing or not _table_columns(conn, join_table):
+            missing.append(field_name)
+            continue
+        if alias not in joined:
+            join_sql.append(f"LEFT JOIN {join_table} AS {alias} ON {alias}.id = {local}")
+            joined.add(alias)
+        arrow_type, converter = _arrow_type(pa, db.metadata.tables[join_table].c[remote].type)
+        select.append(f'{alias}.{remote}')
+        fields.append(pa.field(field_name, arrow_type))
+        converters.append(converter)
+    watermark = next((c for c in ('updated_at', 'created_at') if c in existing), None)
+    if project_column.split('.', 1)[0] not in joined | {'t'}:
+        project_column = None
+    sql = f"SELECT {', '.join(select)} FROM {table} AS t {' '.join(join_sql)}"
+    return {'sql': sql, 'schema': pa.schema(fields), 'converters': converters, 'watermark': watermark,
+            'project_column': project_column, 'missing_columns': missing}
+
+
+def _record_batch(pa, schema, converters, rows):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, converter, values in zip(schema, converters, columns):
+        if converter is not None:
+            values = [converter(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Writer:
+    """Parquet / Arrow IPC yazıcısı için ortak arayüz; geçici dosyaya yazar."""
+
+    def __init__(self, pa, path, schema, fmt):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        if fmt == 'parquet':
+            self._writer = pa.parquet.ParquetWriter(self.tmp_path, schema, compression=PARQUET_COMPRESSION)
+        else:
+            self._writer = pa.ipc.new_file(self.tmp_path, schema)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._writer.close()
+        os.remove(self.tmp_path)
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def export_table(conn, name, path, fmt='parquet', project_id=None, since=None, since_ids=(), batch_size=BATCH_SIZE):
+    """Tek tabloyu path'e akıtır; {"rows", "batches", "bytes", "watermark", ...} veya tablo yoksa None.
+
+    since_ids: önceki çalışmada `since` değeriyle zaten export edilmiş id'ler.
+    """
+    pa = _pyarrow()
+    spec = plan(conn, name, pa)
+    if spec is None:
+        return None
+    where, params = [], []
+    if project_id is not None and spec['project_column']:
+        where.append(f"{spec['project_column']} = ?")
+        params.append(project_id)
+    watermark_index = id_index = None
+    if spec['watermark']:
+        watermark_index = spec['schema'].get_field_index(spec['watermark'])
+        id_index = spec['schema'].get_field_index('id')
+        if since:
+            column = f"t.{spec['watermark']}"
+            where.append(f"({column} > ? OR ({column} = ? AND t.id NOT IN (SELECT value FROM json_each(?))))")
+            params.extend([since, since, json.dumps(list(since_ids))])
+    sql = spec['sql'] + (f" WHERE {' AND '.join(where)}" if where else '') + " ORDER BY t.id"
+
+    rows = batches = 0
+    watermark, watermark_ids = since, set(since_ids) if since else set()
+    cursor = conn.execute(sql, params)
+    writer = _Writer(pa, path, spec['schema'], fmt)
+    try:
+        while True:
+            chunk = cursor.fetchmany(batch_size)
+            if not chunk:
+                break
+            if watermark_index is not None:
+                for row in chunk:
+                    value = row[watermark_index]
+                    if value is None:
+                        continue
+                    if watermark is None or value > watermark:
+                        watermark, watermark_ids = value, {row[id_index]}
+                    elif value == watermark:
+                        watermark_ids.add(row[id_index])
+            writer.write(_record_batch(pa, spec['schema'], spec['converters'], chunk))
+            rows += len(chunk)
+            batches += 1
+    except Exception:
+        writer.abort()
+        raise
+    finally:
+        cursor.close()
+    writer.close()
+    return {
+        'file': os.path.basename(path),
+        'rows': rows,
+        'batches': batches,
+        'bytes': os.path.getsize(path),
+        'watermark_column': spec['watermark'],
+        'since': since,
+        'watermark': watermark,
+        'watermark_ids': sorted(watermark_ids),
+        'missing_columns': spec['missing_columns'],
+    }
+
+
+def load_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def watermarks(manifest):
+    """Önceki manifest → {tablo: (watermark, watermark_ids)}; sonraki artımlı export'un `since` değeri."""
+    return {name: (table['watermark'], table.get('watermark_ids', []))
+            for name, table in manifest.get('tables', {}).items() if table.get('watermark')}
+
+
+def list_runs(root, project_id=None, fmt=None):
+    """root altındaki manifest'ler, en yeni önce; project_id / fmt ile filtrelenebilir."""
+    runs = []
+    if not os.path.isdir(root):
+        return runs
+    for run_id in sorted(os.listdir(root), reverse=True):
+        path = os.path.join(root, run_id, MANIFEST)
+        if not os.path.isfile(path):
+            continue
+        manifest = load_manifest(os.path.dirname(path))
+        if project_id is not None and manifest.get('project_id') != project_id:
+            continue
+        if fmt is not None and manifest.get('format') != fmt:
+            continue
+        runs.append(dict(manifest, run_id=run_id))
+    return runs
+
+
+def export(conn, out_dir, fmt='parquet', tables=None, project_id=None, since=None, batch_size=BATCH_SIZE,
+           progress=None):
+    """Seçilen tabloları out_dir'e yazar ve manifest.json'u döner.
+
+    since: {tablo: (watermark, watermark_ids)} (artımlı, bkz. watermarks()) veya None (tam export).
+    progress(message) her tablodan sonra çağrılır.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    tables = list(tables or EXPORTS)
+    unknown = [name for name in tables if name not in EXPORTS]
+    if unknown:
+        raise ExportError(f"Unknown table(s): {', '.join(unknown)}")
+    _pyarrow()
+    since = since or {}
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    manifest = {
+        'format': fmt,
+        'project_id': project_id,
+        'incremental': bool(since),
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'tables': {},
+        'skipped': [],
+    }
+    for name in tables:
+        path = os.path.join(out_dir, name + FORMATS[fmt])
+        mark, seen = since.get(name, (None, ()))
+        result = export_table(conn, name, path, fmt, project_id=project_id, since=mark, since_ids=seen,
+                              batch_size=batch_size)
+        if result is None:
+            manifest['skipped'].append(name)
+            continue
+        manifest['tables'][name] = result
+        if progress is not None:
+            progress(f"{name}: {result['rows']} row(s)")
+    elapsed = time.perf_counter() - started
+    manifest['rows'] = sum(table['rows'] for table in manifest['tables'].values())
+    manifest['elapsed_ms'] = round(elapsed * 1000, 1)
+    manifest['rows_per_s'] = round(manifest['rows'] / elapsed) if elapsed else 0
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description='Export model tables to Parquet / Arrow files')
+    parser.add_argument('out_dir')
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--tables', help='Comma separated (default: all)')
+    parser.add_argument('--project-id', type=int)
+    parser.add_argument('--since', metavar='PREVIOUS_DIR', help='Incremental export from a previous run')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    try:
+        result = export(conn, args.out_dir, args.format,
+                        tables=args.tables.split(',') if args.tables else None, project_id=args.project_id,
+                        since=watermarks(load_manifest(args.since)) if args.since else None,
+                        batch_size=args.batch_size, progress=lambda message: print(f"✓ {message}"))
+    except ExportError as e:
+        print(f"✗ {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+    print(f"✓ {result['rows']} row(s) in {result['elapsed_ms']} ms → {args.out_dir}")
@@ -1,5 +1,8 @@
 import sqlite3
 import os
+import re
+
+from migrate import migrate
 
 def init_db():
     db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
@@ -446,6 +449,8 @@ def init_db():
             VALUES ('PRJ-2026-001', 'ACME Corp S/4HANA Migration', 'ACME Corporation', 'Active', 'MM,SD,FI,CO', 'DEV')
         ''')
 
+    create_indexes(conn)
+
     conn.commit()
     conn.close()
     print("Veritabani basariyla kuruldu!")
@@ -456,98 +461,68 @@ def init_db():
     print("  wricef_items, config_items, wricef, test_management")
 
 
+# app.py'deki sorgu şekillerine göre ikincil index'ler: filtre kolonları önce,
+# ardından ORDER BY kolonları. query_audit.py bu index'lerin kullanıldığını doğrular.
+# (index adı, tablo, kolon/ifade listesi)
+INDEXES = (
+    ('idx_requirements_project', 'requirements', ('project_id',)),
+    ('idx_sessions_project_created', 'analysis_sessions', ('project_id', 'created_at')),
+    ('idx_sessions_project_key', 'analysis_sessions', ('project_id', "COALESCE(created_at, '')")),
+    ('idx_sessions_scenario_created', 'analysis_sessions', ('scenario_id', 'created_at')),
+    ('idx_questions_session_key', 'questions', ('session_id', "COALESCE(created_at, '')")),
+    ('idx_answers_question', 'answers', ('question_id',)),
+    ('idx_fitgap_session_key', 'fitgap', ('session_id', "COALESCE(created_at, '')")),
+    ('idx_action_items_session_due', 'action_items', ('session_id', "COALESCE(due_date, '')")),
+    ('idx_decisions_session_key', 'decisions', ('session_id', "COALESCE(created_at, '')")),
+    ('idx_decisions_project_key', 'decisions', ('project_id', "COALESCE(created_at, '')")),
+    ('idx_risks_project_key', 'risks_issues', ('project_id', 'COALESCE(risk_score, -1)', "COALESCE(created_at, '')")),
+    ('idx_risks_session_key', 'risks_issues', ('session_id', 'COALESCE(risk_score, -1)', "COALESCE(created_at, '')")),
+    ('idx_fs_ts_documents_requirement', 'fs_ts_documents', ('requirement_id', 'created_at')),
+    ('idx_test_cases_fs_ts', 'test_cases', ('fs_ts_id', 'created_at')),
+    ('idx_attendees_session', 'session_attendees', ('session_id', 'name')),
+    ('idx_agenda_session', 'session_agenda', ('session_id', 'item_order')),
+    ('idx_minutes_session', 'meeting_minutes', ('session_id', 'minute_order')),
+    ('idx_analyses_session', 'analyses', ('session_id', 'created_at')),
+    ('idx_wricef_project', 'wricef', ('project_id',)),
+    ('idx_scenarios_project_created', 'scenarios', ('project_id', 'created_at')),
+    ('idx_new_requirements_project_created', 'new_requirements', ('project_id', 'created_at')),
+    ('idx_new_requirements_session_created', 'new_requirements', ('session_id', 'created_at')),
+    ('idx_new_requirements_project_code', 'new_requirements', ('project_id', 'code')),
+    ('idx_wricef_items_project_created', 'wricef_items', ('project_id', 'created_at')),
+    ('idx_wricef_items_requirement', 'wricef_items', ('requirement_id', 'created_at')),
+    ('idx_config_items_project_created', 'config_items', ('project_id', 'created_at')),
+    ('idx_config_items_requirement', 'config_items', ('requirement_id', 'created_at')),
+    ('idx_test_management_project_created', 'test_management', ('project_id', 'created_at')),
+)
+
+# İfade index'lerinde (COALESCE(...)) fonksiyon adı olmayan tanımlayıcılar = kolonlar
+_COLUMN_RE = re.compile(r"\b([A-Za-z_]\w*)\b(?!\s*\()")
+
+
+def create_indexes(conn):
+    """INDEXES listesindeki eksik index'leri oluşturur; oluşturulan index sayısını döner.
+
+    Tablosu (veya kolonu) henüz olmayan index'ler atlanır; tablo sonraki bir
+    migration ile oluşunca tekrar çalıştırmak yeterlidir.
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()}
+    created = 0
+    for name, table, columns in INDEXES:
+        if name in existing:
+            continue
+        table_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        referenced = {name for expr in columns for name in _COLUMN_RE.findall(expr)}
+        if not table_columns or not referenced <= table_columns:
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        created += 1
+    return created
+
+
 def run_migrations():
-    """Run database migrations for newreq architecture"""
+    """migrations/ altındaki bekleyen migration'ları uygula (bkz. migrate.py)"""
     db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    print("\n=== Running NewReq Architecture Migrations ===\n")
-    
-    try:
-        # Check if migrations already applied
-        cursor.execute("PRAGMA table_info(scenarios)")
-        scenarios_cols = [col[1] for col in cursor.fetchall()]
-        
-        if 'is_composite' not in scenarios_cols:
-            print("1. Adding composite scenario support to scenarios table...")
-            cursor.execute("ALTER TABLE scenarios ADD COLUMN is_composite INTEGER DEFAULT 0")
-            cursor.execute("ALTER TABLE scenarios ADD COLUMN included_scenario_ids TEXT")
-            cursor.execute("ALTER TABLE scenarios ADD COLUMN tags TEXT")
-            print("   ✓ Scenarios updated")
-        else:
-            print("1. Scenarios table already migrated ✓")
-        
-        # Check new_requirements columns
-        cursor.execute("PRAGMA table_info(new_requirements)")
-        req_cols = [col[1] for col in cursor.fetchall()]
-        
-        if 'code' not in req_cols:
-            print("2. Enhancing new_requirements table...")
-            cursor.execute("ALTER TABLE new_requirements ADD COLUMN code TEXT")
-            cursor.execute("ALTER TABLE new_requirements ADD COLUMN analysis_id INTEGER")
-            cursor.execute("ALTER TABLE new_requirements ADD COLUMN acceptance_criteria TEXT")
-            print("   ✓ New_requirements updated")
-        else:
-            print("2. New_requirements table already migrated ✓")
-        
-        # Check wricef_items columns
-        cursor.execute("PRAGMA table_info(wricef_items)")
-        wricef_cols = [col[1] for col in cursor.fetchall()]
-        
-        if 'scenario_id' not in wricef_cols:
-            print("3. Enhancing wricef_items table...")
-            cursor.execute("ALTER TABLE wricef_items ADD COLUMN scenario_id INTEGER")
-            cursor.execute("ALTER TABLE wricef_items ADD COLUMN fs_link TEXT")
-            cursor.execute("ALTER TABLE wricef_items ADD COLUMN ts_link TEXT")
-            cursor.execute("ALTER TABLE wricef_items ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-            print("   ✓ Wricef_items updated")
-        else:
-            print("3. Wricef_items table already migrated ✓")
-        
-        # Check config_items columns
-        cursor.execute("PRAGMA table_info(config_items)")
-        config_cols = [col[1] for col in cursor.fetchall()]
-        
-        if 'scenario_id' not in config_cols:
-            print("4. Enhancing config_items table...")
-            cursor.execute("ALTER TABLE config_items ADD COLUMN scenario_id INTEGER")
-            cursor.execute("ALTER TABLE config_items ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-            print("   ✓ Config_items updated")
-        else:
-            print("4. Config_items table already migrated ✓")
-        
-        # Create scenario_analyses table
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='scenario_analyses'")
-        if not cursor.fetchone():
-            print("5. Creating scenario_analyses table...")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS scenario_analyses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    scenario_id INTEGER NOT NULL,
-                    code TEXT UNIQUE,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    owner TEXT,
-                    status TEXT DEFAULT 'Draft',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (scenario_id) REFERENCES scenarios(id)
-                )
-            ''')
-            print("   ✓ Scenario_analyses table created")
-        else:
-            print("5. Scenario_analyses table already exists ✓")
-        
-        conn.commit()
-        print("\n=== Migrations completed successfully! ===\n")
-        
-    except Exception as e:
-        print(f"\n✗ Migration failed: {e}")
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    return migrate(db_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,161 @@
+"""
+ProjektCoPilot — SQLite Connection Pool
+=======================================
+get_db_connection() her çağrıda yeni bir sqlite3 bağlantısı açıp
+`PRAGMA journal_mode=WAL` çalıştırıyordu. Bu modül bağlantıları havuzda
+tutar; pragma'lar bağlantı başına yalnızca bir kez uygulanır.
+
+Kullanım:
+  pool = SQLitePool(DB_PATH, size=5, timeout=10)
+  conn = pool.acquire()
+  ...
+  conn.close()          # havuza geri döner
+  pool.stats()          # checkouts / waits / reuses / open
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Havuzda `timeout` saniye içinde boş bağlantı bulunamadı."""
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection; close() bağlantıyı kapatmak yerine havuza iade eder.
+
+    SQLAlchemy de (NullPool + creator) bağlantıyı close() ile bıraktığı için
+    ORM ve raw SQL aynı havuzu ve aynı sayaçları paylaşır.
+    """
+
+    _pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
+
+    def _close_physical(self):
+        super().close()
+
+
+class SQLitePool:
+    """Sabit boyutlu, thread-safe sqlite3 bağlantı havuzu."""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+    )
+
+    def __init__(self, db_path, size=5, timeout=10):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self._counters = {
+            'checkouts': 0,
+            'reuses': 0,
+            'waits': 0,
+            'wait_ms_total': 0.0,
+            'timeouts': 0,
+            'discarded': 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                               check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        conn._pool = self
+        return conn
+
+    def acquire(self):
+        """Havuzdan bir bağlantı al; gerekirse yeni aç veya boşalmasını bekle."""
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = None
+            reused = False
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                with self._lock:
+                    self._counters['waits'] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._counters['timeouts'] += 1
+                    raise PoolTimeout(f"No free connection after {self.timeout}s (pool size {self.size})")
+                reused = True
+                with self._lock:
+                    self._counters['wait_ms_total'] += (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self._counters['checkouts'] += 1
+            if reused:
+                self._counters['reuses'] += 1
+        return conn
+
+    def release(self, conn):
+        """Bağlantıyı havuza iade et; açık transaction varsa geri al."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Bozuk bağlantı havuza dönmez, yerine yenisi açılır; dosya tanıtıcısı sızmasın
+            try:
+                conn._close_physical()
+            except sqlite3.Error:
+                pass
+            with self._lock:
+                self._created -= 1
+                self._counters['discarded'] += 1
+            return
+        if self._closed:
+            conn._close_physical()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        """Boştaki tüm bağlantıları fiziksel olarak kapat."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn._close_physical()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            data['size'] = self.size
+            data['open'] = self._created
+        data['idle'] = self._idle.qsize()
+        data['in_use'] = data['open'] - data['idle']
+        data['wait_ms_total'] = round(data['wait_ms_total'], 2)
+        return data
@@ -0,0 +1,384 @@
+"""
+ProjektCoPilot — Incremental Embedding Pipeline
+===============================================
+Requirement, WricefItem, ConfigItem ve Defect metinleri değiştiğinde
+ai_embedding güncellenmiyordu. Bu pipeline:
+
+1. SQLAlchemy session olaylarını dinler (after_flush): yeni / metin alanı
+   değişmiş / silinmiş nesneleri not eder; commit'te kuyruğa aktarır,
+   rollback'te atar. Yalnızca status vb. değişen güncellemeler kuyruğa
+   girmez.
+2. Arka plan thread'i kuyruktan `batch_size`'lık gruplar alır, metni
+   veritabanından güncel haliyle okur ve sha256 content_hash hesaplar.
+   Aynı hash + aynı model için embedding varsa atlanır; yoksa grubun tüm
+   metinleri tek çağrıda embed edilir (embeddings.store, float32 BLOB).
+3. Entity'nin eski hash'li satırları silinir (GC); silinen entity'lerin
+   tüm satırları kaldırılır. query.delete() ile toplu silmelerde o tip için
+   entity'si kalmamış satırlar süpürülür.
+
+Embedder değiştirilebilir (EMBEDDING_BACKEND):
+  hash    — deterministik yerel stand-in: kelime feature hashing (varsayılan)
+  openai  — openai embeddings API (OPENAI_EMBEDDING_MODEL)
+
+Raw SQL ile yapılan yazmalar olay üretmez; backfill() tüm entity'leri
+kuyruğa koyar (değişmeyenler hash kontrolüyle atlanır).
+
+  GET  /api/system/embeddings            → kuyruk (backlog), throughput, sayaçlar
+  POST /api/system/embeddings/backfill
+
+CLI:
+  python embedding_pipeline.py backfill
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+import embeddings
+from models import db, Requirement, WricefItem, ConfigItem, Defect
+from repository import SessionConnection
+
+# entity_type → (model, embed edilen metin alanları)
+SOURCES = {
+    'requirement': (Requirement, ('title', 'description', 'acceptance_criteria')),
+    'wricef': (WricefItem, ('title', 'description')),
+    'config_item': (ConfigItem, ('title', 'description', 'config_details')),
+    'defect': (Defect, ('title', 'description', 'steps_to_reproduce')),
+}
+_TYPES = {model: (entity_type, fields) for entity_type, (model, fields) in SOURCES.items()}
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+SWEEP = 'sweep'  # query.delete() gibi toplu silmeler: entity'si kalmayan satırları temizle
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# ---------------------------------------------------------------------------
+# Embedders
+# ---------------------------------------------------------------------------
+
+class HashEmbedder:
+    """Deterministik yerel embedder: kelimeler blake2b ile `dim` kovaya işaretli
+    olarak dağıtılır, sonuç L2-normalize edilir. Ortak kelimeler cosine'i artırır."""
+    name = 'hash'
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.model = f'hash-{dim}'
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+class OpenAIEmbedder:
+    name = 'openai'
+
+    def __init__(self, model=None):
+        try:
+            from openai import OpenAI
+        except ImportError:
+            raise RuntimeError("EMBEDDING_BACKEND=openai requires the openai package (pip install -r requirements.txt)")
+        self.client = OpenAI()
+        self.model = model or os.environ.get('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+EMBEDDERS = {'hash': HashEmbedder, 'openai': OpenAIEmbedder}
+
+
+def get_embedder(name=None):
+    name = name or os.environ.get('EMBEDDING_BACKEND', 'hash')
+    if name not in EMBEDDERS:
+        raise RuntimeError(f"Unknown EMBEDDING_BACKEND '{name}' (expected one of: {', '.join(EMBEDDERS)})")
+    return EMBEDDERS[name]()
+
+
+def content_text(obj, fields):
+    return '\n'.join(str(getattr(obj, field)).strip() for field in fields if getattr(obj, field))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Session olayları
+# ---------------------------------------------------------------------------
+
+_INFO_KEY = 'embedding_changes'
+_pipeline = None
+
+
+def _text_changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _after_flush(session, flush_context):
+    if _pipeline is None:
+        return
+    changes = session.info.setdefault(_INFO_KEY, {})
+    for obj in session.new:
+        if type(obj) in _TYPES:
+            changes[(_TYPES[type(obj)][0], obj.id)] = UPSERT
+    for obj in session.dirty:
+        if type(obj) in _TYPES and _text_changed(obj, _TYPES[type(obj)][1]):
+            changes[(_TYPES[type(obj)][0], obj.id)] = UPSERT
+    for obj in session.deleted:
+        if type(obj) in _TYPES:
+            changes[(_TYPES[type(obj)][0], obj.id)] = DELETE
+
+
+def _after_bulk_delete(delete_context):
+    model = delete_context.mapper.class_
+    if _pipeline is not None and model in _TYPES:
+        delete_context.session.info.setdefault(_INFO_KEY, {})[(_TYPES[model][0], None)] = SWEEP
+
+
+def _after_commit(session):
+    changes = session.info.pop(_INFO_KEY, None)
+    if changes and _pipeline is not None:
+        _pipeline.enqueue(changes)
+
+
+def _after_rollback(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+class EmbeddingPipeline:
+    def __init__(self, app, embedder=None, batch_size=32):
+        self.app = app
+        self.embedder = embedder or get_embedder()
+        self.batch_size = batch_size
+        self._pending = OrderedDict()
+        self._changed = threading.Condition()
+        self._in_flight = 0
+        self._thread = None
+        self._stopping = False
+        self._started_at = None
+        self._counts = {'enqueued': 0, 'processed': 0, 'embedded': 0, 'unchanged': 0, 'removed_rows': 0,
+                        'failed': 0, 'batches': 0}
+        self._busy_s = 0.0
+        self._last_batch_ms = None
+        self._last_error = None
+
+    # -- yaşam döngüsü ------------------------------------------------------
+
+    def install(self):
+        """Session olaylarını bu pipeline'a bağlar (process başına tek pipeline)."""
+        global _pipeline
+        _pipeline = self
+        if not event.contains(Session, 'after_flush', _after_flush):
+            event.listen(Session, 'after_flush', _after_flush)
+            event.listen(Session, 'after_bulk_delete', _after_bulk_delete)
+            event.listen(Session, 'after_commit', _after_commit)
+            event.listen(Session, 'after_rollback', _after_rollback)
+
+    def start(self):
+        self.install()
+        if self._thread is None:
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='embedding-pipeline', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # -- kuyruk -------------------------------------------------------------
+
+    def enqueue(self, changes):
+        """changes: {(entity_type, entity_id): 'upsert' | 'delete'} — aynı entity tekrar gelirse son durum geçerli."""
+        with self._changed:
+            for key, action in changes.items():
+                self._pending.pop(key, None)
+                self._pending[key] = action
+            self._counts['enqueued'] += len(changes)
+            self._changed.notify_all()
+
+    def backfill(self, entity_types=None):
+        """Tüm kaynak entity'leri kuyruğa koyar; {entity_type: adet} döner."""
+        counts = {}
+        with self.app.app_context():
+            for entity_type in entity_types or SOURCES:
+                model = SOURCES[entity_type][0]
+                try:
+                    ids = [row.id for row in db.session.query(model.id)]
+                except Exception:
+                    db.session.rollback()  # tablo bu veritabanında yok
+                    continue
+                self.enqueue({(entity_type, entity_id): UPSERT for entity_id in ids})
+                counts[entity_type] = len(ids)
+        return counts
+
+    def drain(self, timeout=10):
+        """Kuyruk boşalana ve işlenen grup bitene kadar bekler; boşaldıysa True."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def metrics(self):
+        with self._changed:
+            uptime = time.time() - self._started_at if self._started_at else 0.0
+            return dict(
+                self._counts,
+                backlog=len(self._pending) + self._in_flight,
+                model=self.embedder.model,
+                batch_size=self.batch_size,
+                running=self._thread is not None and self._thread.is_alive(),
+                busy_s=round(self._busy_s, 3),
+                throughput_per_s=round(self._counts['processed'] / self._busy_s, 1) if self._busy_s else 0.0,
+                embedded_per_s=round(self._counts['embedded'] / self._busy_s, 1) if self._busy_s else 0.0,
+                uptime_s=round(uptime, 1),
+                last_batch_ms=self._last_batch_ms,
+                last_error=self._last_error,
+            )
+
+    # -- worker -------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while not self._pending and not self._stopping:
+                    self._changed.wait()
+                if self._stopping:
+                    return
+                batch = [self._pending.popitem(last=False) for _ in range(min(self.batch_size, len(self._pending)))]
+                self._in_flight = len(batch)
+            started = time.perf_counter()
+            # Tip başına ayrı transaction: bir tablodaki hata diğerlerini düşürmez
+            groups = OrderedDict()
+            for key, action in batch:
+                groups.setdefault(key[0], []).append((key, action))
+            results, error = [], None
+            with self.app.app_context():
+                for group in groups.values():
+                    try:
+                        results.append(self.process(group))
+                    except Exception as e:
+                        results.append({'failed': len(group)})
+                        error = str(e)
+            elapsed = time.perf_counter() - started
+            with self._changed:
+                self._last_error = error or self._last_error
+                for result in results:
+                    for key, value in result.items():
+                        self._counts[key] += value
+                self._counts['batches'] += 1
+                self._busy_s += elapsed
+                self._last_batch_ms = round(elapsed * 1000, 1)
+                self._in_flight = 0
+                self._changed.notify_all()
+
+    def process(self, batch):
+        """[((entity_type, entity_id), action)] grubunu işler (app context içinde); sayaç farkları döner."""
+        conn = SessionConnection(db.session)
+        result = {'processed': len(batch), 'embedded': 0, 'unchanged': 0, 'removed_rows': 0}
+        try:
+            deletes, upserts, sweeps = [], {}, []
+            for (entity_type, entity_id), action in batch:
+                if action == SWEEP:
+                    sweeps.append(entity_type)
+                elif action == DELETE:
+                    deletes.append((entity_type, entity_id))
+                else:
+                    upserts.setdefault(entity_type, []).append(entity_id)
+
+            # 1) Okumalar: yazma kilidi alınmaz
+            to_embed, stale = [], []
+            for entity_type, ids in upserts.items():
+                model, fields = SOURCES[entity_type]
+                objects = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+                for entity_id in ids:
+                    obj = objects.get(entity_id)
+                    text = content_text(obj, fields) if obj is not None else ''
+                    if not text:
+                        deletes.append((entity_type, entity_id))
+                        continue
+                    digest = content_hash(text)
+                    existing = conn.execute(
+                        "SELECT content_hash, json_extract(metadata, '$.model') FROM ai_embedding "
+                        "WHERE entity_type = ? AND entity_id = ?", (entity_type, entity_id)).fetchall()
+                    if any(row[0] == digest and row[1] == self.embedder.model for row in existing):
+                        result['unchanged'] += 1
+                    else:
+                        to_embed.append((entity_type, entity_id, digest, text, getattr(obj, 'project_id', None)))
+                    stale.append((entity_type, entity_id, digest))
+            db.session.rollback()
+
+            # 2) embed() açık transaction olmadan; uzak backend'de saniyeler sürebilir
+            vectors = self.embedder.embed([item[3] for item in to_embed]) if to_embed else []
+
+            # 3) Tüm yazmalar tek kısa transaction'da
+            for entity_type, entity_id, digest in stale:
+                result['removed_rows'] += conn.execute(
+                    "DELETE FROM ai_embedding WHERE entity_type = ? AND entity_id = ? AND content_hash <> ?",
+                    (entity_type, entity_id, digest)).rowcount
+            if to_embed:
+                for (entity_type, entity_id, digest, _, project_id), vector in zip(to_embed, vectors):
+                    # Aynı hash başka modelle embed edilmişse yerine yaz
+                    conn.execute("DELETE FROM ai_embedding WHERE entity_type = ? AND entity_id = ? AND content_hash = ?",
+                                 (entity_type, entity_id, digest))
+                    embeddings.store(conn, entity_type, entity_id, digest, vector,
+                                     metadata={'project_id': project_id, 'model': self.embedder.model})
+                result['embedded'] = len(to_embed)
+
+            for entity_type, entity_id in deletes:
+                result['removed_rows'] += conn.execute(
+                    "DELETE FROM ai_embedding WHERE entity_type = ? AND entity_id = ?",
+                    (entity_type, entity_id)).rowcount
+            for entity_type in sweeps:
+                result['removed_rows'] += conn.execute(
+                    f"DELETE FROM ai_embedding WHERE entity_type = ? AND entity_id NOT IN "
+                    f"(SELECT id FROM {SOURCES[entity_type][0].__tablename__})", (entity_type,)).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'backfill':
+        print("Usage: python embedding_pipeline.py backfill")
+        sys.exit(1)
+    os.environ['EMBEDDING_PIPELINE'] = '0'
+    from app import app
+
+    pipeline = EmbeddingPipeline(app)
+    pipeline.start()
+    print(f"Queued: {pipeline.backfill()}")
+    pipeline.drain(timeout=3600)
+    pipeline.stop()
+    print(pipeline.metrics())
@@ -0,0 +1,132 @@
+"""
+ProjektCoPilot — Embedding Storage
+==================================
+ai_embedding.embedding_vector her vektörü JSON float dizisi olarak tutuyordu
+(float32'ye göre ~4 kat yer, her okumada json.loads). Vektörler artık
+`embedding_blob` kolonunda ham little-endian float32 olarak saklanır; boyut
+ve dtype `metadata` JSON'unda durur:
+
+  metadata = {"dim": 384, "dtype": "<f4", ...}
+
+- load_vector() blob varsa np.frombuffer ile kopyasız (read-only) bir görünüm
+  döner; blob'u olmayan eski satırlarda JSON kolonuna düşer.
+- store() yeni satırı blob ile yazar; JSON kopyası da yazılır (okuyucuların
+  hepsi blob'a geçene kadar). write_json=False yalnızca JSON'u okuyan kalmadığında
+  kullanılmalı; embedding_vector NOT NULL olduğu için o durumda '[]' yazılır.
+- Migration 009 mevcut JSON vektörleri blob'a çevirir ve JSON'u olduğu gibi
+  bırakır (eski okuyucular çalışmaya devam eder). Tüm okuyucular blob'a
+  geçtikten sonra yer kazanmak için:
+
+CLI:
+  python embeddings.py stats        # blob / yalnız JSON satır sayıları, boyutlar
+  python embeddings.py strip-json   # blob'u olan satırların JSON'unu '[]' yap
+"""
+
+import json
+
+import numpy as np
+
+BLOB_DTYPE = '<f4'
+EMPTY_JSON = '[]'
+CONVERT_CHUNK = 1000
+
+
+def encode(vector):
+    """(blob bytes, {"dim", "dtype"})"""
+    array = np.ascontiguousarray(vector, dtype=BLOB_DTYPE).reshape(-1)
+    return array.tobytes(), {'dim': int(array.shape[0]), 'dtype': BLOB_DTYPE}
+
+
+def _metadata(metadata):
+    if metadata is None:
+        return {}
+    return json.loads(metadata) if isinstance(metadata, (str, bytes)) else dict(metadata)
+
+
+def load_vector(blob, metadata=None, json_vector=None):
+    """Blob varsa kopyasız np görünümü, yoksa JSON'dan float32 dizi; ikisi de yoksa None."""
+    if blob is not None:
+        meta = _metadata(metadata)
+        array = np.frombuffer(blob, dtype=meta.get('dtype', BLOB_DTYPE))
+        if meta.get('dim') is not None and array.shape[0] != meta['dim']:
+            raise ValueError(f"embedding blob has {array.shape[0]} values, metadata says {meta['dim']}")
+        return array
+    if json_vector is None:
+        return None
+    values = json.loads(json_vector) if isinstance(json_vector, (str, bytes)) else json_vector
+    if not values:
+        return None
+    return np.asarray(values, dtype=BLOB_DTYPE)
+
+
+def store(conn, entity_type, entity_id, content_hash, vector, metadata=None, write_json=True):
+    """Yeni embedding satırı (blob + dim/dtype metadata); ai_embedding.id döner."""
+    blob, blob_meta = encode(vector)
+    meta = dict(_metadata(metadata), **blob_meta)
+    json_vector = json.dumps(np.frombuffer(blob, dtype=BLOB_DTYPE).tolist()) if write_json else EMPTY_JSON
+    cursor = conn.execute('''
+        INSERT INTO ai_embedding (entity_type, entity_id, content_hash, embedding_vector, embedding_blob, metadata)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (entity_type, entity_id, content_hash, json_vector, blob, json.dumps(meta)))
+    return cursor.lastrowid
+
+
+def convert_json_vectors(conn):
+    """embedding_blob'u boş satırların JSON vektörlerini blob'a çevirir; çevrilen sayısını döner."""
+    converted = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, embedding_vector, metadata FROM ai_embedding
+            WHERE embedding_blob IS NULL AND id > ?
+            ORDER BY id LIMIT ?
+        ''', (last_id, CONVERT_CHUNK)).fetchall()
+        if not rows:
+            return converted
+        updates = []
+        for row_id, json_vector, metadata in rows:
+            vector = load_vector(None, json_vector=json_vector)
+            if vector is not None:
+                blob, blob_meta = encode(vector)
+                updates.append((blob, json.dumps(dict(_metadata(metadata), **blob_meta)), row_id))
+        conn.executemany("UPDATE ai_embedding SET embedding_blob = ?, metadata = ? WHERE id = ?", updates)
+        converted += len(updates)
+        last_id = rows[-1][0]
+
+
+def strip_json(conn):
+    """Blob'u olan satırlarda JSON kopyasını '[]' yapar; güncellenen satır sayısını döner."""
+    return conn.execute("UPDATE ai_embedding SET embedding_vector = ? "
+                        "WHERE embedding_blob IS NOT NULL AND embedding_vector <> ?",
+                        (EMPTY_JSON, EMPTY_JSON)).rowcount
+
+
+def storage_stats(conn):
+    row = conn.execute('''
+        SELECT COUNT(*),
+               SUM(CASE WHEN embedding_blob IS NOT NULL THEN 1 ELSE 0 END),
+               COALESCE(SUM(LENGTH(embedding_blob)), 0),
+               COALESCE(SUM(CASE WHEN embedding_vector <> ? THEN LENGTH(embedding_vector) ELSE 0 END), 0)
+        FROM ai_embedding
+    ''', (EMPTY_JSON,)).fetchone()
+    return {'rows': row[0], 'blob_rows': row[1] or 0, 'json_only_rows': row[0] - (row[1] or 0),
+            'blob_bytes': row[2], 'json_bytes': row[3]}
+
+
+if __name__ == '__main__':
+    import os
+    import sqlite3
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'strip-json'):
+        print("Usage: python embeddings.py stats|strip-json")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    if sys.argv[1] == 'strip-json':
+        print(f"✓ {strip_json(conn)} JSON vector(s) stripped")
+        conn.commit()
+    else:
+        for key, value in storage_stats(conn).items():
+            print(f"{key}: {value}")
+    conn.close()
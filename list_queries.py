@@ -0,0 +1,57 @@
+"""
+ProjektCoPilot — Raw SQL List Queries
+=====================================
+Raw SQL liste endpoint'lerinin temel sorguları ve keyset sıralama
+anahtarları. app.py bu sabitleri fetch_page ile çalıştırır; query_audit.py
+aynı sabitlerden, aynı SQL üretimiyle (pagination.page_sql) plan kontrolü
+yapar. Sorgu değiştiğinde audit edilen şekil de değişir, elle kopya tutulmaz.
+
+- *_SQL sabitleri WHERE ile biter; endpoint filtreleri ' AND ...' ile ekler.
+- NULL olabilen sıralama kolonları COALESCE ile yazılır (created_at → '');
+  satır değeri tuple karşılaştırmasında NULL olursa sayfa sınırında satır
+  kaybolur. database.INDEXES aynı ifadeleri index'ler.
+- Her sorgu sıralama anahtarı başına tek satır döner; 1-N join olursa
+  aynı id sayfa sınırında bölünür.
+"""
+
+from pagination import Keyset
+
+REQUIREMENTS_SQL = 'SELECT * FROM requirements WHERE 1=1'
+REQUIREMENTS_KEYSET = Keyset(('id', 'id', None))
+
+SESSIONS_SQL = '''
+    SELECT s.*, p.project_name, sc.name as scenario_name, sc.scenario_id as scenario_code
+    FROM analysis_sessions s
+    LEFT JOIN projects p ON s.project_id = p.id
+    LEFT JOIN scenarios sc ON s.scenario_id = sc.id
+    WHERE 1=1
+'''
+SESSIONS_KEYSET = Keyset(("COALESCE(s.created_at, '')", 'created_at', ''), ('s.id', 'id', None))
+
+# questions.answer_text yanıtı taşır; answers ile 1-N join aynı soruyu sayfa sınırında çoğaltıyordu
+QUESTIONS_SQL = 'SELECT q.* FROM questions q WHERE 1=1'
+QUESTIONS_KEYSET = Keyset(("COALESCE(q.created_at, '')", 'created_at', ''), ('q.id', 'id', None))
+QUESTIONS_BY_SESSION_KEYSET = Keyset(("COALESCE(q.created_at, '')", 'created_at', ''), ('q.id', 'id', None),
+                                     descending=False)
+
+FITGAP_SQL = 'SELECT * FROM fitgap WHERE 1=1'
+FITGAP_KEYSET = Keyset(("COALESCE(created_at, '')", 'created_at', ''), ('id', 'id', None))
+
+ACTIONS_SQL = 'SELECT a.* FROM action_items a WHERE 1=1'
+ACTIONS_BY_PROJECT_SQL = '''
+    SELECT a.* FROM action_items a
+    JOIN analysis_sessions s ON a.session_id = s.id
+    WHERE s.project_id = ?
+'''
+ACTIONS_KEYSET = Keyset(("COALESCE(a.due_date, '')", 'due_date', ''), ('a.id', 'id', None), descending=False)
+
+DECISIONS_SQL = 'SELECT * FROM decisions WHERE 1=1'
+DECISIONS_KEYSET = Keyset(("COALESCE(created_at, '')", 'created_at', ''), ('id', 'id', None))
+
+RISKS_SQL = 'SELECT * FROM risks_issues WHERE 1=1'
+RISKS_KEYSET = Keyset(('COALESCE(risk_score, -1)', 'risk_score', -1), ("COALESCE(created_at, '')", 'created_at', ''),
+                      ('id', 'id', None))
+
+# Eski WRICEF tablosu (sayfalama yok)
+WRICEF_SQL = 'SELECT * FROM wricef ORDER BY id DESC'
+WRICEF_BY_PROJECT_SQL = 'SELECT * FROM wricef WHERE project_id = ? ORDER BY id DESC'
@@ -0,0 +1,122 @@
+"""
+ProjektCoPilot — Eager-Loading Profiles
+=======================================
+Project / Requirement / WricefItem ... ilişkileri lazy='dynamic'; iç içe
+serileştirme (ör. her requirement'ın WRICEF'leri) ebeveyn başına bir
+sorgu demekti. Bu modül `?include=` parametresini loader option'larına
+ve iç içe JSON üreten serializer'a çevirir:
+
+  GET /api/new_requirements?project_id=1&include=wricef_items,config_items
+  GET /api/projects/1?include=requirements.wricef_items,scenarios.test_cases
+  GET /api/wricef_items?project_id=1&include=requirement,project
+
+- Koleksiyonlar selectinload ile yüklenir: include başına tek bir
+  `WHERE parent_id IN (...)` sorgusu (ebeveyn sayısından bağımsız; SQLAlchemy
+  IN listesini 500'lük parçalara böler). Kullanılan ilişkiler models.py'deki
+  viewonly `eager_*` kopyalarıdır; lazy='raise' olduklarından option
+  verilmeden erişim hata verir, sessizce N+1'e dönmez.
+- Tekil (many-to-one) ilişkiler joinedload ile aynı sorguda gelir.
+- Noktalı isimler iç içe yükler (en fazla MAX_DEPTH seviye); her seviye
+  yine sabit sayıda sorgudur.
+- Bilinmeyen include adı IncludeError (400) fırlatır.
+- TestCycle / TestExecution / Defect'in to_dict()'i ve tabloları henüz
+  olmadığından profillerde yer almazlar.
+"""
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Project, Scenario, Requirement, WricefItem, ConfigItem, TestCase
+
+MAX_DEPTH = 3
+
+# model → {include adı: (ilişki attribute'u, koleksiyon mu)}
+INCLUDES = {
+    Project: {
+        'scenarios': ('eager_scenarios', True),
+        'requirements': ('eager_requirements', True),
+        'wricef_items': ('eager_wricef_items', True),
+        'config_items': ('eager_config_items', True),
+        'test_cases': ('eager_test_cases', True),
+    },
+    Scenario: {
+        'project': ('project', False),
+        'test_cases': ('eager_test_cases', True),
+    },
+    Requirement: {
+        'wricef_items': ('eager_wricef_items', True),
+        'config_items': ('eager_config_items', True),
+    },
+    WricefItem: {
+        'project': ('project', False),
+        'requirement': ('requirement', False),
+    },
+    ConfigItem: {
+        'project': ('project', False),
+        'requirement': ('requirement', False),
+    },
+    TestCase: {
+        'project': ('project', False),
+    },
+}
+
+
+class IncludeError(ValueError):
+    """Geçersiz ?include= değeri (400)."""
+
+
+def _related_model(model, attribute):
+    return getattr(model, attribute).property.mapper.class_
+
+
+def parse_include(model, text):
+    """'a,b.c' → {'a': {}, 'b': {'c': {}}}; isimler modele göre doğrulanır."""
+    tree = {}
+    for path in (part.strip() for part in (text or '').split(',')):
+        if not path:
+            continue
+        names = path.split('.')
+        if len(names) > MAX_DEPTH:
+            raise IncludeError(f"include '{path}' is nested deeper than {MAX_DEPTH} levels")
+        node, current = tree, model
+        for name in names:
+            spec = INCLUDES.get(current, {}).get(name)
+            if spec is None:
+                allowed = ', '.join(INCLUDES.get(current, {})) or 'none'
+                raise IncludeError(f"Unknown include '{name}' for {current.__name__} (allowed: {allowed})")
+            node = node.setdefault(name, {})
+            current = _related_model(current, spec[0])
+    return tree
+
+
+def options(model, tree):
+    """Include ağacı → query.options(...) için loader option listesi"""
+    result = []
+
+    def walk(current, node, parent):
+        for name, children in node.items():
+            attribute, collection = INCLUDES[current][name]
+            relationship = getattr(current, attribute)
+            if parent is None:
+                loader = selectinload(relationship) if collection else joinedload(relationship)
+            else:
+                loader = parent.selectinload(relationship) if collection else parent.joinedload(relationship)
+            if children:
+                walk(_related_model(current, attribute), children, loader)
+            else:
+                result.append(loader)
+
+    walk(model, tree, None)
+    return result
+
+
+def serialize(obj, tree):
+    """obj.to_dict() + include edilen ilişkiler (iç içe); ilişkiler önceden yüklenmiş olmalı."""
+    data = obj.to_dict()
+    spec = INCLUDES.get(type(obj), {})
+    for name, children in tree.items():
+        value = getattr(obj, spec[name][0])
+        if spec[name][1]:
+            data[name] = [serialize(child, children) for child in value]
+        else:
+            data[name] = serialize(value, children) if value is not None else None
+    return data
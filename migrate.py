@@ -0,0 +1,205 @@
+"""
+ProjektCoPilot — Versioned Migration Runner
+===========================================
+migrations/ altındaki numaralı dosyaları (NNN_ad.sql / NNN_ad.py) sırayla
+ve her birini bir kez uygular. Uygulanan sürümler `schema_version`
+tablosunda tutulur:
+
+  schema_version(version, name, applied_at, duration_ms)
+
+- Her migration kendi transaction'ında (BEGIN IMMEDIATE) çalışır; hata
+  olursa o migration tamamen geri alınır ve sonraki migration'lar
+  çalıştırılmaz.
+- .sql dosyaları ifade ifade çalıştırılır (executescript transaction'ı
+  commit edeceği için kullanılmaz); .py dosyaları `upgrade(conn)` tanımlar.
+- Şema güncelse başlangıçta tek bir `SELECT MAX(version)` sorgusu çalışır.
+- schema_version tablosu olmayan (eski PRAGMA-probe migration'larıyla
+  güncellenmiş) veritabanlarında, zaten uygulanmış olan migration'lar
+  LEGACY_PROBES ile tespit edilip çalıştırılmadan işaretlenir.
+
+Temel tablolar database.init_db() ile oluşturulur; migration'lar bunun
+üzerine uygulanır.
+
+CLI:
+  python migrate.py            # bekleyen migration'ları uygula
+  python migrate.py status     # uygulanan / bekleyen sürümler
+"""
+
+import importlib.util
+import os
+import re
+import sqlite3
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+SCHEMA_VERSION_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        duration_ms REAL
+    )
+'''
+
+_FILE_RE = re.compile(r'^(\d+)_(\w+)\.(sql|py)$')
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _column_exists(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})").fetchall())
+
+
+# schema_version'dan önceki veritabanları için: migration zaten uygulanmış mı?
+LEGACY_PROBES = {
+    1: lambda conn: _table_exists(conn, 'session_attendees'),
+    2: lambda conn: _column_exists(conn, 'scenarios', 'is_composite'),
+    3: lambda conn: _table_exists(conn, 'id_sequences'),
+    4: lambda conn: _table_exists(conn, 'project_counters'),
+}
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """[(version, name, path)] sürüm sırasıyla."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILE_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration version in {directory}")
+    return migrations
+
+
+def current_version(conn):
+    if not _table_exists(conn, 'schema_version'):
+        return None
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def applied_versions(conn):
+    if not _table_exists(conn, 'schema_version'):
+        return set()
+    return {row[0] for row in conn.execute("SELECT version FROM schema_version").fetchall()}
+
+
+def split_sql(script):
+    """SQL betiğini tam ifadelere böler (yorum satırları korunur, boş parçalar atlanır)."""
+    statements, buffer = [], ''
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ''
+    return statements
+
+
+def _apply_file(conn, path):
+    if path.endswith('.sql'):
+        with open(path, encoding='utf-8') as f:
+            for statement in split_sql(f.read()):
+                conn.execute(statement)
+    else:
+        spec = importlib.util.spec_from_file_location(f"migration_{os.path.basename(path)[:-3]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(conn)
+
+
+def _stamp_legacy(conn, migrations):
+    """schema_version'ı oluşturur; eski veritabanında uygulanmış olanları işaretler."""
+    has_schema = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0] > 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(SCHEMA_VERSION_SQL)
+        stamped = []
+        if has_schema:
+            for version, name, _ in migrations:
+                probe = LEGACY_PROBES.get(version)
+                if probe is None or not probe(conn):
+                    break
+                conn.execute("INSERT OR IGNORE INTO schema_version (version, name, duration_ms) VALUES (?, ?, NULL)",
+                             (version, name))
+                stamped.append(version)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return stamped
+
+
+def migrate(db_path, directory=MIGRATIONS_DIR, verbose=True):
+    """Bekleyen migration'ları uygular; [(version, name, duration_ms)] döner."""
+    log = print if verbose else (lambda *args, **kwargs: None)
+    migrations = discover(directory)
+    latest = migrations[-1][0] if migrations else 0
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = current_version(conn)
+        if version is not None and version >= latest:
+            log(f"Schema up to date (version {version}) ✓")
+            return []
+
+        if version is None:
+            stamped = _stamp_legacy(conn, migrations)
+            if stamped:
+                log(f"Existing schema stamped as version(s) {', '.join(str(v) for v in stamped)}")
+
+        applied = []
+        for number, name, path in migrations:
+            started = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Başka bir süreç aynı anda uygulamış olabilir; kilit alındıktan sonra tekrar bak
+                if number in applied_versions(conn):
+                    conn.execute("ROLLBACK")
+                    continue
+                _apply_file(conn, path)
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                conn.execute("INSERT INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?)",
+                             (number, name, duration_ms))
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                log(f"✗ {number:03d}_{name} failed: {e}")
+                raise
+            log(f"✓ {number:03d}_{name} applied in {duration_ms} ms")
+            applied.append((number, name, duration_ms))
+        return applied
+    finally:
+        conn.close()
+
+
+def status(db_path, directory=MIGRATIONS_DIR):
+    """[(version, name, applied_at veya None, duration_ms)]"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = {}
+        if _table_exists(conn, 'schema_version'):
+            rows = {row[0]: (row[1], row[2]) for row in conn.execute(
+                "SELECT version, applied_at, duration_ms FROM schema_version").fetchall()}
+        return [(number, name) + rows.get(number, (None, None)) for number, name, _ in discover(directory)]
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import sys
+
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    if len(sys.argv) > 1 and sys.argv[1] == 'status':
+        for number, name, applied_at, duration_ms in status(db_path):
+            state = f"applied {applied_at}" + (f" ({duration_ms} ms)" if duration_ms is not None else " (stamped)") \
+                if applied_at else "pending"
+            print(f"{number:03d}_{name}: {state}")
+    elif len(sys.argv) > 1:
+        print("Usage: python migrate.py [status]")
+        sys.exit(1)
+    else:
+        migrate(db_path)
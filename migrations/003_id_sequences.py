@@ -0,0 +1,8 @@
+"""Migration 003: id_sequences counter table for atomic code allocation + backfill from existing codes."""
+
+from sequences import SEQUENCE_TABLE_SQL, backfill
+
+
+def upgrade(conn):
+    conn.execute(SEQUENCE_TABLE_SQL)
+    backfill(conn)
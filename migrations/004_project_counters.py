@@ -0,0 +1,8 @@
+"""Migration 004: project_counters table + triggers, rebuilt once from base tables."""
+
+import counters
+
+
+def upgrade(conn):
+    counters.install(conn)
+    counters.rebuild(conn)
@@ -0,0 +1,7 @@
+"""Migration 005: secondary indexes matching app.py query shapes (database.INDEXES)."""
+
+from database import create_indexes
+
+
+def upgrade(conn):
+    create_indexes(conn)
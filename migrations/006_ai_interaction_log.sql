@@ -0,0 +1,23 @@
+-- Migration 006: AI interaction log (models.AIInteractionLog)
+-- Streaming endpoint'leri her üretimi buraya yazar; response_time_ms = time-to-first-token.
+
+CREATE TABLE IF NOT EXISTS ai_interaction_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id VARCHAR(50),
+    session_id VARCHAR(100),
+    interaction_type VARCHAR(30) NOT NULL,
+    related_entity_type VARCHAR(30),
+    related_entity_id INTEGER,
+    input_text TEXT,
+    output_text TEXT,
+    model_used VARCHAR(50),
+    tokens_in INTEGER,
+    tokens_out INTEGER,
+    cost_usd REAL,
+    user_feedback VARCHAR(20),
+    feedback_comment TEXT,
+    response_time_ms INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_ai_type_date ON ai_interaction_log(interaction_type, created_at);
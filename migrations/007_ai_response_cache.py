@@ -0,0 +1,10 @@
+"""Migration 007: ai_response_cache table; ai_interaction_log gains project_id and cached."""
+
+import ai_cache
+
+
+def upgrade(conn):
+    conn.execute("ALTER TABLE ai_interaction_log ADD COLUMN project_id INTEGER")
+    conn.execute("ALTER TABLE ai_interaction_log ADD COLUMN cached INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_ai_project_type ON ai_interaction_log(project_id, interaction_type)")
+    ai_cache.install(conn)
@@ -0,0 +1,16 @@
+-- Migration 008: AI embedding store (models.AIEmbedding)
+-- vector_index.py bu tablodan entity_type başına bir NumPy matrisi kurar;
+-- project_id filtresi metadata JSON'undaki "project_id" alanından okunur.
+
+CREATE TABLE IF NOT EXISTS ai_embedding (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity_type VARCHAR(30) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    embedding_vector JSON NOT NULL,
+    metadata JSON,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(entity_type, entity_id, content_hash)
+);
+
+CREATE INDEX IF NOT EXISTS ix_embedding_entity ON ai_embedding(entity_type, entity_id);
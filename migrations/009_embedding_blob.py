@@ -0,0 +1,8 @@
+"""Migration 009: float32 BLOB storage for ai_embedding; existing JSON vectors are converted, JSON kept."""
+
+import embeddings
+
+
+def upgrade(conn):
+    conn.execute("ALTER TABLE ai_embedding ADD COLUMN embedding_blob BLOB")
+    embeddings.convert_json_vectors(conn)
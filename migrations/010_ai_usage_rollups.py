@@ -0,0 +1,8 @@
+"""Migration 010: ai_usage_daily rollups (day x model x interaction_type), rebuilt from ai_interaction_log."""
+
+import ai_log
+
+
+def upgrade(conn):
+    ai_log.install(conn)
+    ai_log.rebuild(conn)
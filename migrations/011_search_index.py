@@ -0,0 +1,7 @@
+"""Migration 011: FTS5 search_index over requirements, WRICEF, config items, documents and decisions."""
+
+import search_index
+
+
+def upgrade(conn):
+    search_index.rebuild(conn)
@@ -0,0 +1,10 @@
+"""Migration 012: new_requirements.conversion_type / conversion_id (models.Requirement)."""
+
+from migrate import _column_exists
+
+
+def upgrade(conn):
+    if not _column_exists(conn, 'new_requirements', 'conversion_type'):
+        conn.execute("ALTER TABLE new_requirements ADD COLUMN conversion_type VARCHAR(20)")
+    if not _column_exists(conn, 'new_requirements', 'conversion_id'):
+        conn.execute("ALTER TABLE new_requirements ADD COLUMN conversion_id INTEGER")
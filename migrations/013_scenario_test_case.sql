@@ -0,0 +1,13 @@
+-- Migration 013: scenario_test_case bridge table (models.scenario_test_case)
+-- Toplu unit test uretimi, WRICEF/Config ogesinin senaryosunu test case'e buradan baglar.
+
+CREATE TABLE IF NOT EXISTS scenario_test_case (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+    test_case_id INTEGER NOT NULL REFERENCES test_management(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (scenario_id, test_case_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_scenario_test_case_test ON scenario_test_case(test_case_id);
+
+CREATE INDEX IF NOT EXISTS ix_test_management_source ON test_management(source_type, source_id);
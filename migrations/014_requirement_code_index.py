@@ -0,0 +1,7 @@
+"""Migration 014: new_requirements(project_id, code) index for requirement_import upserts (database.INDEXES)."""
+
+from database import create_indexes
+
+
+def upgrade(conn):
+    create_indexes(conn)
@@ -0,0 +1,7 @@
+"""Migration 015: scenario_edge table, backfilled from composite scenarios' included_scenario_ids."""
+
+import scenario_graph
+
+
+def upgrade(conn):
+    scenario_graph.rebuild(conn)
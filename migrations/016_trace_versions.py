@@ -0,0 +1,7 @@
+"""Migration 016: trace_versions table and triggers for traceability matrix cache validation."""
+
+import traceability
+
+
+def upgrade(conn):
+    traceability.install(conn)
@@ -0,0 +1,9 @@
+"""Migration 017: search_index 'document' source moves from the unused documents table to fs_ts_documents."""
+
+import search_index
+
+
+def upgrade(conn):
+    for suffix in ('ai', 'au', 'ad'):
+        conn.execute(f"DROP TRIGGER IF EXISTS search_documents_{suffix}")
+    search_index.rebuild(conn)
@@ -0,0 +1,27 @@
+"""Migration 018: columns used by /api/wricef that init_db's wricef table lacks (project_id, type, name, ...)."""
+
+from database import create_indexes
+from migrate import _column_exists
+
+COLUMNS = (
+    ('project_id', 'INTEGER'),
+    ('type', 'TEXT'),
+    ('name', 'TEXT'),
+    ('description', 'TEXT'),
+    ('complexity', "TEXT DEFAULT 'Medium'"),
+    ('estimated_effort', 'INTEGER'),
+    ('priority', "TEXT DEFAULT 'Medium'"),
+    ('assigned_to', 'TEXT'),
+    ('related_gap_id', 'INTEGER'),
+    ('related_decision_id', 'INTEGER'),
+    ('created_at', 'TIMESTAMP'),
+)
+
+
+def upgrade(conn):
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'wricef'").fetchone() is None:
+        return
+    for column, definition in COLUMNS:
+        if not _column_exists(conn, 'wricef', column):
+            conn.execute(f"ALTER TABLE wricef ADD COLUMN {column} {definition}")
+    create_indexes(conn)
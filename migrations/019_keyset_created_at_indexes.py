@@ -0,0 +1,18 @@
+"""Migration 019: keyset indexes on COALESCE(created_at, '') replace the plain created_at ones (database.INDEXES)."""
+
+from database import create_indexes
+
+REPLACED = (
+    'idx_questions_session_created',
+    'idx_fitgap_session_created',
+    'idx_decisions_session_created',
+    'idx_decisions_project_created',
+    'idx_risks_project_score',
+    'idx_risks_session_score',
+)
+
+
+def upgrade(conn):
+    for name in REPLACED:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    create_indexes(conn)
@@ -18,6 +18,9 @@ from datetime import datetime, date
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.types import TypeDecorator, Date
 
+from repository import SessionConnection
+from sequences import next_value, reserve
+
 db = SQLAlchemy()
 
 
@@ -490,6 +493,7 @@ class AIInteractionLog(db.Model):
     user_id = db.Column(db.String(50), nullable=True)
     session_id = db.Column(db.String(100), nullable=True)
     interaction_type = db.Column(db.String(30), nullable=False)
+    project_id = db.Column(db.Integer, nullable=True)
     related_entity_type = db.Column(db.String(30), nullable=True)
     related_entity_id = db.Column(db.Integer, nullable=True)
     input_text = db.Column(db.Text, nullable=True)
@@ -501,6 +505,7 @@ class AIInteractionLog(db.Model):
     user_feedback = db.Column(db.String(20), nullable=True)
     feedback_comment = db.Column(db.Text, nullable=True)
     response_time_ms = db.Column(db.Integer, nullable=True)
+    cached = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 
@@ -510,7 +515,8 @@ class AIEmbedding(db.Model):
     entity_type = db.Column(db.String(30), nullable=False)
     entity_id = db.Column(db.Integer, nullable=False)
     content_hash = db.Column(db.String(64), nullable=False)
-    embedding_vector = db.Column(db.JSON, nullable=False)
+    embedding_vector = db.Column(db.JSON, nullable=False)  # Eski format; yeni satırlarda '[]' (embeddings.py)
+    embedding_blob = db.Column(db.LargeBinary, nullable=True)  # float32, dim/dtype metadata'da
     embedding_metadata = db.Column('metadata', db.JSON, nullable=True)  # Renamed to avoid reserved word
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
@@ -534,23 +540,47 @@ Scenario.test_cases = db.relationship('TestCase', secondary=scenario_test_case,
                                        backref=db.backref('scenarios', lazy='dynamic'), lazy='dynamic')
 
 
+# ===========================================================================
+# EAGER-LOADABLE COLLECTIONS — load_profiles.py (?include=...)
+# ===========================================================================
+# lazy='dynamic' ilişkiler selectinload ile yüklenemez. Aşağıdaki viewonly
+# kopyalar yalnızca load profile'ları içindir; lazy='raise' sayesinde
+# selectinload verilmeden erişilirse satır başına sorgu yerine hata verir.
+
+def _eager(target, **kwargs):
+    return db.relationship(target, viewonly=True, lazy='raise', order_by=f'{target}.id', **kwargs)
+
+
+Project.eager_scenarios = _eager('Scenario')
+Project.eager_requirements = _eager('Requirement')
+Project.eager_wricef_items = _eager('WricefItem')
+Project.eager_config_items = _eager('ConfigItem')
+Project.eager_test_cases = _eager('TestCase')
+Scenario.eager_test_cases = _eager('TestCase', secondary=scenario_test_case)
+Requirement.eager_wricef_items = _eager('WricefItem')
+Requirement.eager_config_items = _eager('ConfigItem')
+
+
 # ===========================================================================
 # HELPER — Auto Code Generator
 # ===========================================================================
 
 def generate_code(model_class, project_id, prefix):
-    """Otomatik kod üretir: generate_code(Defect, 1, 'DEF') → 'DEF-042'"""
-    last = model_class.query.filter_by(project_id=project_id).order_by(model_class.id.desc()).first()
-    if last and last.code:
-        try:
-            num = int(last.code.split('-')[-1]) + 1
-        except (ValueError, IndexError):
-            num = 1
-    else:
-        num = 1
+    """Otomatik kod üretir: generate_code(Defect, 1, 'DEF') → 'DEF-042'
+
+    Numara id_sequences sayacından db.session'ın transaction'ı içinde alınır;
+    eşzamanlı insert'ler aynı kodu alamaz.
+    """
+    num = next_value(SessionConnection(db.session), project_id, model_class.__tablename__)
     return f'{prefix}-{num:03d}'
 
 
+def reserve_codes(model_class, project_id, prefix, count):
+    """Toplu import için `count` adet kodu tek seferde ayırır."""
+    first = reserve(SessionConnection(db.session), project_id, model_class.__tablename__, count)
+    return [f'{prefix}-{num:03d}' for num in range(first, first + count)]
+
+
 CODE_PREFIXES = {
     'Project': 'PRJ', 'Scenario': 'SCN', 'Analysis': 'ANL',
     'Requirement': 'REQ', 'WricefItem': 'WR', 'ConfigItem': 'CFG',
@@ -0,0 +1,320 @@
+"""
+ProjektCoPilot — Keyset Pagination & Field Projection
+=====================================================
+Liste endpoint'leri tüm tabloyu `SELECT *` / `.all()` ile döndürüyordu.
+Bu modül opt-in sayfalama ve alan seçimi sağlar:
+
+  GET /api/fitgap?limit=100                     → ilk 100 kayıt
+  GET /api/fitgap?limit=100&cursor=<X-Next-Cursor>  → sonraki sayfa
+  GET /api/wricef_items?fields=id,code,title,fs_content
+
+- Gövde yine JSON listesidir (SPA uyumlu); sonraki sayfa varsa
+  `X-Next-Cursor` ve `Link: <...>; rel="next"` header'ları döner.
+- limit/fields verilmezse eski davranış (tam liste) korunur.
+- Sayfalı/projeksiyonlu modda büyük metin kolonları (HEAVY_FIELDS)
+  yalnızca `fields=` ile istenirse döner; ORM tarafında hiç okunmaz.
+- Cursor, son satırın sıralama anahtarıdır (ör. created_at, id); OFFSET
+  kullanılmaz, her sayfa index üzerinden aynı maliyettedir.
+
+Streaming (büyük export'lar için):
+
+  GET /api/wricef_items?project_id=1&stream=ndjson   → satır başına bir JSON nesnesi
+  GET /api/wricef_items?project_id=1&stream=json     → chunked JSON dizisi
+
+- Satırlar cursor üzerinden okunup serileştirildikçe gönderilir; liste
+  bellekte kurulmaz, ilk byte hemen döner.
+- limit/cursor/fields ile birlikte kullanılabilir; header'lar gövdeden önce
+  gittiği için stream modunda X-Next-Cursor dönmez.
+"""
+
+import base64
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import Text, cast, literal, tuple_
+from sqlalchemy.orm import defer, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+MAX_LIMIT = 1000
+HEAVY_FIELDS = ('fs_content', 'ts_content', 'steps', 'content')
+STREAM_FORMATS = ('ndjson', 'json')
+STREAM_BATCH_SIZE = 500
+
+
+class PageError(ValueError):
+    """Geçersiz limit / cursor parametresi (400)."""
+
+
+class PageRequest:
+    def __init__(self, limit=None, cursor=None, fields=None, stream=None):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.stream = stream
+
+    @property
+    def active(self):
+        """limit veya fields verildiyse sayfalı/projeksiyonlu mod."""
+        return self.limit is not None or self.fields is not None
+
+    def wants(self, field):
+        if self.fields is not None:
+            return field in self.fields
+        return not (self.active and field in HEAVY_FIELDS)
+
+
+def parse_page_args(args):
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PageError("limit must be an integer")
+        if limit < 1:
+            raise PageError("limit must be >= 1")
+        limit = min(limit, MAX_LIMIT)
+
+    cursor = args.get('cursor')
+    if cursor:
+        cursor = decode_cursor(cursor)
+        if limit is None:
+            limit = MAX_LIMIT
+    else:
+        cursor = None
+
+    fields = args.get('fields')
+    if fields:
+        fields = {f.strip() for f in fields.split(',') if f.strip()}
+        fields.add('id')
+    else:
+        fields = None
+
+    stream = args.get('stream')
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise PageError("stream must be one of: " + ', '.join(STREAM_FORMATS))
+    return PageRequest(limit, cursor, fields, stream)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise PageError("invalid cursor")
+    if not isinstance(values, list):
+        raise PageError("invalid cursor")
+    return values
+
+
+def project_row(data, page):
+    if not page.active:
+        return data
+    return {k: v for k, v in data.items() if page.wants(k)}
+
+
+def _respond(items, next_cursor):
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response
+
+
+def stream_response(items, page):
+    """Serileştirilmiş nesneleri chunk chunk gönderir (ndjson veya JSON dizisi)."""
+    dumps = current_app.json.dumps
+
+    if page.stream == 'ndjson':
+        def generate():
+            for item in items:
+                yield dumps(item) + '\n'
+        mimetype = 'application/x-ndjson'
+    else:
+        def generate():
+            yield '['
+            separator = ''
+            for item in items:
+                yield separator + dumps(item)
+                separator = ','
+            yield ']'
+        mimetype = 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+# ---------------------------------------------------------------------------
+# Raw SQL
+# ---------------------------------------------------------------------------
+
+class Keyset:
+    """Raw SQL sıralama anahtarı.
+
+    keys: (sql_ifadesi, satır_anahtarı, null_yerine) üçlüleri. NULL olabilen
+    kolonlar COALESCE ile yazılır; null_yerine aynı değeri Python'da üretir.
+      Keyset(('COALESCE(risk_score, -1)', 'risk_score', -1), ('created_at', 'created_at', None),
+             ('id', 'id', None), descending=True)
+    """
+
+    def __init__(self, *keys, descending=True):
+        self.keys = keys
+        self.descending = descending
+
+    def order_by(self):
+        direction = 'DESC' if self.descending else 'ASC'
+        return 'ORDER BY ' + ', '.join(f'{expr} {direction}' for expr, _, _ in self.keys)
+
+    def where(self, cursor):
+        if len(cursor) != len(self.keys):
+            raise PageError("invalid cursor")
+        op = '<' if self.descending else '>'
+        exprs = ', '.join(expr for expr, _, _ in self.keys)
+        marks = ', '.join('?' for _ in self.keys)
+        return f'({exprs}) {op} ({marks})', list(cursor)
+
+    def cursor_for(self, row):
+        values = []
+        for _, key, null_value in self.keys:
+            value = row[key]
+            values.append(null_value if value is None else value)
+        return encode_cursor(values)
+
+
+def page_sql(sql, params, keyset, cursor=None, limit=None):
+    """`sql` WHERE ile bitmeli; keyset koşulu, ORDER BY ve LIMIT eklenmiş (sql, params) döner."""
+    params = list(params)
+    if cursor is not None:
+        clause, values = keyset.where(cursor)
+        sql += f' AND {clause}'
+        params.extend(values)
+    sql += ' ' + keyset.order_by()
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def fetch_page(conn, sql, params, keyset, page):
+    """`sql` WHERE ile bitmeli (ör. '... WHERE 1=1'); keyset, ORDER BY ve LIMIT eklenir."""
+    limit = page.limit
+    if limit is not None and not page.stream:
+        # Sonraki sayfa var mı diye bir fazla satır okunur; stream modunda bu sinyal yok
+        limit += 1
+    cursor = conn.execute(*page_sql(sql, params, keyset, page.cursor, limit))
+    if page.stream:
+        return cursor
+    return cursor.fetchall()
+
+
+def rows_response(rows, keyset, page):
+    if page.stream:
+        return stream_response((project_row(dict(row), page) for row in rows), page)
+    next_cursor = None
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = keyset.cursor_for(rows[-1])
+    return _respond([project_row(dict(row), page) for row in rows], next_cursor)
+
+
+# ---------------------------------------------------------------------------
+# ORM
+# ---------------------------------------------------------------------------
+
+def _is_datetime(column):
+    return column.type.python_type is datetime
+
+
+def _cursor_bind(column, value):
+    """Cursor değeri → karşılaştırılacak bind parametresi.
+
+    DateTime kolonları SQLite'ta metin olarak saklanır; ORM satırları mikrosaniyeli
+    ('2024-01-01 10:00:00.123456'), CURRENT_TIMESTAMP / ham SQL satırları saniye
+    hassasiyetinde ('2024-01-01 10:00:00'). datetime bind edilirse her zaman
+    '.000000' eklenir ve saniye hassasiyetli satır kendi cursor'ından küçük kalır
+    (sonraki sayfa aynı sayfa olur). Bu yüzden cursor saklanan metni taşır ve
+    metin olarak karşılaştırılır.
+    """
+    if _is_datetime(column):
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return literal(value, Text())
+    return value
+
+
+def query_page(query, model, columns, page, descending=True):
+    """ORM sorgusunu keyset + projeksiyon ile sayfalar; (nesneler, next_cursor) döner.
+
+    Stream modunda nesneler yield_per ile okunan bir generator olarak döner.
+    """
+    skipped = [f for f in HEAVY_FIELDS if hasattr(model, f) and not page.wants(f)]
+    if skipped:
+        query = query.options(*[defer(getattr(model, f)) for f in skipped])
+
+    if page.cursor is not None:
+        if len(page.cursor) != len(columns):
+            raise PageError("invalid cursor")
+        try:
+            values = [_cursor_bind(c, v) for c, v in zip(columns, page.cursor)]
+        except (TypeError, ValueError):
+            raise PageError("invalid cursor")
+        if descending:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    if page.stream:
+        if page.limit is not None:
+            query = query.limit(page.limit)
+        return _stream_objects(query.yield_per(STREAM_BATCH_SIZE), skipped), None
+    next_cursor = None
+    if page.limit is None:
+        items = query.all()
+    else:
+        # Cursor kolonları saklandıkları haliyle (DateTime → metin) nesnenin yanında okunur
+        rows = query.add_columns(*[cast(c, Text) if _is_datetime(c) else c for c in columns]) \
+            .limit(page.limit + 1).all()
+        items = [row[0] for row in rows]
+        if len(rows) > page.limit:
+            items = items[:page.limit]
+            next_cursor = encode_cursor(list(rows[page.limit - 1][1:]))
+
+    # Ertelenen kolonlar to_dict() içinde satır başına sorgu tetiklemesin
+    for item in items:
+        for f in skipped:
+            set_committed_value(item, f, None)
+    return items, next_cursor
+
+
+def _stream_objects(query, skipped):
+    for item in query:
+        for f in skipped:
+            set_committed_value(item, f, None)
+        yield item
+
+
+def _to_dict(item):
+    return item.to_dict()
+
+
+def objects_response(items, next_cursor, page, serialize=_to_dict):
+    """serialize: nesne → dict (varsayılan to_dict; include'lar için load_profiles.serialize)"""
+    if page.stream:
+        return stream_response(_serialize_and_release(items, page, serialize), page)
+    return _respond([project_row(serialize(item), page) for item in items], next_cursor)
+
+
+def _serialize_and_release(items, page, serialize):
+    # Serileştirilen nesne session'dan çıkarılır; identity map büyümez
+    for item in items:
+        data = project_row(serialize(item), page)
+        session = object_session(item)
+        if session is not None:
+            session.expunge(item)
+        yield data
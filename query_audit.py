@@ -0,0 +1,153 @@
+"""
+ProjektCoPilot — Query Plan Audit
+=================================
+app.py'deki sık çalışan sorgu şekillerini EXPLAIN QUERY PLAN ile çalıştırır
+ve full table scan ya da geçici B-tree sıralaması yapanları işaretler.
+database.INDEXES bu sorgulara göre tanımlıdır; yeni bir liste/filtre sorgusu
+eklendiğinde buraya da kaydedilmeli.
+
+- Keyset sayfalı raw SQL endpoint'lerinin kayıtları list_queries.py'deki
+  sabitlerden, fetch_page'in kullandığı pagination.page_sql ile üretilir;
+  endpoint'in çalıştırdığı SQL ile audit edilen SQL aynıdır.
+
+  GET /api/system/query-plans
+  python query_audit.py            # full scan varsa exit code 1
+"""
+
+import sqlite3
+
+import list_queries as q
+from pagination import page_sql
+
+PAGE_LIMIT = 51
+
+
+def _page(name, sql, filters, params, keyset, cursor=None):
+    """fetch_page'in ürettiği şekil; cursor verilirse ikinci sayfa (cursor koşulu + LIMIT)."""
+    sql, params = page_sql(sql + filters, params, keyset, cursor, PAGE_LIMIT)
+    return name, sql, tuple(params)
+
+
+REGISTERED_QUERIES = (
+    _page('requirements by project', q.REQUIREMENTS_SQL, ' AND project_id = ?', [1],
+          q.REQUIREMENTS_KEYSET, [100]),
+    _page('sessions by project', q.SESSIONS_SQL, ' AND s.project_id = ?', [1],
+          q.SESSIONS_KEYSET, ['2100-01-01', 100]),
+    ('latest session by scenario',
+     "SELECT id FROM analysis_sessions WHERE scenario_id = ? ORDER BY created_at DESC LIMIT 1",
+     (1,)),
+    ('recent sessions by project',
+     "SELECT * FROM analysis_sessions WHERE project_id = ? ORDER BY created_at DESC LIMIT 5",
+     (1,)),
+    _page('questions by session', q.QUESTIONS_SQL, ' AND q.session_id = ?', [1],
+          q.QUESTIONS_BY_SESSION_KEYSET, ['2000-01-01', 0]),
+    _page('fitgap by session', q.FITGAP_SQL, ' AND session_id = ?', [1],
+          q.FITGAP_KEYSET, ['2100-01-01', 100]),
+    _page('actions by session', q.ACTIONS_SQL, ' AND a.session_id = ?', [1],
+          q.ACTIONS_KEYSET, ['', 0]),
+    _page('actions by project', q.ACTIONS_BY_PROJECT_SQL, '', [1], q.ACTIONS_KEYSET),
+    _page('decisions by session', q.DECISIONS_SQL, ' AND session_id = ?', [1], q.DECISIONS_KEYSET),
+    _page('decisions by project', q.DECISIONS_SQL, ' AND project_id = ?', [1], q.DECISIONS_KEYSET),
+    _page('risks by project', q.RISKS_SQL, ' AND project_id = ?', [1],
+          q.RISKS_KEYSET, [9, '2100-01-01', 100]),
+    _page('risks by session', q.RISKS_SQL, ' AND session_id = ?', [1], q.RISKS_KEYSET),
+    ('documents by requirement',
+     """SELECT d.*, r.code as requirement_code, r.title as requirement_title
+        FROM fs_ts_documents d
+        JOIN requirements r ON d.requirement_id = r.id
+        WHERE d.requirement_id = ?
+        ORDER BY d.created_at DESC""",
+     (1,)),
+    ('documents by project',
+     """SELECT d.*, r.code as requirement_code, r.title as requirement_title
+        FROM fs_ts_documents d
+        JOIN requirements r ON d.requirement_id = r.id
+        WHERE r.project_id = ?
+        ORDER BY d.created_at DESC""",
+     (1,)),
+    ('test cases by document',
+     """SELECT tc.* FROM test_cases tc
+        JOIN fs_ts_documents d ON tc.fs_ts_id = d.id
+        JOIN requirements r ON d.requirement_id = r.id
+        WHERE tc.fs_ts_id = ?
+        ORDER BY tc.created_at DESC""",
+     (1,)),
+    ('attendees by session',
+     "SELECT * FROM session_attendees WHERE session_id = ? ORDER BY name", (1,)),
+    ('agenda by session',
+     "SELECT * FROM session_agenda WHERE session_id = ? ORDER BY item_order", (1,)),
+    ('minutes by session',
+     "SELECT * FROM meeting_minutes WHERE session_id = ? ORDER BY minute_order", (1,)),
+    ('analyses by scenario',
+     """SELECT DISTINCT a.id, a.session_id, a.analysis_type, a.title, a.content, a.status, a.created_at
+        FROM analyses a
+        INNER JOIN analysis_sessions s ON a.session_id = s.id
+        WHERE s.scenario_id = ?
+        ORDER BY a.created_at DESC""",
+     (1,)),
+    ('wricef by project', q.WRICEF_BY_PROJECT_SQL, (1,)),
+    ('scenarios by project',
+     "SELECT * FROM scenarios WHERE project_id = ? ORDER BY created_at DESC", (1,)),
+    ('new requirements by session',
+     "SELECT * FROM new_requirements WHERE session_id = ? ORDER BY created_at DESC, id DESC LIMIT ?", (1, 51)),
+    ('wricef items by project',
+     "SELECT * FROM wricef_items WHERE project_id = ? ORDER BY created_at DESC, id DESC LIMIT ?", (1, 51)),
+    ('wricef items by requirement',
+     "SELECT * FROM wricef_items WHERE requirement_id = ? ORDER BY created_at DESC, id DESC LIMIT ?", (1, 51)),
+    ('config items by project',
+     "SELECT * FROM config_items WHERE project_id = ? ORDER BY created_at DESC, id DESC LIMIT ?", (1, 51)),
+    ('test management by project',
+     "SELECT * FROM test_management WHERE project_id = ? ORDER BY created_at DESC, id DESC LIMIT ?", (1, 51)),
+    ('project counters',
+     "SELECT counter, bucket, value FROM project_counters WHERE project_id IN (?, ?)", (1, 0)),
+)
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN satırlarının detay metinleri."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def _is_full_scan(detail):
+    # "SCAN t" = tam tablo taraması; "SCAN t USING INDEX ..." index üzerinden sıralı okuma
+    return detail.startswith('SCAN ') and ' USING ' not in detail
+
+
+def audit(conn, queries=REGISTERED_QUERIES):
+    results = []
+    for name, sql, params in queries:
+        try:
+            plan = explain(conn, sql, params)
+        except sqlite3.OperationalError as e:
+            # Tablo/kolon bu veritabanında yoksa sorgu atlanır
+            results.append({'name': name, 'error': str(e), 'plan': [], 'full_scan': False, 'temp_sort': False})
+            continue
+        results.append({
+            'name': name,
+            'plan': plan,
+            'full_scan': any(_is_full_scan(detail) for detail in plan),
+            'temp_sort': any('USE TEMP B-TREE' in detail for detail in plan),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    results = audit(conn)
+    conn.close()
+    for r in results:
+        if r.get('error'):
+            mark = '-'
+        elif r['full_scan']:
+            mark = '✗'
+        else:
+            mark = '✓'
+        print(f"{mark} {r['name']}" + (' (temp sort)' if r['temp_sort'] else '') +
+              (f" [{r['error']}]" if r.get('error') else ''))
+        for detail in r['plan']:
+            print(f"    {detail}")
+    sys.exit(1 if any(r['full_scan'] for r in results) else 0)
@@ -0,0 +1,46 @@
+"""
+ProjektCoPilot — Repository Layer (raw SQL over the SQLAlchemy session)
+======================================================================
+sessions, questions, fitgap, decisions, risks_issues, action_items ve
+fs_ts_documents tabloları hâlâ elle yazılmış SQL ile okunup yazılıyor.
+Bu katman o SQL'i db.session'ın kullandığı bağlantı ve transaction
+üzerinde çalıştırır; böylece bir istek ORM + raw SQL için tek bağlantı
+ve tek transaction kullanır (WAL altında kendi kendini kilitlemez).
+
+Kullanım:
+  conn = SessionConnection(db.session)
+  cur = conn.execute("SELECT * FROM questions WHERE session_id = ?", (sid,))
+  conn.commit()          # == db.session.commit()
+"""
+
+
+class SessionConnection:
+    """sqlite3.Connection arayüzünü (execute/commit/close) taklit eden adaptör."""
+
+    def __init__(self, session):
+        self._session = session
+
+    @property
+    def dbapi_connection(self):
+        """Session'ın transaction'ına bağlı ham sqlite3 bağlantısı."""
+        return self._session.connection().connection.driver_connection
+
+    def execute(self, sql, params=()):
+        cursor = self.dbapi_connection.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def executemany(self, sql, seq_of_params):
+        cursor = self.dbapi_connection.cursor()
+        cursor.executemany(sql, seq_of_params)
+        return cursor
+
+    def commit(self):
+        self._session.commit()
+
+    def rollback(self):
+        self._session.rollback()
+
+    def close(self):
+        # Bağlantının ömrü session'a ait; teardown'da db.session.remove() iade eder
+        pass
@@ -0,0 +1,341 @@
+"""
+ProjektCoPilot — Requirement Bulk Import (CSV / XLSX)
+=====================================================
+Workshop çıktıları binlerce satırlık tablolar olarak geliyor; tek giriş
+yolu her satır için ayrı commit yapan POST /api/new_requirements idi.
+Bu modül dosyayı akış halinde okur ve new_requirements'a toplu yazar:
+
+- CSV satır satır (csv.reader), XLSX openpyxl read_only modunda okunur;
+  dosya belleğe alınmaz. openpyxl yalnızca .xlsx için gerekir.
+- Başlıklar büyük/küçük harf ve boşluk farkı gözetmeden eşlenir
+  (COLUMN_ALIASES); tanınmayan kolonlar raporda `ignored_columns` olur.
+- Doğrulama: title zorunlu; classification models.CLASSIFICATIONS,
+  priority models.PRIORITIES, module models.SAP_MODULES içinde olmalı
+  ('Partial Fit' → 'PartialFit' gibi yazım farkları normalize edilir).
+  Hatalı satırlar atlanır ve satır numarası + alan ile raporlanır.
+- Upsert anahtarı (project_id, code): projede var olan kod güncellenir,
+  kodsuz satırlara REQ-NNN kodları batch başına tek reserve() ile ayrılır.
+  Güncellemede yalnızca dosyada değeri olan alanlar yazılır; dosyada
+  olmayan kolonlar ve boş hücreler mevcut değeri korur. DEFAULTS yalnızca
+  yeni satırlara uygulanır.
+  Aynı kod dosyada iki kez geçerse ikincisi hata olarak raporlanır.
+- session_id / analysis_id projenin oturum ve analizlerinden biri olmalı
+  (FK pragma'sı kapalı; kontrol yazmadan önce burada yapılır).
+- Her `batch_size` satır tek transaction'dır (executemany INSERT/UPDATE);
+  batch yazılamazsa geri alınır ve satırlar tek tek yeniden denenir,
+  böylece yalnızca yazılamayan satırlar raporlanır.
+
+  POST /api/new_requirements/import?project_id=1[&format=csv|xlsx][&dry_run=1]
+       (multipart `file` alanı veya ham gövde)
+
+CLI:
+  python requirement_import.py workshop.xlsx --project-id 1 [--dry-run]
+"""
+
+import csv
+import io
+import itertools
+import time
+from datetime import datetime
+
+from models import CLASSIFICATIONS, PRIORITIES, SAP_MODULES
+from sequences import reserve
+
+TABLE = 'new_requirements'
+CODE_PREFIX = 'REQ'
+BATCH_SIZE = 5000
+MAX_ERRORS = 1000
+SNIFF_BYTES = 4096
+FORMATS = ('csv', 'xlsx')
+
+FIELDS = ('code', 'title', 'description', 'module', 'classification', 'priority', 'fit_type',
+          'acceptance_criteria', 'status', 'analysis_id', 'session_id')
+COLUMN_ALIASES = {
+    'requirement_code': 'code', 'req_code': 'code',
+    'name': 'title', 'requirement': 'title',
+    'sap_module': 'module',
+    'fit_gap': 'classification', 'fitgap': 'classification', 'fit_gap_classification': 'classification',
+    'acceptance': 'acceptance_criteria',
+}
+MAX_LENGTHS = {'code': 20, 'title': 200, 'fit_type': 50, 'status': 20}
+DEFAULTS = {'classification': 'Gap', 'priority': 'Medium', 'status': 'Draft'}
+
+
+class ImportFileError(Exception):
+    """Dosya bütünüyle okunamıyor (format, başlık satırı, eksik bağımlılık)."""
+
+
+def _key(value):
+    return ''.join(ch for ch in str(value).lower() if ch.isalnum())
+
+
+_CLASSIFICATIONS = {_key(v): v for v in CLASSIFICATIONS}
+_PRIORITIES = {_key(v): v for v in PRIORITIES}
+_MODULES = {v.upper() for v in SAP_MODULES}
+
+
+def _header_field(name):
+    normalized = '_'.join(str(name or '').strip().lower().replace('-', ' ').replace('/', ' ').split())
+    return normalized if normalized in FIELDS else COLUMN_ALIASES.get(normalized)
+
+
+# ---------------------------------------------------------------------------
+# Okuyucular: (satır no, değer listesi) üretir; 1. satır başlık
+# ---------------------------------------------------------------------------
+
+def _csv_rows(stream):
+    text = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    # Ayraç tespiti için tam satırlardan bir örnek; okunan satırlar akışın başına geri konur
+    head = []
+    while sum(len(line) for line in head) < SNIFF_BYTES:
+        line = text.readline()
+        if not line:
+            break
+        head.append(line)
+    try:
+        dialect = csv.Sniffer().sniff(''.join(head), delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(itertools.chain(head, text), dialect)
+    for number, values in enumerate(reader, start=1):
+        yield number, values
+
+
+def _xlsx_rows(stream):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportFileError("openpyxl is required for .xlsx imports (pip install openpyxl)")
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for number, values in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+            yield number, ['' if v is None else v for v in values]
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, fmt):
+    """(satır no, {alan: değer}) üretir; ilk değer ignored_columns listesidir."""
+    if fmt not in FORMATS:
+        raise ImportFileError(f"Unsupported format: {fmt}")
+    rows = _csv_rows(stream) if fmt == 'csv' else _xlsx_rows(stream)
+    try:
+        _, header = next(rows)
+    except StopIteration:
+        raise ImportFileError("File is empty")
+    fields = [_header_field(name) for name in header]
+    if 'title' not in fields:
+        raise ImportFileError("Header row must contain a 'title' column")
+    yield [str(name) for name, field in zip(header, fields) if field is None and str(name).strip()]
+    for number, values in rows:
+        if not any(str(v).strip() for v in values):
+            continue
+        yield number, {field: value for field, value in zip(fields, values) if field is not None}
+
+
+# ---------------------------------------------------------------------------
+# Doğrulama
+# ---------------------------------------------------------------------------
+
+def validate(raw):
+    """(temiz satır, [(alan, hata)]) — hata listesi boşsa satır yazılabilir."""
+    row, errors = {}, []
+    for field in FIELDS:
+        value = raw.get(field)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value).strip() if value is not None else ''
+        row[field] = value or None
+
+    if not row['title']:
+        errors.append(('title', 'Title is required'))
+    for field, limit in MAX_LENGTHS.items():
+        if row[field] and len(row[field]) > limit:
+            errors.append((field, f'Longer than {limit} characters'))
+    if row['classification']:
+        row['classification'] = _CLASSIFICATIONS.get(_key(row['classification']), row['classification'])
+        if row['classification'] not in CLASSIFICATIONS:
+            errors.append(('classification', f"Must be one of {', '.join(CLASSIFICATIONS)}"))
+    if row['priority']:
+        row['priority'] = _PRIORITIES.get(_key(row['priority']), row['priority'])
+        if row['priority'] not in PRIORITIES:
+            errors.append(('priority', f"Must be one of {', '.join(PRIORITIES)}"))
+    if row['module']:
+        row['module'] = row['module'].upper()
+        if row['module'] not in _MODULES:
+            errors.append(('module', 'Unknown SAP module'))
+    for field in ('analysis_id', 'session_id'):
+        if row[field] is not None:
+            try:
+                row[field] = int(row[field])
+            except ValueError:
+                errors.append((field, 'Must be an integer'))
+    return row, errors
+
+
+# ---------------------------------------------------------------------------
+# Yazma
+# ---------------------------------------------------------------------------
+
+UPDATE_FIELDS = tuple(f for f in FIELDS if f != 'code')
+INSERT_SQL = (f"INSERT INTO {TABLE} (project_id, {', '.join(FIELDS)}, conversion_status, created_at) "
+              f"VALUES (?, {', '.join('?' * len(FIELDS))}, 'None', ?)")
+# NULL (dosyada kolon yok / hücre boş) mevcut değeri korur
+UPDATE_SQL = (f"UPDATE {TABLE} SET {', '.join(f'{f} = COALESCE(?, {f})' for f in UPDATE_FIELDS)} "
+              f"WHERE project_id = ? AND code = ?")
+
+
+def _existing_codes(conn, project_id):
+    return {code for (code,) in conn.execute(
+        f"SELECT code FROM {TABLE} WHERE project_id = ? AND code IS NOT NULL", (project_id,))}
+
+
+def _project_refs(conn, project_id):
+    """Projenin geçerli (session_id'leri, analysis_id'leri)."""
+    sessions = {sid for (sid,) in conn.execute(
+        "SELECT id FROM analysis_sessions WHERE project_id = ?", (project_id,))}
+    analyses = {aid for (aid,) in conn.execute(
+        "SELECT a.id FROM analyses a JOIN analysis_sessions s ON a.session_id = s.id "
+        "WHERE s.project_id = ?", (project_id,))}
+    return sessions, analyses
+
+
+def _write_batch(conn, project_id, batch, existing, now):
+    """(eklenen id'ler, eklenen kodlar, güncellenen kodlar); transaction'ı çağıran commit eder.
+
+    Satırlar kopyalanır: geri alınan bir denemede ayrılan kodlar satıra yapışmaz.
+    """
+    inserts = [dict(row) for _, row in batch if row['code'] not in existing]
+    updates = [row for _, row in batch if row['code'] in existing]
+    missing = [row for row in inserts if row['code'] is None]
+    if missing:
+        first = reserve(conn, project_id, TABLE, len(missing))
+        for number, row in enumerate(missing, start=first):
+            row['code'] = f'{CODE_PREFIX}-{number:03d}'
+    inserted_ids = []
+    if inserts:
+        # id'ler lastrowid'den; eşzamanlı yazan başka bir bağlantının satırları karışmaz
+        for row in inserts:
+            values = dict(row, **{f: row[f] or default for f, default in DEFAULTS.items()})
+            cursor = conn.execute(INSERT_SQL, (project_id, *(values[f] for f in FIELDS), now))
+            inserted_ids.append(cursor.lastrowid)
+    if updates:
+        conn.executemany(UPDATE_SQL, [(*(row[f] for f in UPDATE_FIELDS), project_id, row['code'])
+                                      for row in updates])
+    return inserted_ids, [row['code'] for row in inserts], [row['code'] for row in updates]
+
+
+def import_requirements(conn, stream, fmt, project_id, batch_size=BATCH_SIZE, dry_run=False,
+                        max_errors=MAX_ERRORS, on_batch=None):
+    """Dosyayı okuyup new_requirements'a upsert eder; satır bazlı hata raporu döner.
+
+    on_batch(inserted_ids, updated_codes) her başarılı commit'ten sonra çağrılır.
+    """
+    started = time.perf_counter()
+    report = {'project_id': project_id, 'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0,
+              'dry_run': dry_run, 'ignored_columns': [], 'errors': [], 'errors_truncated': False}
+
+    def error(number, field, message):
+        if len(report['errors']) < max_errors:
+            report['errors'].append({'row': number, 'field': field, 'error': message})
+        else:
+            report['errors_truncated'] = True
+
+    existing = _existing_codes(conn, project_id)
+    sessions, analyses = _project_refs(conn, project_id)
+    seen = {}
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        if dry_run:
+            report['inserted'] += sum(1 for _, row in batch if row['code'] not in existing)
+            report['updated'] += sum(1 for _, row in batch if row['code'] in existing)
+            batch.clear()
+            return
+        # ORM'in yazdığı biçim (UTC, mikrosaniye); sıralama ve cursor ORM satırlarıyla tutarlı kalır
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        try:
+            inserted_ids, inserted_codes, updated_codes = _write_batch(conn, project_id, batch, existing, now)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Hatalı satırı bulmak için tek tek; diğer satırlar yine yazılır
+            inserted_ids, inserted_codes, updated_codes = [], [], []
+            for item in batch:
+                try:
+                    ids, codes, updated = _write_batch(conn, project_id, [item], existing, now)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    report['failed'] += 1
+                    error(item[0], None, f'Write failed: {e}')
+                else:
+                    inserted_ids += ids
+                    inserted_codes += codes
+                    updated_codes += updated
+        report['inserted'] += len(inserted_ids)
+        report['updated'] += len(updated_codes)
+        existing.update(inserted_codes)
+        if on_batch is not None and (inserted_ids or updated_codes):
+            on_batch(inserted_ids, updated_codes)
+        batch.clear()
+
+    rows = read_rows(stream, fmt)
+    report['ignored_columns'] = next(rows)
+    for number, raw in rows:
+        report['rows'] += 1
+        row, errors = validate(raw)
+        for field, valid, message in (('session_id', sessions, 'Not a session of this project'),
+                                      ('analysis_id', analyses, 'Not an analysis of this project')):
+            if isinstance(row[field], int) and row[field] not in valid:
+                errors.append((field, message))
+        if row['code'] is not None and not errors:
+            if row['code'] in seen:
+                errors.append(('code', f"Duplicate code in file (row {seen[row['code']]})"))
+            else:
+                seen[row['code']] = number
+        if errors:
+            report['failed'] += 1
+            for field, message in errors:
+                error(number, field, message)
+            continue
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    elapsed = time.perf_counter() - started
+    report['elapsed_ms'] = round(elapsed * 1000, 1)
+    report['rows_per_min'] = round(report['rows'] / elapsed * 60) if elapsed else 0
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import os
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description='Import requirements from a CSV/XLSX workshop export')
+    parser.add_argument('path')
+    parser.add_argument('--project-id', type=int, required=True)
+    parser.add_argument('--format', choices=FORMATS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    fmt = args.format or ('xlsx' if args.path.lower().endswith('.xlsx') else 'csv')
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    with open(args.path, 'rb') as f:
+        result = import_requirements(conn, f, fmt, args.project_id, batch_size=args.batch_size,
+                                     dry_run=args.dry_run)
+    conn.close()
+    errors = result.pop('errors')
+    print(json.dumps(result, indent=2))
+    for error in errors[:20]:
+        print(f"  row {error['row']}: {error['field'] or '-'}: {error['error']}")
+    if len(errors) > 20:
+        print(f"  ... {result['failed'] - 20} more")
@@ -0,0 +1,274 @@
+"""
+ProjektCoPilot — Composite Scenario Graph
+=========================================
+Composite senaryolar alt senaryolarını Scenario.included_scenario_ids
+serbest metin alanında tutuyordu ("12, S-004" gibi); iç içe composite'leri
+açan bir şey yoktu. SIT/UAT planlaması için bir senaryonun tüm yaprak
+senaryoları ve bunlara scenario_test_case ile bağlı test case'ler gerekir.
+
+- parse() metni (JSON listesi veya virgül / noktalı virgül / boşlukla
+  ayrılmış değerler) token'lara ayırır; sayılar scenarios.id, diğerleri
+  aynı projedeki scenarios.scenario_id kodu olarak çözülür. Çözülemeyen
+  token'lar, kendine referans ve başka projedeki senaryolar edge olmaz.
+- Edge'ler scenario_edge(parent_id, child_id, project_id) tablosunda
+  tutulur; senaryo yazıldığında sync() o senaryonun edge'lerini yeniler.
+  Yalnızca is_composite senaryoların edge'i olur.
+- load() projenin tüm edge'lerini tek sorguyla okur, Tarjan SCC ile
+  döngüleri bulur ve kapanışı (her düğümden erişilebilen düğümler) SCC
+  DAG'ı üzerinde ters topolojik sırayla birleştirerek hesaplar. Sonuç
+  (ProjectGraph) proje başına StatsCache'te tutulur; senaryo yazan
+  endpoint'ler invalidate(project_id) çağırır.
+- Döngü oluşturan yazmalar API'de reddedilir (400); eski veride kalan
+  döngüler ProjectGraph.cycles ile raporlanır.
+
+  GET /api/scenarios/<id>/expanded → yaprak senaryolar + tekilleştirilmiş test case'ler
+
+CLI:
+  python scenario_graph.py rebuild    # scenario_edge'i included_scenario_ids'den yeniden doldur
+"""
+
+import json
+import re
+
+TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS scenario_edge (
+        parent_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+        child_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+        project_id INTEGER NOT NULL,
+        PRIMARY KEY (parent_id, child_id)
+    )
+'''
+INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS ix_scenario_edge_project ON scenario_edge(project_id)",
+    "CREATE INDEX IF NOT EXISTS ix_scenario_edge_child ON scenario_edge(child_id)",
+)
+
+_SPLIT_RE = re.compile(r'[\s,;]+')
+
+# Tek sorguda kapanıştaki senaryolara bağlı test case'ler; test case başına bir satır
+TEST_CASES_SQL = '''
+    SELECT tm.id, tm.code, tm.title, tm.test_type, tm.status, tm.source_type, tm.source_id,
+           group_concat(stc.scenario_id) AS scenario_ids
+    FROM scenario_test_case stc
+    JOIN test_management tm ON tm.id = stc.test_case_id
+    WHERE stc.scenario_id IN (SELECT value FROM json_each(?))
+    GROUP BY tm.id
+    ORDER BY tm.code
+'''
+
+
+def install(conn):
+    conn.execute(TABLE_SQL)
+    for sql in INDEX_SQL:
+        conn.execute(sql)
+
+
+def parse(text):
+    """included_scenario_ids metni → token listesi (sıra korunur, tekrarlar atılır)"""
+    if not text:
+        return []
+    text = str(text).strip()
+    values = None
+    if text.startswith('['):
+        try:
+            values = json.loads(text)
+        except ValueError:
+            values = None
+    if not isinstance(values, list):
+        values = _SPLIT_RE.split(text)
+    tokens = []
+    for value in values:
+        token = str(value).strip()
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def resolve(conn, project_id, scenario_id, tokens):
+    """token'lar → (child id listesi, çözülemeyen token'lar)"""
+    if not tokens:
+        return [], []
+    ids, codes = set(), {}
+    for row_id, code in conn.execute("SELECT id, scenario_id FROM scenarios WHERE project_id = ?",
+                                     (project_id,)).fetchall():
+        ids.add(row_id)
+        if code:
+            codes[code.upper()] = row_id
+    children, unresolved = [], []
+    for token in tokens:
+        child = int(token) if token.isdigit() and int(token) in ids else codes.get(token.upper())
+        if child is None or child == scenario_id:
+            unresolved.append(token)
+        elif child not in children:
+            children.append(child)
+    return children, unresolved
+
+
+def sync(conn, scenario_id, project_id, text, is_composite=True):
+    """Senaryonun edge'lerini metinden yeniler; (child id'ler, çözülemeyen token'lar) döner."""
+    conn.execute("DELETE FROM scenario_edge WHERE parent_id = ?", (scenario_id,))
+    if not is_composite or project_id is None:
+        return [], []
+    children, unresolved = resolve(conn, project_id, scenario_id, parse(text))
+    conn.executemany("INSERT INTO scenario_edge (parent_id, child_id, project_id) VALUES (?, ?, ?)",
+                     [(scenario_id, child, project_id) for child in children])
+    return children, unresolved
+
+
+def remove(conn, scenario_id):
+    """Silinen senaryonun gelen / giden edge'leri"""
+    conn.execute("DELETE FROM scenario_edge WHERE parent_id = ? OR child_id = ?", (scenario_id, scenario_id))
+
+
+def rebuild(conn, project_id=None):
+    """scenario_edge'i composite senaryoların metninden baştan üretir; {"scenarios", "edges", "unresolved"}"""
+    install(conn)
+    sql = "SELECT id, project_id, included_scenario_ids FROM scenarios WHERE is_composite = 1"
+    params = ()
+    if project_id is not None:
+        conn.execute("DELETE FROM scenario_edge WHERE project_id = ?", (project_id,))
+        sql += " AND project_id = ?"
+        params = (project_id,)
+    else:
+        conn.execute("DELETE FROM scenario_edge")
+    result = {'scenarios': 0, 'edges': 0, 'unresolved': 0}
+    for scenario_id, scenario_project, text in conn.execute(sql, params).fetchall():
+        children, unresolved = sync(conn, scenario_id, scenario_project, text)
+        result['scenarios'] += 1
+        result['edges'] += len(children)
+        result['unresolved'] += len(unresolved)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Kapanış
+# ---------------------------------------------------------------------------
+
+class ProjectGraph:
+    """Bir projenin inclusion grafiği: children, kapanış ve döngüler."""
+
+    def __init__(self, project_id, edges):
+        self.project_id = project_id
+        self.children = {}
+        for parent, child in edges:
+            self.children.setdefault(parent, []).append(child)
+        self.cycles = []
+        self._reach = {}
+        self._close()
+
+    def _close(self):
+        """Tarjan SCC (iteratif); SCC'ler ters topolojik sırada çıkar, kapanış bu sırayla birleştirilir."""
+        index, low, on_stack, stack = {}, {}, set(), []
+        counter = 0
+        for root in list(self.children):
+            if root in index:
+                continue
+            work = [(root, iter(self.children.get(root, ())))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, successors = work[-1]
+                advanced = False
+                for child in successors:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.children.get(child, ()))))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    self._add_component(component)
+
+    def _add_component(self, component):
+        members = set(component)
+        reach = set(members) if len(component) > 1 else set()
+        for member in component:
+            for child in self.children.get(member, ()):
+                if child not in members:
+                    reach.add(child)
+                    reach |= self._reach.get(child, frozenset())
+        reach = frozenset(reach)
+        for member in component:
+            self._reach[member] = reach
+        if len(component) > 1:
+            self.cycles.append(sorted(component))
+
+    def descendants(self, scenario_id):
+        """Erişilebilen tüm senaryolar (kendisi döngüdeyse kendisi dahil)"""
+        return self._reach.get(scenario_id, frozenset())
+
+    def leaves(self, scenario_id):
+        """Kapanıştaki alt senaryosu olmayan senaryolar; senaryo composite değilse kendisi"""
+        descendants = self.descendants(scenario_id)
+        if not descendants:
+            return [scenario_id]
+        return sorted(node for node in descendants if not self.children.get(node))
+
+    def cycle_of(self, scenario_id):
+        return next((cycle for cycle in self.cycles if scenario_id in cycle), None)
+
+    def to_dict(self):
+        return {
+            'project_id': self.project_id,
+            'composites': len(self.children),
+            'edges': sum(len(children) for children in self.children.values()),
+            'cycles': self.cycles,
+        }
+
+
+def load(conn, project_id):
+    """Projenin edge'lerini tek sorguyla okuyup ProjectGraph kurar."""
+    edges = conn.execute("SELECT parent_id, child_id FROM scenario_edge WHERE project_id = ? ORDER BY parent_id, child_id",
+                         (project_id,)).fetchall()
+    return ProjectGraph(project_id, [(parent, child) for parent, child in edges])
+
+
+def test_cases(conn, scenario_ids):
+    """Senaryolara bağlı test case'ler; her test case bir kez, bağlı olduğu senaryo id'leriyle"""
+    rows = conn.execute(TEST_CASES_SQL, (json.dumps(sorted(scenario_ids)),)).fetchall()
+    return [{
+        'id': row[0],
+        'code': row[1],
+        'title': row[2],
+        'test_type': row[3],
+        'status': row[4],
+        'source_type': row[5],
+        'source_id': row[6],
+        'scenario_ids': sorted(int(value) for value in row[7].split(',')),
+    } for row in rows]
+
+
+if __name__ == '__main__':
+    import os
+    import sqlite3
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print("Usage: python scenario_graph.py rebuild")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    result = rebuild(conn)
+    conn.commit()
+    conn.close()
+    print(f"✓ {result['scenarios']} composite scenario(s), {result['edges']} edge(s), "
+          f"{result['unresolved']} unresolved reference(s)")
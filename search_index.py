@@ -0,0 +1,212 @@
+"""
+ProjektCoPilot — Full-Text Search
+=================================
+Requirement / WRICEF / config / doküman / karar metinlerinde arama yoktu;
+sunucu tarafında tek seçenek Text kolonlarında `LIKE '%x%'` taramasıydı.
+Bu modül tüm kaynak tabloları tek bir SQLite FTS5 tablosunda indeksler:
+
+  search_index(entity_type UNINDEXED, entity_id UNINDEXED,
+               project_id UNINDEXED, code, title, body, tags)
+
+- rowid = entity_id * TYPE_SLOTS + tip kodu; silme/güncelleme rowid ile
+  yapılır, tarama gerekmez.
+- project_id / entity_type filtreleri `tags` kolonundaki p<project_id> ve
+  t<tip kodu> token'ları ile MATCH içinde uygulanır; UNINDEXED kolonda
+  filtrelemek her eşleşmenin satırını okumayı gerektirirdi.
+- Her kaynak tablo için AFTER INSERT / UPDATE OF <metin kolonları> /
+  DELETE trigger'ları index'i aynı transaction'da günceller; status gibi
+  alanların değişmesi index'e dokunmaz.
+- Sıralama bm25; kolon ağırlıkları code > title > body. bm25 her eşleşme
+  için hesaplandığından maliyet eşleşme sayısıyla doğrusal büyür (1M satırda
+  ~900k eşleşme ≈ 1.5 s). Eşleşme RANK_MAX_HITS'i aşarsa sonuçlar rowid
+  (en yeni önce) sırasıyla döner ve yanıtta ranked=false olur; FTS5 bu
+  sırayı sıralama yapmadan üretir. Bkz. benchmarks/bench_search.py.
+- Sorgu metni FTS5 sözdizimine çevrilir (her kelime tırnaklı, son kelime
+  önek araması), kullanıcı girdisi FTS5 operatörü olarak yorumlanmaz.
+- highlight/snippet çıktısı HTML-escape edilir; yalnızca <mark> etiketleri
+  ham kalır.
+
+  GET /api/search?q=pricing&project_id=1&types=wricef,decision&page=1&per_page=20
+
+CLI:
+  python search_index.py rebuild    # trigger'ları kur, index'i sıfırdan doldur
+  python search_index.py optimize   # FTS5 segmentlerini birleştir
+"""
+
+import html
+import re
+
+# entity_type → (tip kodu, tablo, code kolonu, title kolonu, body kolonları)
+SOURCES = {
+    'requirement': (1, 'new_requirements', 'code', 'title', ('description', 'acceptance_criteria')),
+    'wricef': (2, 'wricef_items', 'code', 'title', ('description', 'fs_content', 'ts_content')),
+    'config_item': (3, 'config_items', 'code', 'title', ('description', 'config_details')),
+    'document': (4, 'fs_ts_documents', 'document_type', 'template_used', ('content',)),
+    'decision': (5, 'decisions', 'decision_id', 'topic', ('description', 'decision_made', 'rationale')),
+}
+TYPE_SLOTS = 8
+
+# project_id kolonu olmayan kaynaklar: entity_type → (bağlantı kolonu, project_id'yi taşıyan tablo).
+# fs_ts_documents.requirement_id, /api/documents'taki gibi requirements tablosuna bağlanır.
+PARENTS = {
+    'document': ('requirement_id', 'requirements'),
+}
+
+# bm25 ağırlıkları: entity_type, entity_id, project_id, code, title, body, tags
+BM25_WEIGHTS = (0.0, 0.0, 0.0, 10.0, 5.0, 1.0, 0.0)
+SNIPPET_TOKENS = 16
+RANK_MAX_HITS = 10000
+MAX_PER_PAGE = 100
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        entity_type UNINDEXED, entity_id UNINDEXED, project_id UNINDEXED,
+        code, title, body, tags,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+'''
+
+
+def _row_sql(entity_type, ref):
+    """ref (NEW / OLD / tablo adı) için search_index satırının SELECT ifadeleri"""
+    type_code, _, code, title, body = SOURCES[entity_type]
+    body_sql = " || ' ' || ".join(f"COALESCE({ref}.{column}, '')" for column in body)
+    project = _project_sql(entity_type, ref)
+    return (f"{ref}.id * {TYPE_SLOTS} + {type_code}, '{entity_type}', {ref}.id, {project}, "
+            f"COALESCE({ref}.{code}, ''), COALESCE({ref}.{title}, ''), {body_sql}, "
+            f"'p' || COALESCE({project}, '') || ' t{type_code}'")
+
+
+def _project_sql(entity_type, ref):
+    if entity_type not in PARENTS:
+        return f"{ref}.project_id"
+    column, parent = PARENTS[entity_type]
+    return f"(SELECT project_id FROM {parent} WHERE id = {ref}.{column})"
+
+
+INSERT_PREFIX = "INSERT INTO search_index (rowid, entity_type, entity_id, project_id, code, title, body, tags)"
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def install(conn):
+    """FTS tablosu + mevcut kaynak tablolar için trigger'lar; kurulan entity_type'lar döner."""
+    conn.execute(TABLE_SQL)
+    installed = []
+    for entity_type, (type_code, table, code, title, body) in SOURCES.items():
+        column, parent = PARENTS.get(entity_type, ('project_id', None))
+        if not _table_exists(conn, table) or (parent and not _table_exists(conn, parent)):
+            continue
+        columns = ', '.join((column, code, title) + body)
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS search_{table}_ai AFTER INSERT ON {table} BEGIN
+                {INSERT_PREFIX} SELECT {_row_sql(entity_type, 'NEW')};
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS search_{table}_au AFTER UPDATE OF {columns} ON {table} BEGIN
+                DELETE FROM search_index WHERE rowid = OLD.id * {TYPE_SLOTS} + {type_code};
+                {INSERT_PREFIX} SELECT {_row_sql(entity_type, 'NEW')};
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS search_{table}_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM search_index WHERE rowid = OLD.id * {TYPE_SLOTS} + {type_code};
+            END
+        ''')
+        installed.append(entity_type)
+    return installed
+
+
+def rebuild(conn):
+    """Index'i kaynak tablolardan yeniden doldurur; {entity_type: satır sayısı}"""
+    counts = {}
+    installed = install(conn)
+    conn.execute("DELETE FROM search_index")
+    for entity_type in installed:
+        table = SOURCES[entity_type][1]
+        counts[entity_type] = conn.execute(
+            f"{INSERT_PREFIX} SELECT {_row_sql(entity_type, table)} FROM {table}").rowcount
+    return counts
+
+
+def build_query(text, project_id=None, types=None):
+    """Serbest metin → güvenli FTS5 MATCH ifadesi; kelime yoksa None.
+    Kelimeler AND ile bağlanır, son kelime önek olarak aranır; filtreler tags üzerinden."""
+    terms = _TERM_RE.findall(text or '')
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    match = f"{{code title body}} : ({' '.join(quoted)})"
+    if project_id is not None:
+        match += f" AND tags : p{int(project_id)}"
+    if types:
+        match += f" AND tags : ({' OR '.join(f't{SOURCES[t][0]}' for t in types)})"
+    return match
+
+
+def _marked(text):
+    return html.escape(text or '').replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def search(conn, text, project_id=None, types=None, page=1, per_page=20):
+    """{"query", "total", "ranked", "page", "per_page", "results": [...]}; ranked ise bm25 sırasıyla."""
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    page = max(1, page)
+    match = build_query(text, project_id, types)
+    empty = {'query': text, 'total': 0, 'ranked': True, 'page': page, 'per_page': per_page, 'results': []}
+    if match is None:
+        return empty
+
+    total = conn.execute("SELECT COUNT(*) FROM search_index WHERE search_index MATCH ?", (match,)).fetchone()[0]
+    if total == 0:
+        return empty
+    ranked = total <= RANK_MAX_HITS
+    marks = f"'{_MARK_OPEN}', '{_MARK_CLOSE}'"
+    rows = conn.execute(f'''
+        SELECT entity_type, entity_id, project_id,
+               highlight(search_index, 3, {marks}),
+               highlight(search_index, 4, {marks}),
+               snippet(search_index, 5, {marks}, '…', {SNIPPET_TOKENS}),
+               bm25(search_index, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score
+        FROM search_index
+        WHERE search_index MATCH ?
+        ORDER BY {'score' if ranked else 'rowid DESC'}
+        LIMIT ? OFFSET ?
+    ''', (match, per_page, (page - 1) * per_page)).fetchall()
+    results = [{
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'project_id': row_project_id,
+        'code': _marked(code),
+        'title': _marked(title),
+        'snippet': _marked(snippet).strip(),
+        'score': round(-score, 4),
+    } for entity_type, entity_id, row_project_id, code, title, snippet, score in rows]
+    return dict(empty, total=total, ranked=ranked, results=results)
+
+
+if __name__ == '__main__':
+    import os
+    import sqlite3
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('rebuild', 'optimize'):
+        print("Usage: python search_index.py rebuild|optimize")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    if sys.argv[1] == 'rebuild':
+        for entity_type, count in rebuild(conn).items():
+            print(f"✓ {entity_type}: {count} row(s)")
+    else:
+        conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+        print("✓ search_index optimized")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,147 @@
+"""
+ProjektCoPilot — Sequence Allocator
+===================================
+generate_auto_id() ve models.generate_code() bir sonraki kodu bulmak için
+tabloyu `ORDER BY id DESC` / `LIKE 'PRJ-Q%'` ile tarıyordu; bu hem O(tablo)
+hem de eşzamanlı insert'lerde aynı kodu üretiyordu.
+
+Burada her (project_id, item_type) çifti için `id_sequences` tablosunda
+bir sayaç tutulur. Sayaç, insert ile aynı transaction içinde atomik
+olarak artırılır (UPDATE yazma kilidini alır; commit'e kadar kimse aynı
+değeri okuyamaz, rollback olursa sayaç da geri alınır).
+
+Kullanım:
+  num = next_value(conn, project_id, 'Q')          # tek kod
+  first = reserve(conn, project_id, 'Q', 500)      # toplu import: first..first+499
+  backfill(conn)                                   # mevcut kodlardan sayaçları doldur
+
+CLI:
+  python sequences.py backfill
+"""
+
+import re
+import sqlite3
+
+SEQUENCE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS id_sequences (
+        project_id INTEGER NOT NULL,
+        item_type TEXT NOT NULL,
+        last_value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (project_id, item_type)
+    ) WITHOUT ROWID
+'''
+
+# generate_auto_id tipleri: kod formatı "{project_code}-{tip}{numara:03d}"
+AUTO_ID_SOURCES = {
+    "Q": ("questions", "question_id"),
+    "G": ("fitgap", "gap_id"),
+    "D": ("decisions", "decision_id"),
+    "R": ("risks_issues", "item_id"),
+    "I": ("risks_issues", "item_id"),
+    "A": ("action_items", "action_id"),
+    "W": ("analysis_sessions", "session_code"),
+    "S": ("scenarios", "scenario_id"),
+    "WR": ("wricef", "wricef_id"),
+    "C": ("configs", "config_id"),
+}
+
+# models.generate_code tabloları: kod formatı "{prefix}-{numara:03d}", sayaç anahtarı tablo adı
+MODEL_CODE_TABLES = ('wricef_items', 'config_items', 'test_management', 'new_requirements',
+                     'test_cycle', 'test_execution', 'defect')
+
+# Eski TST-<epoch> kodları sayaç aralığıyla çakışamaz; backfill'de yok sayılır
+_LEGACY_TIMESTAMP_FLOOR = 10 ** 9
+
+_AUTO_ID_RE = re.compile(r'^(?P<project>.+)-(?P<type>[A-Z]+)(?P<num>\d+)$')
+
+
+def reserve(conn, project_id, item_type, count=1):
+    """`count` adet ardışık numara ayırır ve ilkini döner.
+
+    conn: sqlite3.Connection veya repository.SessionConnection; çağıranın
+    transaction'ı içinde çalışır, commit/rollback çağırana aittir.
+    """
+    if count < 1:
+        raise ValueError("count must be >= 1")
+    conn.execute(
+        "INSERT OR IGNORE INTO id_sequences (project_id, item_type, last_value) VALUES (?, ?, 0)",
+        (project_id, item_type))
+    conn.execute(
+        "UPDATE id_sequences SET last_value = last_value + ? WHERE project_id = ? AND item_type = ?",
+        (count, project_id, item_type))
+    last = conn.execute(
+        "SELECT last_value FROM id_sequences WHERE project_id = ? AND item_type = ?",
+        (project_id, item_type)).fetchone()[0]
+    return last - count + 1
+
+
+def next_value(conn, project_id, item_type):
+    return reserve(conn, project_id, item_type, 1)
+
+
+def _bump(conn, project_id, item_type, value):
+    conn.execute('''
+        INSERT INTO id_sequences (project_id, item_type, last_value) VALUES (?, ?, ?)
+        ON CONFLICT (project_id, item_type) DO UPDATE SET last_value = MAX(last_value, excluded.last_value)
+    ''', (project_id, item_type, value))
+
+
+def _column_exists(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})").fetchall())
+
+
+def backfill(conn):
+    """Mevcut kodlardan sayaçları doldurur (tek seferlik; tekrar çalıştırmak güvenli).
+
+    Her kaynak tablo bir kez taranır. Sayaç hiçbir zaman geri alınmaz:
+    last_value = MAX(last_value, gözlenen en büyük numara).
+    """
+    projects = {row[0]: row[1] for row in conn.execute("SELECT project_code, id FROM projects").fetchall()}
+    maxima = {}
+
+    for item_type, (table, column) in AUTO_ID_SOURCES.items():
+        if not _column_exists(conn, table, column):
+            continue
+        for (code,) in conn.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL").fetchall():
+            match = _AUTO_ID_RE.match(str(code))
+            if not match or match.group('type') != item_type:
+                continue
+            project_id = projects.get(match.group('project'))
+            if project_id is None:
+                continue
+            key = (project_id, item_type)
+            maxima[key] = max(maxima.get(key, 0), int(match.group('num')))
+
+    for table in MODEL_CODE_TABLES:
+        if not _column_exists(conn, table, 'code') or not _column_exists(conn, table, 'project_id'):
+            continue
+        for project_id, code in conn.execute(
+                f"SELECT project_id, code FROM {table} WHERE code IS NOT NULL AND project_id IS NOT NULL").fetchall():
+            try:
+                num = int(str(code).split('-')[-1])
+            except ValueError:
+                continue
+            if num >= _LEGACY_TIMESTAMP_FLOOR:
+                continue
+            key = (project_id, table)
+            maxima[key] = max(maxima.get(key, 0), num)
+
+    for (project_id, item_type), value in maxima.items():
+        _bump(conn, project_id, item_type, value)
+    return len(maxima)
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'backfill':
+        print("Usage: python sequences.py backfill")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute(SEQUENCE_TABLE_SQL)
+    count = backfill(conn)
+    conn.commit()
+    conn.close()
+    print(f"✓ {count} sequence(s) backfilled")
@@ -0,0 +1,122 @@
+"""
+ProjektCoPilot — Dashboard Stats Cache
+======================================
+get_dashboard_stats() ve get_analysis_stats() her çağrıda analysis_sessions
+üzerinden JOIN'li 5-7 ayrı COUNT(*) sorgusu çalıştırıyordu; SPA bunları her
+proje değişiminde çağırır.
+
+Burada:
+- Bir projenin sayaçları `project_counters` tablosundan (counters.py) tek
+  bir primary key aralık okuması ile gelir; proje adı/durumu ve son
+  oturumlar (recent_activities) ayrı küçük PK/LIMIT 5 sorgularıdır.
+- Sonuç project_id anahtarıyla bellekte tutulur (StatsCache). Yazma
+  endpoint'leri commit'ten sonra invalidate(project_id) çağırır; proje
+  bilinmiyorsa invalidate() tüm cache'i boşaltır.
+- TTL, uygulama dışından yapılan yazmalar (CLI, migration) için üst sınırdır.
+- Cache süreç başınadır; birden çok worker'da her biri kendi kopyasını tutar.
+
+Kullanım:
+  stats = stats_cache.get(project_id, lambda: load_project_stats(conn, project_id))
+  stats_cache.invalidate(project_id)
+  stats_cache.stats()   # hits / misses / invalidations
+"""
+
+import threading
+import time
+
+from counters import read_counters, read_totals
+
+RECENT_SESSIONS_SQL = '''
+    SELECT * FROM analysis_sessions
+    WHERE project_id = ?
+    ORDER BY created_at DESC LIMIT 5
+'''
+
+
+def _summarize(values):
+    fitgap = values.get('fitgap', {})
+    return {
+        'total_sessions': sum(values.get('sessions', {}).values()),
+        'total_gaps': sum(fitgap.values()),
+        'fit_count': fitgap.get('Fit', 0),
+        'gap_count': sum(v for bucket, v in fitgap.items() if bucket not in ('Fit', '')),
+        'total_questions': sum(values.get('questions', {}).values()),
+        'open_actions': values.get('actions', {}).get('Open', 0),
+        'high_risks': values.get('risks', {}).get('high', 0),
+        'total_projects': sum(values.get('projects', {}).values()),
+        'total_requirements': sum(values.get('requirements', {}).values()),
+    }
+
+
+def load_project_stats(conn, project_id):
+    stats = _summarize(read_counters(conn, project_id))
+    project = conn.execute("SELECT project_name, status FROM projects WHERE id = ?", (project_id,)).fetchone()
+    stats['project_name'] = project['project_name'] if project else None
+    stats['project_status'] = project['status'] if project else None
+    stats['recent_activities'] = [dict(row) for row in conn.execute(RECENT_SESSIONS_SQL, (project_id,)).fetchall()]
+    return stats
+
+
+def load_global_stats(conn):
+    return _summarize(read_totals(conn))
+
+
+class StatsCache:
+    """project_id → istatistik sözlüğü; None anahtarı genel (tüm projeler) istatistiklerdir."""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        # invalidate() her çağrıldığında artar; yükleme sırasında gelen bir
+        # invalidation'dan sonra eski sonuç cache'e yazılmaz
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, loader):
+        key = _key(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl or now - entry[0] < self.ttl):
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now, value)
+        return value
+
+    def invalidate(self, project_id=None):
+        """Projenin ve genel toplamların kaydını siler; project_id yoksa hepsini."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if project_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(_key(project_id), None)
+                self._entries.pop(None, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'ttl': self.ttl,
+            }
+
+
+def _key(project_id):
+    try:
+        return int(project_id)
+    except (TypeError, ValueError):
+        return project_id
@@ -5,7 +5,7 @@ import pytest
 import os
 import tempfile
 import uuid
-from app import app, get_db_connection
+from app import app, ai_cache, db_conn, get_db_connection
 
 
 def unique_code(prefix="TEST"):
@@ -17,10 +17,27 @@ def unique_code(prefix="TEST"):
 def client():
     """Test client fixture"""
     app.config['TESTING'] = True
+    # Cache satırları dağıtılan veritabanına yazılmasın, testler birbirinin sonucunu görmesin
+    ai_cache.enabled = False
     with app.test_client() as client:
         yield client
 
 
+@pytest.fixture
+def ai_cache_enabled(client):
+    """ai_response_cache'i test boyunca açar; tablo test öncesi ve sonrası boşaltılır"""
+    def clear():
+        with db_conn() as conn:
+            conn.execute("DELETE FROM ai_response_cache")
+            conn.commit()
+
+    clear()
+    ai_cache.enabled = True
+    yield ai_cache
+    ai_cache.enabled = False
+    clear()
+
+
 @pytest.fixture
 def temp_db():
     """Create a temporary test database"""
@@ -1906,3 +1923,1565 @@ class TestTestManagementAPI:
         assert test_data['test_type'] == 'PerformanceLoad'
         assert 'PerformanceLoad Test:' in test_data['title']
 
+
+
+class TestDbPool:
+    """Test pooled SQLite connections"""
+
+    def test_connection_reused_across_requests(self, client):
+        """Consecutive requests should reuse pooled connections"""
+        client.get('/api/sessions')
+        before = client.get('/api/system/db-pool').get_json()
+        client.get('/api/sessions')
+        client.get('/api/fitgap')
+        after = client.get('/api/system/db-pool').get_json()
+        assert after['checkouts'] > before['checkouts']
+        assert after['reuses'] > before['reuses']
+        assert after['open'] <= after['size']
+
+    def test_single_connection_per_request(self, client):
+        """A handler and generate_auto_id share one connection"""
+        project_id = client.post('/api/projects', json={
+            'project_code': unique_code('POOL'),
+            'project_name': 'Pool Test Project'
+        }).get_json()['id']
+        client.post('/api/sessions', json={'project_id': project_id, 'session_name': 'Pool Workshop'})
+        from app import db_conn
+        with db_conn() as conn:
+            session_id = conn.execute(
+                'SELECT id FROM analysis_sessions WHERE project_id = ? ORDER BY id DESC LIMIT 1',
+                (project_id,)
+            ).fetchone()['id']
+
+        before = client.get('/api/system/db-pool').get_json()
+        response = client.post('/api/questions', json={'session_id': session_id, 'question_text': 'Pooled?'})
+        assert response.status_code == 201
+        after = client.get('/api/system/db-pool').get_json()
+        assert after['checkouts'] - before['checkouts'] == 1
+
+    def test_failed_rollback_closes_connection(self, tmp_path):
+        """A connection whose rollback fails is closed, not leaked"""
+        import sqlite3
+        from db_pool import SQLitePool
+        pool = SQLitePool(str(tmp_path / 'pool.db'), size=1)
+        conn = pool.acquire()
+        conn.execute('BEGIN')
+
+        def broken_rollback():
+            raise sqlite3.OperationalError('disk I/O error')
+
+        conn.rollback = broken_rollback
+        conn.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+        stats = pool.stats()
+        assert (stats['open'], stats['discarded']) == (0, 1)
+        pool.acquire().close()
+
+    def test_raw_sql_shares_orm_transaction(self, client):
+        """Raw SQL and db.session run on the same connection and transaction"""
+        from app import app, db
+        from models import Project
+        code = unique_code('TXN')
+        with app.app_context():
+            conn = get_db_connection()
+            conn.execute('INSERT INTO projects (project_code, project_name) VALUES (?, ?)', (code, 'Txn Test'))
+            assert db.session.query(Project).filter_by(code=code).count() == 1
+            conn.rollback()
+            assert db.session.query(Project).filter_by(code=code).count() == 0
+
+
+class TestSequenceAllocator:
+    """Test id_sequences based code allocation"""
+
+    def _project_with_session(self, client):
+        code = unique_code('SEQ')
+        project_id = client.post('/api/projects', json={
+            'project_code': code,
+            'project_name': 'Sequence Test Project'
+        }).get_json()['id']
+        client.post('/api/sessions', json={'project_id': project_id, 'session_name': 'Seq Workshop'})
+        from app import db_conn
+        with db_conn() as conn:
+            session_id = conn.execute(
+                'SELECT id FROM analysis_sessions WHERE project_id = ? ORDER BY id DESC LIMIT 1',
+                (project_id,)
+            ).fetchone()['id']
+        return code, project_id, session_id
+
+    def test_auto_ids_are_sequential(self, client):
+        """Consecutive questions get consecutive codes"""
+        code, _, session_id = self._project_with_session(client)
+        ids = [client.post('/api/questions', json={'session_id': session_id, 'question_text': f'Q{n}'})
+               .get_json()['question_id'] for n in range(3)]
+        assert ids == [f'{code}-Q001', f'{code}-Q002', f'{code}-Q003']
+
+    def test_reserve_codes_bulk(self, client):
+        """reserve_codes allocates a contiguous block without reuse"""
+        from app import app, db
+        from models import WricefItem, reserve_codes, generate_code
+        _, project_id, _ = self._project_with_session(client)
+        with app.app_context():
+            block = reserve_codes(WricefItem, project_id, 'WR', 3)
+            single = generate_code(WricefItem, project_id, 'WR')
+            db.session.commit()
+        assert block == ['WR-001', 'WR-002', 'WR-003']
+        assert single == 'WR-004'
+
+    def test_rolled_back_allocation_is_released(self, client):
+        """A rolled back transaction does not consume the number"""
+        from app import app, db
+        from models import WricefItem, generate_code
+        _, project_id, _ = self._project_with_session(client)
+        with app.app_context():
+            generate_code(WricefItem, project_id, 'WR')
+            db.session.rollback()
+            code = generate_code(WricefItem, project_id, 'WR')
+            db.session.commit()
+        assert code == 'WR-001'
+
+
+class TestPagination:
+    """Test keyset pagination and field projection on list endpoints"""
+
+    def _project(self, client):
+        return client.post('/api/projects', json={
+            'project_code': unique_code('PAG'),
+            'project_name': 'Pagination Test Project'
+        }).get_json()['id']
+
+    def test_requirements_cursor_walk(self, client):
+        """limit + X-Next-Cursor walks every row exactly once"""
+        project_id = self._project(client)
+        for n in range(5):
+            client.post('/api/requirements', json={
+                'project_id': project_id, 'code': f'REQ-{n}', 'title': f'Req {n}',
+                'module': 'FI', 'complexity': 'Low'
+            })
+        seen, cursor = [], None
+        while True:
+            url = f'/api/requirements?project_id={project_id}&limit=2'
+            if cursor:
+                url += f'&cursor={cursor}'
+            response = client.get(url)
+            assert response.status_code == 200
+            seen.extend(row['code'] for row in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            assert 'rel="next"' in response.headers['Link']
+        assert seen == [f'REQ-{n}' for n in reversed(range(5))]
+
+    def test_cursor_walk_over_second_precision_rows(self, client):
+        """Rows stored by CURRENT_TIMESTAMP / raw SQL page forward like ORM rows"""
+        from sqlalchemy import text
+        from models import db
+        project_id = self._project(client)
+        with client.application.app_context():
+            for n in range(3):
+                db.session.execute(text("INSERT INTO new_requirements (project_id, code, title) "
+                                        "VALUES (:project_id, :code, 'Raw')"),
+                                   {'project_id': project_id, 'code': f'RAW-{n}'})
+            db.session.execute(text("INSERT INTO new_requirements (project_id, code, title, created_at) "
+                                    "VALUES (:project_id, 'RAW-OLD', 'Raw', '2020-01-01 00:00:00')"),
+                               {'project_id': project_id})
+            db.session.commit()
+        for n in range(2):
+            client.post('/api/new_requirements', json={'project_id': project_id, 'code': f'ORM-{n}',
+                                                      'title': 'ORM'})
+        seen, cursor = [], None
+        for _ in range(10):
+            url = f'/api/new_requirements?project_id={project_id}&limit=2'
+            if cursor:
+                url += f'&cursor={cursor}'
+            response = client.get(url)
+            seen.extend(row['code'] for row in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        assert sorted(seen) == ['ORM-0', 'ORM-1', 'RAW-0', 'RAW-1', 'RAW-2', 'RAW-OLD']
+        assert seen[-1] == 'RAW-OLD'
+
+    def test_questions_walk_null_dates_and_multiple_answers(self, client):
+        """A NULL created_at or several answers rows neither drop nor repeat a question"""
+        from sqlalchemy import text
+        from models import db
+        project_id = self._project(client)
+        client.post('/api/sessions', json={'project_id': project_id, 'session_name': 'Keyset'})
+        session_id = client.get(f'/api/sessions?project_id={project_id}').get_json()[0]['id']
+        with client.application.app_context():
+            ids = []
+            for n, created_at in enumerate((None, '2024-01-01 10:00:00', '2024-01-02 10:00:00')):
+                ids.append(db.session.execute(text(
+                    "INSERT INTO questions (session_id, question_text, answer_text, created_at) "
+                    "VALUES (:s, :q, :a, :c)"),
+                    {'s': session_id, 'q': f'Q{n}', 'a': f'A{n}', 'c': created_at}).lastrowid)
+            for answer in ('First', 'Second'):
+                db.session.execute(text("INSERT INTO answers (question_id, answer_text) VALUES (:q, :a)"),
+                                   {'q': ids[1], 'a': answer})
+            db.session.commit()
+        seen, cursor = [], None
+        for _ in range(10):
+            url = f'/api/questions?session_id={session_id}&limit=1' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url)
+            assert response.status_code == 200
+            seen.extend((row['id'], row['answer_text']) for row in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        assert seen == [(ids[0], 'A0'), (ids[1], 'A1'), (ids[2], 'A2')]
+
+    def test_unpaged_request_returns_full_list(self, client):
+        """Without limit/fields the old full-list response is kept"""
+        project_id = self._project(client)
+        client.post('/api/wricef_items', json={'project_id': project_id, 'code': 'WR-PAG',
+                                               'title': 'Report', 'fs_content': 'x' * 100})
+        response = client.get(f'/api/wricef_items?project_id={project_id}')
+        assert 'X-Next-Cursor' not in response.headers
+        assert response.get_json()[0]['fs_content'] == 'x' * 100
+
+    def test_heavy_fields_only_on_request(self, client):
+        """Paged responses skip fs_content unless it is listed in fields"""
+        project_id = self._project(client)
+        for n in range(3):
+            client.post('/api/wricef_items', json={'project_id': project_id, 'code': f'WR-P{n}',
+                                                   'title': f'Item {n}', 'fs_content': 'spec'})
+        first = client.get(f'/api/wricef_items?project_id={project_id}&limit=2')
+        items = first.get_json()
+        assert len(items) == 2
+        assert all('fs_content' not in item for item in items)
+
+        cursor = first.headers['X-Next-Cursor']
+        rest = client.get(f'/api/wricef_items?project_id={project_id}&limit=2&cursor={cursor}'
+                          f'&fields=code,fs_content').get_json()
+        assert rest == [{'id': rest[0]['id'], 'code': 'WR-P0', 'fs_content': 'spec'}]
+
+    def test_invalid_page_args(self, client):
+        """Bad limit or cursor returns 400"""
+        assert client.get('/api/fitgap?limit=abc').status_code == 400
+        assert client.get('/api/fitgap?limit=0').status_code == 400
+        assert client.get('/api/fitgap?cursor=not-a-cursor').status_code == 400
+
+    def test_stream_ndjson(self, client):
+        """stream=ndjson yields one JSON object per line with heavy fields"""
+        import json
+        project_id = self._project(client)
+        for n in range(3):
+            client.post('/api/wricef_items', json={'project_id': project_id, 'code': f'WR-S{n}',
+                                                   'title': f'Item {n}', 'fs_content': 'spec'})
+        response = client.get(f'/api/wricef_items?project_id={project_id}&stream=ndjson')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [item['code'] for item in lines] == ['WR-S2', 'WR-S1', 'WR-S0']
+        assert all(item['fs_content'] == 'spec' for item in lines)
+
+    def test_stream_json_array_matches_list(self, client):
+        """stream=json returns the same array as the buffered response"""
+        project_id = self._project(client)
+        for n in range(3):
+            client.post('/api/requirements', json={
+                'project_id': project_id, 'code': f'REQ-S{n}', 'title': f'Req {n}',
+                'module': 'FI', 'complexity': 'Low'
+            })
+        buffered = client.get(f'/api/requirements?project_id={project_id}').get_json()
+        streamed = client.get(f'/api/requirements?project_id={project_id}&stream=json')
+        assert streamed.get_json() == buffered
+        assert client.get('/api/requirements?stream=xml').status_code == 400
+
+
+class TestStatsCache:
+    """Test aggregated dashboard stats and their cache"""
+
+    def _project_with_session(self, client):
+        project_id = client.post('/api/projects', json={
+            'project_code': unique_code('STC'),
+            'project_name': 'Stats Cache Project'
+        }).get_json()['id']
+        client.post('/api/sessions', json={'project_id': project_id, 'session_name': 'Cache Workshop'})
+        session_id = client.get(f'/api/sessions?project_id={project_id}').get_json()[0]['id']
+        return project_id, session_id
+
+    def test_repeated_reads_hit_cache(self, client):
+        """Second read of the same project is served from cache"""
+        project_id, _ = self._project_with_session(client)
+        before = client.get('/api/system/stats-cache').get_json()
+        first = client.get(f'/api/analysis/stats?project_id={project_id}').get_json()
+        second = client.get(f'/api/dashboard/stats?project_id={project_id}').get_json()
+        after = client.get('/api/system/stats-cache').get_json()
+        assert first['total_sessions'] == second['total_sessions'] == 1
+        assert second['project_name'] == 'Stats Cache Project'
+        assert after['misses'] - before['misses'] == 1
+        assert after['hits'] - before['hits'] == 1
+
+    def test_writes_invalidate_project_stats(self, client):
+        """Fitgap, question and action writes are visible on the next read"""
+        project_id, session_id = self._project_with_session(client)
+        client.get(f'/api/analysis/stats?project_id={project_id}')
+        client.post('/api/fitgap', json={'session_id': session_id, 'status': 'Fit'})
+        client.post('/api/fitgap', json={'session_id': session_id, 'status': 'Gap'})
+        client.post('/api/questions', json={'session_id': session_id, 'question_text': 'Q?'})
+        client.post('/api/actions', json={'session_id': session_id, 'title': 'Follow up'})
+        client.post('/api/risks', json={'project_id': project_id, 'title': 'Risk',
+                                        'impact': 'High', 'probability': 'High'})
+        data = client.get(f'/api/analysis/stats?project_id={project_id}').get_json()
+        assert data == {'total_sessions': 1, 'fit_count': 1, 'gap_count': 1,
+                        'open_questions': 1, 'open_actions': 1, 'high_risks': 1}
+
+        dashboard = client.get(f'/api/dashboard/stats?project_id={project_id}').get_json()
+        assert dashboard['total_gaps'] == 2
+        assert len(dashboard['recent_activities']) == 1
+
+
+class TestProjectCounters:
+    """Test trigger maintained project_counters"""
+
+    def test_counters_follow_writes(self, client):
+        """Raw SQL and ORM writes update counters in the same transaction"""
+        project_id = client.post('/api/projects', json={
+            'project_code': unique_code('CNT'),
+            'project_name': 'Counter Project'
+        }).get_json()['id']
+        client.post('/api/sessions', json={'project_id': project_id, 'session_name': 'Counter Workshop'})
+        session_id = client.get(f'/api/sessions?project_id={project_id}').get_json()[0]['id']
+        client.post('/api/actions', json={'session_id': session_id, 'title': 'Act'})
+        action_id = client.get(f'/api/actions?session_id={session_id}').get_json()[0]['id']
+        client.put(f'/api/actions/{action_id}', json={'status': 'Done'})
+        item_id = client.post('/api/wricef_items', json={'project_id': project_id, 'code': 'WR-CNT',
+                                                         'title': 'Item'}).get_json()['id']
+        client.put(f'/api/wricef_items/{item_id}', json={'status': 'Approved'})
+
+        counters = client.get(f'/api/projects/{project_id}/counters').get_json()
+        assert counters['sessions'] == {'': 1}
+        assert counters['actions'] == {'Open': 0, 'Done': 1}
+        assert counters['wricef']['Approved'] == 1
+        assert counters['wricef'].get('Draft', 0) == 0
+
+    def test_check_and_rebuild(self, client):
+        """check() reports drift and rebuild() repairs it"""
+        import counters
+        from app import db_conn
+        with db_conn() as conn:
+            assert counters.check(conn) == []
+            conn.execute("UPDATE project_counters SET value = value + 5 "
+                         "WHERE project_id = 0 AND counter = 'projects'")
+            drift = counters.check(conn)
+            assert [row[:3] for row in drift] == [(0, 'projects', '')]
+            counters.rebuild(conn)
+            assert counters.check(conn) == []
+            conn.rollback()
+
+
+class TestQueryPlans:
+    """Test index coverage of registered queries"""
+
+    def test_no_full_scans(self, client):
+        """Every registered hot query is served by an index"""
+        response = client.get('/api/system/query-plans')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['queries']
+        assert data['full_scans'] == []
+
+    def test_every_registered_query_explains(self):
+        """No registered query errors on the migrated database (errors would hide full scans)"""
+        import query_audit
+        from app import db_conn
+        with db_conn() as conn:
+            for name, sql, params in query_audit.REGISTERED_QUERIES:
+                assert query_audit.explain(conn, sql, params), name
+
+    def test_wricef_query_on_init_db_schema(self):
+        """init_db's wricef table gets the columns /api/wricef queries"""
+        import sqlite3
+        import list_queries
+        import query_audit
+        from migrate import _apply_file
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE wricef (id INTEGER PRIMARY KEY AUTOINCREMENT, code TEXT, wricef_id TEXT, "
+                     "title TEXT, wricef_type TEXT, module TEXT, status TEXT DEFAULT 'Draft')")
+        with pytest.raises(sqlite3.OperationalError):
+            query_audit.explain(conn, list_queries.WRICEF_BY_PROJECT_SQL, (1,))
+        _apply_file(conn, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                       'migrations', '018_wricef_legacy_columns.py'))
+        plan = query_audit.explain(conn, list_queries.WRICEF_BY_PROJECT_SQL, (1,))
+        assert any('idx_wricef_project' in detail for detail in plan)
+
+
+class TestMigrationRunner:
+    """Test versioned migrations in migrate.py"""
+
+    def _write(self, directory, filename, content):
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write(content)
+
+    def test_applies_once_in_order(self, temp_db):
+        """Pending migrations run once; the next run is a no-op"""
+        import migrate
+        directory = tempfile.mkdtemp()
+        self._write(directory, '001_items.sql', 'CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT);\n'
+                                                "INSERT INTO items (name) VALUES ('a'); -- seed\n")
+        self._write(directory, '002_more.py', 'def upgrade(conn):\n'
+                                              '    conn.execute("ALTER TABLE items ADD COLUMN note TEXT")\n')
+        applied = migrate.migrate(temp_db, directory, verbose=False)
+        assert [(v, name) for v, name, _ in applied] == [(1, 'items'), (2, 'more')]
+        assert migrate.migrate(temp_db, directory, verbose=False) == []
+        assert [row[:2] for row in migrate.status(temp_db, directory)] == [(1, 'items'), (2, 'more')]
+
+    def test_failed_migration_rolls_back(self, temp_db):
+        """A failing migration leaves no partial changes and is not recorded"""
+        import sqlite3
+        import migrate
+        directory = tempfile.mkdtemp()
+        self._write(directory, '001_items.sql', 'CREATE TABLE items (id INTEGER PRIMARY KEY);\n')
+        self._write(directory, '002_broken.sql', 'CREATE TABLE half (id INTEGER);\n'
+                                                 'ALTER TABLE missing ADD COLUMN x TEXT;\n')
+        with pytest.raises(sqlite3.OperationalError):
+            migrate.migrate(temp_db, directory, verbose=False)
+        conn = sqlite3.connect(temp_db)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert 'items' in tables and 'half' not in tables
+        assert [row[2] is not None for row in migrate.status(temp_db, directory)] == [True, False]
+
+
+class TestAIJobs:
+    """Test background AI generation jobs"""
+
+    def _wait(self, client, job_id):
+        import time
+        for _ in range(200):
+            job = client.get(f'/api/ai/jobs/{job_id}').get_json()
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.01)
+        raise AssertionError('job did not finish')
+
+    def test_generate_fs_returns_job(self, client, monkeypatch):
+        """POST returns 202 with a job id; the job produces the FS content"""
+        import ai_service
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        response = client.post('/api/ai/generate-fs', json={'requirement_code': 'REQ-9',
+                                                            'requirement_title': 'Output', 'module': 'SD'})
+        assert response.status_code == 202
+        accepted = response.get_json()
+        assert response.headers['Location'] == accepted['status_url']
+        job = self._wait(client, accepted['job_id'])
+        assert job['status'] == 'done'
+        assert '## REQ-9 - Output' in job['result']['content']
+        assert job['wait_ms'] is not None and job['run_ms'] is not None
+
+    def test_job_events_stream(self, client, monkeypatch):
+        """SSE stream ends with a done event carrying the result"""
+        import ai_service
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        job_id = client.post('/api/ai/generate-ts', json={'requirement_code': uuid.uuid4().hex}).get_json()['job_id']
+        response = client.get(f'/api/ai/jobs/{job_id}/events')
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+        assert 'event: done' in body
+        assert 'Technical Specification' in body
+        assert client.get('/api/ai/jobs/missing/events').status_code == 404
+
+    def test_queue_limit(self):
+        """Jobs beyond max_queue are rejected and counted"""
+        import threading
+        from ai_jobs import JobManager, JobQueueFull
+        started, release = threading.Event(), threading.Event()
+        manager = JobManager(workers=1, max_queue=1)
+        try:
+            manager.submit('block', lambda progress: (started.set(), release.wait(5)))
+            assert started.wait(5)
+            manager.submit('queued', lambda progress: None)
+            with pytest.raises(JobQueueFull):
+                manager.submit('rejected', lambda progress: None)
+            metrics = manager.metrics()
+            assert metrics['rejected'] == 1
+            assert metrics['queue_depth'] + metrics['running'] == 2
+        finally:
+            release.set()
+            manager.shutdown(wait=True)
+        assert manager.metrics()['completed'] == 2
+
+
+class TestAIStreaming:
+    """Test SSE token streaming for chat and spec generation"""
+
+    def _events(self, response):
+        import json
+        events = []
+        for block in response.get_data(as_text=True).strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((fields['event'], json.loads(fields['data'])))
+        return events
+
+    def test_chat_stream_chunks_and_log(self, client, monkeypatch):
+        """Chunks concatenate to the reply; TTFT is stored in AIInteractionLog once the log buffer flushes"""
+        import ai_service
+        from models import db, AIInteractionLog
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        response = client.post('/api/ai/chat/stream', json={'message': 'pricing procedure'})
+        assert response.mimetype == 'text/event-stream'
+        events = self._events(response)
+        assert [e for e, _ in events[:-1]] == ['chunk'] * (len(events) - 1)
+        event, done = events[-1]
+        assert event == 'done'
+        text = ''.join(data['text'] for _, data in events[:-1])
+        assert 'pricing procedure' in text
+        assert done['time_to_first_token_ms'] is not None
+        assert done['suggestions']
+        from app import ai_log_buffer
+        ai_log_buffer.flush()
+        with client.application.app_context():
+            log = AIInteractionLog.query.filter_by(output_text=text).order_by(AIInteractionLog.id.desc()).first()
+            assert log.interaction_type == 'chat'
+            assert log.response_time_ms == done['time_to_first_token_ms']
+
+    def test_spec_stream_uses_pluggable_backend(self, client):
+        """A custom backend's chunks are streamed as produced"""
+        import ai_service
+
+        class FakeBackend:
+            name = model = 'fake'
+
+            def stream(self, kind, params):
+                yield f"# {kind} {params['requirement_code']}\n"
+                yield 'body'
+
+        ai_service.set_backend(FakeBackend())
+        try:
+            events = self._events(client.post('/api/ai/generate-ts/stream', json={'requirement_code': 'REQ-7'}))
+        finally:
+            ai_service.set_backend(None)
+        assert [data.get('text') for _, data in events[:2]] == ['# ts REQ-7\n', 'body']
+        assert events[-1][0] == 'done' and events[-1][1]['model'] == 'fake'
+
+    def test_generate_reports_backend_model(self, client):
+        """Job results report backend.model (not backend.name), same as the SSE path"""
+        import ai_service
+
+        class NamedBackend:
+            name = 'openai'
+            model = 'gpt-4o-mini'
+
+            def stream(self, kind, params):
+                yield 'spec'
+
+        ai_service.set_backend(NamedBackend())
+        try:
+            assert ai_service.generate('fs', requirement_code='REQ-1')['model'] == 'gpt-4o-mini'
+            job_id = client.post('/api/ai/generate-fs', json={'requirement_code': uuid.uuid4().hex}).get_json()['job_id']
+            job = TestAIJobs()._wait(client, job_id)
+            events = self._events(client.post('/api/ai/generate-fs/stream', json={'requirement_code': 'REQ-2'}))
+        finally:
+            ai_service.set_backend(None)
+        assert job['result']['model'] == events[-1][1]['model'] == 'gpt-4o-mini'
+
+    def test_stream_error_event(self, client):
+        """Backend failures end the stream with an error event"""
+        import ai_service
+
+        class BrokenBackend:
+            name = model = 'broken'
+
+            def stream(self, kind, params):
+                raise RuntimeError('backend unavailable')
+                yield
+
+        ai_service.set_backend(BrokenBackend())
+        try:
+            events = self._events(client.post('/api/ai/generate-fs/stream', json={}))
+        finally:
+            ai_service.set_backend(None)
+        assert events == [('error', {'error': 'backend unavailable'})]
+
+
+class TestAICache:
+    """Test the content-addressed AI response cache"""
+
+    def test_lru_ttl_and_size_cap(self):
+        """Expired entries miss; the least recently used entry is evicted at the cap"""
+        import sqlite3
+        import ai_cache
+        conn = sqlite3.connect(':memory:')
+        ai_cache.install(conn)
+        cache = ai_cache.AIResponseCache(ttl=100, max_entries=2)
+        cache.put(conn, 'a', 'generate-fs', 'mock', 'A', 1, now=0)
+        cache.put(conn, 'b', 'generate-fs', 'mock', 'B', 1, now=1)
+        assert cache.get(conn, 'a', now=2)['content'] == 'A'
+        cache.put(conn, 'c', 'generate-fs', 'mock', 'C', 1, now=3)
+        assert cache.get(conn, 'b', now=4) is None
+        assert cache.get(conn, 'a', now=150) is None
+        assert cache.get(conn, 'c', now=50)['content'] == 'C'
+        assert ai_cache.cache_key('generate-fs', {'x': 1}, 'mock') != ai_cache.cache_key('generate-fs', {'x': 1}, 'gpt')
+        assert cache.lookup(conn, 'missing', now=50) == (None, False)
+        assert cache.lookup(conn, 'c', now=200) == (None, True)
+
+    def test_lookup_commits_only_after_a_write(self, client, ai_cache_enabled, monkeypatch):
+        """A miss or a disabled cache does not commit; a hit does"""
+        import app as app_module
+        params = {'requirement_code': uuid.uuid4().hex}
+        key = app_module.ai_cache_key('generate-fs', params, app_module.ai_service.get_backend().model)
+        with app_module.db_conn() as conn:
+            ai_cache_enabled.put(conn, key, 'generate-fs', 'mock', 'Spec', 3)
+            conn.commit()
+        commits = []
+        monkeypatch.setattr(app_module.db.session, 'commit', lambda: commits.append(1))
+        with app_module.app.test_request_context():
+            assert app_module._cached_spec('generate-fs', {'requirement_code': 'none'}, None)[0] is None
+            assert commits == []
+            assert app_module._cached_spec('generate-fs', params, None)[0]['content'] == 'Spec'
+            assert commits == [1]
+            monkeypatch.setattr(ai_cache_enabled, 'enabled', False)
+            monkeypatch.setattr(app_module, 'get_db_connection', lambda: pytest.fail('disabled cache read the db'))
+            assert app_module._cached_spec('generate-fs', params, None) == (None, key)
+            assert commits == [1]
+
+    def test_repeat_generation_hits_cache(self, client, ai_cache_enabled, monkeypatch):
+        """Second identical request returns immediately and is logged as cached"""
+        import ai_service
+        from models import db, AIInteractionLog
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        project_id = uuid.uuid4().int % 10 ** 9
+        payload = {'requirement_code': uuid.uuid4().hex, 'requirement_title': 'Pricing',
+                   'module': 'SD', 'project_id': project_id}
+
+        first = client.post('/api/ai/generate-fs', json=payload)
+        assert first.status_code == 202
+        job = TestAIJobs()._wait(client, first.get_json()['job_id'])
+        assert job['result']['cached'] is False
+
+        second = client.post('/api/ai/generate-fs', json=payload)
+        assert second.status_code == 200
+        hit = second.get_json()
+        assert hit['cached'] is True
+        assert hit['result']['content'] == job['result']['content']
+        from app import ai_log_buffer
+        ai_log_buffer.flush()
+        with client.application.app_context():
+            logs = AIInteractionLog.query.filter_by(project_id=project_id).order_by(AIInteractionLog.id).all()
+            assert [log.cached for log in logs] == [False, True]
+
+        report = client.get(f'/api/system/ai-cache?project_id={project_id}').get_json()
+        project = report['projects'][0]
+        assert (project['requests'], project['hits'], project['hit_rate']) == (2, 1, 0.5)
+        assert project['tokens_saved'] > 0
+
+    def test_stream_hit(self, client, ai_cache_enabled, monkeypatch):
+        """Cached content is replayed on the SSE endpoint with cached=true"""
+        import ai_service
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        payload = {'requirement_code': uuid.uuid4().hex}
+        miss = TestAIStreaming()._events(client.post('/api/ai/generate-ts/stream', json=payload))
+        hit = TestAIStreaming()._events(client.post('/api/ai/generate-ts/stream', json=payload))
+        assert miss[-1][1]['cached'] is False
+        assert hit[-1] == ('done', dict(hit[-1][1], cached=True))
+        assert hit[0][1]['text'] == ''.join(d['text'] for e, d in miss if e == 'chunk')
+
+
+class TestAIBatch:
+    """Test batch FS/TS generation for WRICEF backlogs"""
+
+    def _items(self, client, count):
+        project_id = uuid.uuid4().int % 10 ** 9
+        ids = []
+        for i in range(count):
+            response = client.post('/api/wricef_items', json={
+                'project_id': project_id, 'code': f'E-{uuid.uuid4().hex[:8]}', 'wricef_type': 'E',
+                'title': f'Batch item {i}', 'module': 'SD'})
+            ids.append(response.get_json()['id'])
+        return project_id, ids
+
+    def test_batch_by_project_writes_content(self, client, monkeypatch):
+        """All items of a project get fs_content; progress is reported per item"""
+        import ai_service
+        from models import db, WricefItem
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        project_id, ids = self._items(client, 3)
+        response = client.post('/api/ai/generate-fs/batch', json={'project_id': project_id})
+        assert response.status_code == 202
+        assert response.get_json()['total'] == 3
+        job_id = response.get_json()['job_id']
+        job = TestAIJobs()._wait(client, job_id)
+        assert (job['result']['completed'], job['result']['failed']) == (3, 0)
+        assert sorted(item['id'] for item in job['progress']['items']) == ids
+        assert [item['id'] for item in job['result']['items']] == ids
+        with client.application.app_context():
+            for item_id in ids:
+                assert 'Functional Specification' in db.session.get(WricefItem, item_id).fs_content
+
+    def test_batch_ids_reuse_cache_and_report_missing(self, client, ai_cache_enabled, monkeypatch):
+        """Cached items are not regenerated; unknown ids fail individually"""
+        import ai_service
+        monkeypatch.setattr(ai_service, 'MOCK_LATENCY_S', 0)
+        _, ids = self._items(client, 2)
+        first = client.post('/api/ai/generate-ts/batch', json={'ids': ids[:1]}).get_json()
+        TestAIJobs()._wait(client, first['job_id'])
+        second = client.post('/api/ai/generate-ts/batch', json={'ids': ids + [10 ** 9]}).get_json()
+        result = TestAIJobs()._wait(client, second['job_id'])['result']
+        assert (result['completed'], result['cached'], result['failed']) == (2, 1, 1)
+        assert result['items'][-1] == {'id': 10 ** 9, 'status': 'failed', 'error': 'Not found'}
+
+    def test_batch_requires_selection(self, client):
+        assert client.post('/api/ai/generate-fs/batch', json={}).status_code == 400
+
+
+class TestVectorIndex:
+    """Test the NumPy similarity index over ai_embedding"""
+
+    def _conn(self):
+        import sqlite3
+        from migrate import _apply_file
+        conn = sqlite3.connect(':memory:')
+        for filename in ('008_ai_embedding.sql', '009_embedding_blob.py'):
+            _apply_file(conn, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations', filename))
+        return conn
+
+    def _add(self, conn, entity_id, vector, content_hash='h1', project_id=1, entity_type='defect'):
+        import json
+        conn.execute("INSERT INTO ai_embedding (entity_type, entity_id, content_hash, embedding_vector, metadata) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (entity_type, entity_id, content_hash, json.dumps(vector), json.dumps({'project_id': project_id})))
+
+    def test_incremental_sync_and_reload(self):
+        """Only changed rows are applied; the index survives a reload from disk"""
+        from vector_index import VectorIndex
+        conn = self._conn()
+        directory = tempfile.mkdtemp()
+        self._add(conn, 1, [1, 0, 0])
+        self._add(conn, 2, [0.9, 0.1, 0])
+        self._add(conn, 3, [0, 1, 0], project_id=2)
+        index = VectorIndex(directory)
+        assert index.sync(conn, 'defect')['added'] == 3
+        assert index.sync(conn, 'defect')['added'] == 0
+        assert [e for e, _ in index.similar(conn, 'defect', 1, k=2)] == [2, 3]
+        assert [e for e, _ in index.similar(conn, 'defect', 1, k=5, project_id=1)] == [2]
+
+        self._add(conn, 2, [0, 0, 1], content_hash='h2')
+        conn.execute("DELETE FROM ai_embedding WHERE entity_id = 3")
+        stats = index.sync(conn, 'defect')
+        assert (stats['updated'], stats['removed'], stats['compacted']) == (1, 1, True)
+
+        reloaded = VectorIndex(directory)
+        assert reloaded.sync(conn, 'defect')['added'] == 0
+        result = reloaded.similar(conn, 'defect', 1, k=5)
+        assert [e for e, _ in result] == [2] and abs(result[0][1]) < 1e-6
+        assert reloaded.similar(conn, 'defect', 99) is None
+
+    def test_similar_endpoint(self, client, monkeypatch):
+        import importlib
+        from vector_index import VectorIndex
+        monkeypatch.setattr(importlib.import_module('app'), 'vector_index', VectorIndex(tempfile.mkdtemp()))
+        # Same dimension as the pipeline's defect rows; own project and id range
+        project_id, base = 10 ** 6 + uuid.uuid4().int % 10 ** 6, 10 ** 9 + uuid.uuid4().int % 10 ** 8
+        dim = 384
+        with client.application.app_context():
+            conn = get_db_connection()
+            for offset, head in ((1, [1, 0]), (2, [1, 1]), (3, [-1, 0])):
+                self._add(conn, base + offset, head + [0] * (dim - 2), project_id=project_id)
+            conn.commit()
+        url = f'/api/ai/similar?entity_type=defect&project_id={project_id}'
+        response = client.get(f'{url}&entity_id={base + 1}&k=2')
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert [r['entity_id'] for r in results] == [base + 2, base + 3]
+        assert results[0]['score'] == pytest.approx(0.7071, abs=1e-4)
+        assert client.get(f'{url}&entity_id={base + 9}').status_code == 404
+        assert client.get('/api/ai/similar?entity_type=defect').status_code == 400
+        assert client.get('/api/ai/similar?entity_type=../../etc&entity_id=1').status_code == 400
+
+    def test_index_rejects_unknown_entity_type(self):
+        from vector_index import VectorIndex
+        index = VectorIndex(tempfile.mkdtemp(), entity_types=['defect'])
+        with pytest.raises(ValueError):
+            index.index('../defect')
+        assert index.stats() == []
+
+
+class TestEmbeddingStorage:
+    """Test float32 BLOB storage for ai_embedding"""
+
+    def test_store_and_zero_copy_read(self):
+        """store() writes a blob with dim/dtype metadata plus the JSON copy; reads are numpy views"""
+        import json
+        import numpy as np
+        import embeddings
+        conn = TestVectorIndex()._conn()
+        row_id = embeddings.store(conn, 'defect', 1, 'h1', [0.5, -1.25, 2.0], metadata={'project_id': 3})
+        blob, metadata, json_vector = conn.execute(
+            "SELECT embedding_blob, metadata, embedding_vector FROM ai_embedding WHERE id = ?", (row_id,)).fetchone()
+        assert len(blob) == 12 and json.loads(json_vector) == [0.5, -1.25, 2.0]
+        assert json.loads(metadata) == {'project_id': 3, 'dim': 3, 'dtype': '<f4'}
+        vector = embeddings.load_vector(blob, metadata, json_vector)
+        assert vector.tolist() == [0.5, -1.25, 2.0]
+        assert not vector.flags.owndata and not vector.flags.writeable
+        with pytest.raises(ValueError):
+            embeddings.load_vector(blob, {'dim': 4})
+
+        row_id = embeddings.store(conn, 'defect', 2, 'h2', [1.0], write_json=False)
+        assert conn.execute("SELECT embedding_vector FROM ai_embedding WHERE id = ?", (row_id,)).fetchone()[0] == '[]'
+
+    def test_migration_converts_json_and_index_reads_blobs(self):
+        """JSON rows get a blob (JSON kept); the vector index works on blob-only rows"""
+        import sqlite3
+        import embeddings
+        from migrate import _apply_file
+        from vector_index import VectorIndex
+        migrations_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+        conn = sqlite3.connect(':memory:')
+        _apply_file(conn, os.path.join(migrations_dir, '008_ai_embedding.sql'))
+        conn.execute("INSERT INTO ai_embedding (entity_type, entity_id, content_hash, embedding_vector) "
+                     "VALUES ('defect', 1, 'h1', '[1.0, 0.0]')")
+        _apply_file(conn, os.path.join(migrations_dir, '009_embedding_blob.py'))
+        stats = embeddings.storage_stats(conn)
+        assert (stats['rows'], stats['blob_rows'], stats['blob_bytes']) == (1, 1, 8)
+        assert stats['json_bytes'] > 0
+
+        embeddings.store(conn, 'defect', 2, 'h2', [0.6, 0.8])
+        assert embeddings.strip_json(conn) == 2
+        assert embeddings.storage_stats(conn)['json_bytes'] == 0
+        result = VectorIndex(tempfile.mkdtemp()).similar(conn, 'defect', 1, k=1)
+        assert result[0][0] == 2 and result[0][1] == pytest.approx(0.6)
+
+
+class TestEmbeddingPipeline:
+    """Test the content_hash driven embedding pipeline"""
+
+    def _rows(self, client, entity_id):
+        with client.application.app_context():
+            return get_db_connection().execute(
+                "SELECT content_hash, embedding_blob FROM ai_embedding WHERE entity_type = 'wricef' AND entity_id = ?",
+                (entity_id,)).fetchall()
+
+    def test_hash_embedder_is_deterministic(self):
+        from embedding_pipeline import HashEmbedder
+        embedder = HashEmbedder(dim=64)
+        a, b, c = embedder.embed(['Pricing output form', 'pricing output form v2', 'warehouse stock transfer'])
+        assert (embedder.embed(['Pricing output form'])[0] == a).all()
+        assert float(a @ b) > float(a @ c)
+
+    def test_changes_are_embedded_and_old_hashes_collected(self, client):
+        """Insert embeds, status-only update is ignored, text update replaces the hash, delete sweeps"""
+        from app import embedding_pipeline
+        item_id = client.post('/api/wricef_items', json={
+            'project_id': 1, 'code': f'E-{uuid.uuid4().hex[:8]}', 'wricef_type': 'E',
+            'title': 'Invoice output form', 'description': 'Print layout'}).get_json()['id']
+        assert embedding_pipeline.drain(5)
+        rows = self._rows(client, item_id)
+        assert len(rows) == 1 and len(rows[0][1]) == 384 * 4
+
+        enqueued = embedding_pipeline.metrics()['enqueued']
+        client.put(f'/api/wricef_items/{item_id}', json={'status': 'In Progress'})
+        assert embedding_pipeline.drain(5)
+        assert embedding_pipeline.metrics()['enqueued'] == enqueued
+
+        client.put(f'/api/wricef_items/{item_id}', json={'title': 'Invoice output form v2'})
+        assert embedding_pipeline.drain(5)
+        new_rows = self._rows(client, item_id)
+        assert len(new_rows) == 1 and new_rows[0][0] != rows[0][0]
+
+        client.delete(f'/api/wricef_items/{item_id}')
+        assert embedding_pipeline.drain(5)
+        assert self._rows(client, item_id) == []
+
+    def test_embed_runs_without_write_lock(self, client, monkeypatch):
+        """Another writer can take the lock while the embedder is running"""
+        import sqlite3
+        from app import embedding_pipeline
+        from models import db
+        with client.application.app_context():
+            path = db.engine.url.database
+        embed, locks = embedding_pipeline.embedder.embed, []
+
+        def probing(texts):
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                other.execute('BEGIN IMMEDIATE')
+                other.rollback()
+                locks.append('free')
+            except sqlite3.OperationalError as e:
+                locks.append(str(e))
+            finally:
+                other.close()
+            return embed(texts)
+
+        monkeypatch.setattr(embedding_pipeline.embedder, 'embed', probing)
+        item_id = client.post('/api/wricef_items', json={
+            'project_id': 1, 'code': f'E-{uuid.uuid4().hex[:8]}', 'wricef_type': 'E',
+            'title': 'Goods receipt label'}).get_json()['id']
+        assert embedding_pipeline.drain(5)
+        client.put(f'/api/wricef_items/{item_id}', json={'title': 'Goods receipt label v2'})
+        assert embedding_pipeline.drain(5)
+        assert locks and set(locks) == {'free'}
+        assert len(self._rows(client, item_id)) == 1
+
+    def test_metrics_endpoint(self, client):
+        metrics = client.get('/api/system/embeddings').get_json()
+        for key in ('backlog', 'embedded', 'unchanged', 'removed_rows', 'throughput_per_s', 'model'):
+            assert key in metrics
+
+
+class TestAIUsage:
+    """Write-behind AI log buffer and ai_usage_daily rollups"""
+
+    def _connect(self, tmp_path):
+        import sqlite3
+        from migrate import _apply_file
+        db_path = str(tmp_path / 'usage.db')
+        conn = sqlite3.connect(db_path)
+        migrations = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+        _apply_file(conn, os.path.join(migrations, '006_ai_interaction_log.sql'))
+        conn.execute("ALTER TABLE ai_interaction_log ADD COLUMN project_id INTEGER")
+        conn.execute("ALTER TABLE ai_interaction_log ADD COLUMN cached INTEGER NOT NULL DEFAULT 0")
+        _apply_file(conn, os.path.join(migrations, '010_ai_usage_rollups.py'))
+        conn.commit()
+        return conn, lambda: sqlite3.connect(db_path, check_same_thread=False)
+
+    def test_buffer_flushes_by_row_count_and_rolls_up(self, tmp_path):
+        import time
+        import ai_log
+        conn, connect = self._connect(tmp_path)
+        buffer = ai_log.LogBuffer(connect, max_rows=3, interval_ms=60000)
+        buffer.start()
+        try:
+            for ms in (20, 200, 3000):
+                buffer.add('generate-fs', 'gpt-4o-mini', tokens_in=1000, tokens_out=2000, response_time_ms=ms)
+            deadline = time.time() + 5
+            while buffer.stats()['flushed_rows'] < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            assert conn.execute("SELECT COUNT(*) FROM ai_interaction_log").fetchone()[0] == 3
+            calls, tokens_out, cost = conn.execute("SELECT calls, tokens_out, cost_usd FROM ai_usage_daily").fetchone()
+            assert (calls, tokens_out) == (3, 6000)
+            assert cost == pytest.approx(3 * ai_log.estimate_cost('gpt-4o-mini', 1000, 2000))
+        finally:
+            buffer.stop()
+
+    def test_rollup_percentiles_and_rebuild(self, tmp_path):
+        import ai_log
+        conn, connect = self._connect(tmp_path)
+        buffer = ai_log.LogBuffer(connect, max_rows=1000)
+        for ms in range(1, 101):
+            buffer.add('chat', 'mock', tokens_in=1, tokens_out=10, response_time_ms=ms * 10)
+        buffer.add('chat', 'mock', tokens_out=10, response_time_ms=1, cached=True)
+        assert buffer.flush() == 101
+        before = ai_log.usage(conn)
+        totals = before['totals']
+        assert (totals['calls'], totals['cached_calls'], totals['cost_usd']) == (101, 1, 0)
+        assert 250 <= totals['response_ms_p50'] <= 1000
+        assert totals['response_ms_p50'] < totals['response_ms_p95'] <= totals['response_ms_p99']
+        assert ai_log.rebuild(conn) == 101
+        conn.commit()
+        assert ai_log.usage(conn) == before
+
+    def test_bad_row_is_dropped_and_buffer_is_capped(self, tmp_path):
+        import ai_log
+        conn, connect = self._connect(tmp_path)
+        conn.execute("CREATE TRIGGER poison BEFORE INSERT ON ai_interaction_log WHEN NEW.interaction_type = 'poison' "
+                     "BEGIN SELECT RAISE(ABORT, 'poison row'); END")
+        conn.commit()
+        buffer = ai_log.LogBuffer(connect, max_rows=1000, max_pending=5, max_attempts=2)
+        for interaction_type in ('chat', 'poison', 'chat'):
+            buffer.add(interaction_type, 'mock', tokens_out=1, response_time_ms=5)
+        with pytest.raises(Exception):
+            buffer.flush()
+        assert buffer.stats()['pending'] == 3
+        assert buffer.flush() == 2
+        stats = buffer.stats()
+        assert (stats['pending'], stats['dropped_rows'], stats['last_error']) == (0, 1, 'poison row')
+        assert conn.execute("SELECT calls FROM ai_usage_daily").fetchone()[0] == 2
+
+        for _ in range(8):
+            buffer.add('chat', 'mock')
+        stats = buffer.stats()
+        assert (stats['pending'], stats['dropped_rows']) == (5, 4)
+        assert buffer.flush() == 5
+
+    def test_usage_endpoint(self, client):
+        from app import ai_log_buffer
+        model = f'test-{uuid.uuid4().hex[:8]}'
+        ai_log_buffer.add('generate-ts', model, tokens_in=5, tokens_out=50, response_time_ms=120)
+        ai_log_buffer.flush()
+        data = client.get(f'/api/ai/usage?model={model}').get_json()
+        assert len(data['rows']) == 1
+        row = data['rows'][0]
+        assert (row['interaction_type'], row['calls'], row['tokens_out']) == ('generate-ts', 1, 50)
+        assert data['totals']['response_ms_p50'] is not None
+        assert client.get('/api/ai/usage?from=2999-01-01').get_json()['totals']['calls'] == 0
+
+
+class TestSearch:
+    """FTS5 search_index kept in sync by triggers"""
+
+    def test_triggers_follow_insert_update_delete(self, client):
+        word = f'zq{uuid.uuid4().hex[:10]}'
+        item_id = client.post('/api/wricef_items', json={
+            'project_id': 1, 'code': f'E-{uuid.uuid4().hex[:8]}', 'wricef_type': 'E',
+            'title': f'Output form {word}', 'description': 'Invoice print'}).get_json()['id']
+        data = client.get(f'/api/search?q={word}').get_json()
+        assert data['total'] == 1
+        result = data['results'][0]
+        assert (result['entity_type'], result['entity_id']) == ('wricef', item_id)
+        assert f'<mark>{word}</mark>' in result['title']
+
+        client.put(f'/api/wricef_items/{item_id}', json={'title': 'Output form', 'description': f'{word} body'})
+        result = client.get(f'/api/search?q={word[:-2]}').get_json()['results'][0]
+        assert result['entity_id'] == item_id and '<mark>' in result['snippet']
+
+        client.delete(f'/api/wricef_items/{item_id}')
+        assert client.get(f'/api/search?q={word}').get_json()['total'] == 0
+
+    def test_query_is_sanitized_and_highlight_escaped(self):
+        import sqlite3
+        import search_index
+        assert (search_index.build_query('pricing "NEAR(a b)" OR -x', project_id=3, types=['wricef']) ==
+                '{code title body} : ("pricing" "NEAR" "a" "b" "OR" "x"*) AND tags : p3 AND tags : (t2)')
+        assert search_index.build_query('  ()" ') is None
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE decisions (id INTEGER PRIMARY KEY, project_id INTEGER, decision_id TEXT, "
+                     "topic TEXT, description TEXT, decision_made TEXT, rationale TEXT)")
+        search_index.rebuild(conn)
+        conn.executemany("INSERT INTO decisions (project_id, topic, decision_made) VALUES (?, ?, ?)",
+                         [(1, '<script>pricing</script>', 'Use standard'), (2, 'Pricing procedure', 'Custom')])
+        data = search_index.search(conn, 'pricing', project_id=1)
+        assert data['total'] == 1
+        assert data['results'][0]['title'] == '&lt;script&gt;<mark>pricing</mark>&lt;/script&gt;'
+
+    def test_endpoint_validation_and_paging(self, client, monkeypatch):
+        import search_index
+        assert client.get('/api/search').status_code == 400
+        assert client.get('/api/search?q=x&types=bogus').status_code == 400
+        word = f'pg{uuid.uuid4().hex[:10]}'
+        for i in range(3):
+            client.post('/api/wricef_items', json={'project_id': 1, 'code': f'E-{uuid.uuid4().hex[:8]}',
+                                                   'wricef_type': 'E', 'title': f'{word} {i}'})
+        page = client.get(f'/api/search?q={word}&types=wricef&per_page=2&page=2').get_json()
+        assert (page['total'], len(page['results']), page['ranked']) == (3, 1, True)
+
+        monkeypatch.setattr(search_index, 'RANK_MAX_HITS', 2)
+        page = client.get(f'/api/search?q={word}&types=wricef').get_json()
+        assert page['ranked'] is False
+        assert page['results'][0]['title'] == f'<mark>{word}</mark> 2'
+
+    def test_fs_ts_documents_are_searchable(self, client):
+        word = f'doc{uuid.uuid4().hex[:10]}'
+        project_id = client.post('/api/projects', json={'project_code': unique_code('SRC'),
+                                                        'project_name': 'Document search'}).get_json()['id']
+        client.post('/api/requirements', json={'project_id': project_id, 'code': 'FS_MM_001', 'title': 'PO approval',
+                                               'module': 'MM', 'complexity': 'Low'})
+        requirement_id = client.get(f'/api/requirements?project_id={project_id}').get_json()[0]['id']
+        client.post('/api/documents', json={'requirement_id': requirement_id, 'document_type': 'FS',
+                                            'content': f'Release strategy {word} for purchase orders'})
+        data = client.get(f'/api/search?q={word}&types=document&project_id={project_id}').get_json()
+        assert data['total'] == 1
+        result = data['results'][0]
+        assert (result['entity_type'], result['project_id'], result['code']) == ('document', project_id, 'FS')
+        assert f'<mark>{word}</mark>' in result['snippet']
+
+        doc_id = client.get(f'/api/documents?project_id={project_id}').get_json()[0]['id']
+        client.put(f'/api/documents/{doc_id}', json={'content': 'Rewritten'})
+        assert client.get(f'/api/search?q={word}&types=document').get_json()['total'] == 0
+
+
+class TestRequirementBatchConversion:
+    """POST /api/new-requirements/convert/batch"""
+
+    def _requirements(self, client, classifications, **extra):
+        project_id = client.post('/api/projects', json={'project_code': unique_code('BCV'),
+                                                        'project_name': 'Batch conversion'}).get_json()['id']
+        ids = [client.post('/api/new_requirements', json={'project_id': project_id, 'title': f'Req {i}',
+                                                          'classification': c, **extra}).get_json()['id']
+               for i, c in enumerate(classifications)]
+        return project_id, ids
+
+    def test_converts_in_one_call_with_sequential_codes(self, client):
+        from models import db, ConfigItem, WricefItem
+        project_id, ids = self._requirements(client, ['Fit', 'Gap', 'PartialFit', 'Fit', 'Unknown'])
+        response = client.post('/api/new-requirements/convert/batch', json={'ids': ids + [10 ** 9]})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['counts'] == {'converted': 4, 'failed': 2}
+        results = [data['results'][str(req_id)] for req_id in ids]
+        assert [r.get('item_code') for r in results] == ['CFG-001', 'WR-001', 'WR-002', 'CFG-002', None]
+        assert data['results'][str(10 ** 9)]['error'] == 'Not found'
+        with client.application.app_context():
+            assert ConfigItem.query.filter_by(project_id=project_id).count() == 2
+            wricef = db.session.get(WricefItem, results[1]['created_item_id'])
+            assert (wricef.requirement_id, wricef.wricef_type) == (ids[1], 'E')
+        req = client.get(f'/api/new_requirements/{ids[0]}').get_json()
+        assert (req['conversion_status'], req['converted_item_id']) == ('converted', results[0]['created_item_id'])
+
+    def test_repeat_is_idempotent(self, client):
+        from models import WricefItem
+        project_id, ids = self._requirements(client, ['Gap', 'Gap'])
+        first = client.post('/api/new-requirements/convert/batch', json={'ids': ids}).get_json()
+        second = client.post('/api/new-requirements/convert/batch', json={'ids': ids}).get_json()
+        assert second['counts'] == {'already_converted': 2}
+        for req_id in ids:
+            assert second['results'][str(req_id)]['created_item_id'] == first['results'][str(req_id)]['created_item_id']
+        with client.application.app_context():
+            assert WricefItem.query.filter_by(project_id=project_id).count() == 2
+
+    def test_filter_and_validation(self, client):
+        assert client.post('/api/new-requirements/convert/batch', json={}).status_code == 400
+        analysis_id = 10 ** 8 + uuid.uuid4().int % 10 ** 8
+        _, ids = self._requirements(client, ['Fit', 'Gap', 'Gap'], analysis_id=analysis_id)
+        data = client.post('/api/new-requirements/convert/batch',
+                           json={'analysis_id': analysis_id, 'classification': 'Gap'}).get_json()
+        assert sorted(int(req_id) for req_id in data['results']) == ids[1:]
+        assert data['counts'] == {'converted': 2}
+
+
+class TestUnitTestBatchConversion:
+    """POST /api/test-cases/convert/batch"""
+
+    STEPS = '[{"step": "1", "action": "Post goods receipt", "expected": "Document created"}]'
+
+    def _project(self, client):
+        from models import db, Scenario, WricefItem, ConfigItem
+        project_id = client.post('/api/projects', json={'project_code': unique_code('UTB'),
+                                                        'project_name': 'Unit test batch'}).get_json()['id']
+        with client.application.app_context():
+            scenario = Scenario(project_id=project_id, code=unique_code('S'), name='Procure to pay')
+            db.session.add(scenario)
+            db.session.flush()
+            items = [WricefItem(project_id=project_id, code=f'WR-{i}', wricef_type='E', title=f'Enhancement {i}',
+                                module=module, unit_test_steps=steps, scenario_id=scenario.id)
+                     for i, (module, steps) in enumerate([('MM', self.STEPS), ('MM', self.STEPS), ('SD', '[]')])]
+            items.append(ConfigItem(project_id=project_id, code='CFG-1', title='Pricing', module='MM',
+                                    unit_test_steps=self.STEPS))
+            db.session.add_all(items)
+            db.session.commit()
+            return project_id, scenario.id, [item.id for item in items]
+
+    def test_creates_sequenced_tests_and_scenario_links(self, client):
+        from models import db, scenario_test_case
+        project_id, scenario_id, ids = self._project(client)
+        data = client.post('/api/test-cases/convert/batch', json={'project_id': project_id}).get_json()
+        assert data['counts'] == {'created': 3, 'skipped': 1}
+        assert data['scenario_links'] == 2 and data['items_per_s'] > 0
+        codes = [data['results']['wricef'][str(ids[0])]['code'], data['results']['wricef'][str(ids[1])]['code'],
+                 data['results']['config'][str(ids[3])]['code']]
+        assert codes == ['TST-001', 'TST-002', 'TST-003']
+        with client.application.app_context():
+            linked = db.session.execute(scenario_test_case.select().where(
+                scenario_test_case.c.scenario_id == scenario_id)).fetchall()
+            assert len(linked) == 2
+
+        again = client.post('/api/test-cases/convert/batch', json={'project_id': project_id}).get_json()
+        assert again['counts'] == {'already_exists': 3, 'skipped': 1}
+
+    def test_module_filter_and_single_endpoint_codes(self, client):
+        project_id, _, ids = self._project(client)
+        data = client.post('/api/test-cases/convert/batch', json={
+            'project_id': project_id, 'module': 'SD', 'source_types': ['wricef']}).get_json()
+        assert data['counts'] == {'skipped': 1} and list(data['results']) == ['wricef']
+        first = client.post(f'/api/wricef-items/{ids[0]}/convert-to-test').get_json()['id']
+        second = client.post(f'/api/wricef-items/{ids[1]}/convert-to-test').get_json()['id']
+        codes = [client.get(f'/api/test_management/{i}').get_json()['code'] for i in (first, second)]
+        assert codes == ['TST-001', 'TST-002']
+        assert client.post('/api/test-cases/convert/batch', json={}).status_code == 400
+
+
+class TestRequirementImport:
+    """POST /api/new_requirements/import"""
+
+    def _project(self, client):
+        return client.post('/api/projects', json={'project_code': unique_code('IMP'),
+                                                  'project_name': 'Requirement import'}).get_json()['id']
+
+    def test_csv_report_and_codes(self, client):
+        project_id = self._project(client)
+        body = ("Requirement Code;Title;Module;Fit/Gap;Priority;Notes\n"
+                ";Pricing;sd;Partial Fit;must;x\n"
+                "WS-1;Approval;MM;Gap;;\n"
+                ";;MM;Gap;;\n"
+                "WS-1;Duplicate;MM;Gap;;\n"
+                ";Bad;XX;Maybe;Soon;\n")
+        res = client.post(f'/api/new_requirements/import?project_id={project_id}',
+                          data=body.encode(), content_type='text/csv')
+        assert res.status_code == 200
+        data = res.get_json()
+        assert (data['rows'], data['inserted'], data['failed']) == (5, 2, 3)
+        assert data['ignored_columns'] == ['Notes']
+        assert {(e['row'], e['field']) for e in data['errors']} == {
+            (4, 'title'), (5, 'code'), (6, 'classification'), (6, 'priority'), (6, 'module')}
+        rows = client.get(f'/api/new_requirements?project_id={project_id}').get_json()
+        assert sorted((r['code'], r['classification'], r['priority']) for r in rows) == [
+            ('REQ-001', 'PartialFit', 'Must'), ('WS-1', 'Gap', 'Medium')]
+
+    def test_reimport_updates_and_xlsx_upload(self, client):
+        import io
+        openpyxl = pytest.importorskip('openpyxl')
+        project_id = self._project(client)
+        url = f'/api/new_requirements/import?project_id={project_id}'
+        client.post(url, data=b"code,title\nWS-1,Approval\n", content_type='text/csv')
+        data = client.post(url, data={'file': (io.BytesIO(b"code,title,description\nWS-1,Approval v2,Changed\n"),
+                                               'workshop.csv')}).get_json()
+        assert (data['inserted'], data['updated']) == (0, 1)
+
+        workbook = openpyxl.Workbook()
+        workbook.active.append(['Title', 'Module', 'Classification'])
+        workbook.active.append(['From workshop', 'FI', 'Fit'])
+        buf = io.BytesIO()
+        workbook.save(buf)
+        data = client.post(url, data={'file': (io.BytesIO(buf.getvalue()), 'workshop.xlsx')}).get_json()
+        assert data['inserted'] == 1
+        rows = client.get(f'/api/new_requirements?project_id={project_id}').get_json()
+        assert sorted((r['code'], r['title']) for r in rows) == [('REQ-001', 'From workshop'), ('WS-1', 'Approval v2')]
+
+    def test_partial_reimport_keeps_other_columns(self, client):
+        project_id = self._project(client)
+        url = f'/api/new_requirements/import?project_id={project_id}'
+        client.post(url, data=b"code,title,description,status,priority\nWS-1,Approval,Two-step release,Approved,Must\n",
+                    content_type='text/csv')
+        data = client.post(url, data=b"code,title,description\nWS-1,Approval v2,\n", content_type='text/csv').get_json()
+        assert data['updated'] == 1
+        row = client.get(f'/api/new_requirements?project_id={project_id}').get_json()[0]
+        assert (row['title'], row['description'], row['status'], row['priority']) == (
+            'Approval v2', 'Two-step release', 'Approved', 'Must')
+
+    def test_bad_rows_fail_alone(self, client, monkeypatch):
+        import requirement_import
+        project_id, other_id = self._project(client), self._project(client)
+        client.post('/api/sessions', json={'project_id': other_id, 'session_name': 'Elsewhere'})
+        foreign = client.get(f'/api/sessions?project_id={other_id}').get_json()[0]['id']
+        write_batch = requirement_import._write_batch
+
+        def failing(conn, project_id, batch, existing, now):
+            if any(row['title'] == 'Boom' for _, row in batch):
+                raise RuntimeError('disk I/O error')
+            return write_batch(conn, project_id, batch, existing, now)
+
+        monkeypatch.setattr(requirement_import, '_write_batch', failing)
+        body = f"title,session_id\nFirst,\nForeign,{foreign}\nBoom,\nLast,\n"
+        data = client.post(f'/api/new_requirements/import?project_id={project_id}', data=body.encode(),
+                           content_type='text/csv').get_json()
+        assert (data['inserted'], data['failed']) == (2, 2)
+        assert {(e['row'], e['field']) for e in data['errors']} == {(3, 'session_id'), (4, None)}
+        rows = client.get(f'/api/new_requirements?project_id={project_id}').get_json()
+        assert sorted((r['code'], r['title']) for r in rows) == [('REQ-001', 'First'), ('REQ-002', 'Last')]
+
+    def test_imported_rows_page_like_orm_rows(self, client):
+        project_id = self._project(client)
+        client.post('/api/new_requirements', json={'project_id': project_id, 'code': 'ORM-1', 'title': 'Before'})
+        body = "code,title\n" + "".join(f"IMP-{n},Imported {n}\n" for n in range(10))
+        client.post(f'/api/new_requirements/import?project_id={project_id}', data=body.encode(),
+                    content_type='text/csv')
+        seen, cursor = [], None
+        for _ in range(10):
+            url = f'/api/new_requirements?project_id={project_id}&limit=3' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url)
+            seen.extend(row['code'] for row in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        assert len(seen) == 11 and len(set(seen)) == 11
+        assert seen[-1] == 'ORM-1'
+
+    def test_rejects_bad_input(self, client):
+        project_id = self._project(client)
+        assert client.post('/api/new_requirements/import', data=b"title\nx\n").status_code == 400
+        res = client.post(f'/api/new_requirements/import?project_id={project_id}',
+                          data=b"code,module\nWS-1,MM\n", content_type='text/csv')
+        assert res.status_code == 400
+        dry = client.post(f'/api/new_requirements/import?project_id={project_id}&dry_run=1',
+                          data=b"title\nOnly validated\n", content_type='text/csv').get_json()
+        assert dry['dry_run'] and dry['inserted'] == 1
+        assert client.get(f'/api/new_requirements?project_id={project_id}').get_json() == []
+
+
+class TestDataExport:
+    """Parquet / Arrow export (data_export.py, /api/exports)"""
+
+    def _wait(self, client, job_id):
+        import time
+        for _ in range(500):
+            job = client.get(f'/api/exports/jobs/{job_id}').get_json()
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.01)
+        raise AssertionError('job did not finish')
+
+    def _project(self, client):
+        code = unique_code('EXP')
+        project_id = client.post('/api/projects', json={'project_code': code, 'project_name': 'Export'}).get_json()['id']
+        client.post('/api/new_requirements', json={'project_id': project_id, 'title': 'Pricing', 'code': 'REQ-1'})
+        client.post('/api/wricef_items', json={'project_id': project_id, 'code': 'WR-1', 'wricef_type': 'E',
+                                               'title': 'Pricing exit'})
+        return project_id, code
+
+    def test_export_job_and_incremental_run(self, client, monkeypatch, tmp_path):
+        import time
+        pq = pytest.importorskip('pyarrow.parquet')
+        monkeypatch.setitem(client.application.config, 'EXPORT_DIR', str(tmp_path))
+        project_id, code = self._project(client)
+        body = {'project_id': project_id, 'tables': ['projects', 'wricef_items', 'test_cycles']}
+        accepted = client.post('/api/exports', json=body)
+        assert accepted.status_code == 202
+        job = self._wait(client, accepted.get_json()['job_id'])
+        assert job['status'] == 'done', job['error']
+        manifest = job['result']
+        assert manifest['tables']['wricef_items']['rows'] == 1
+        run_id = accepted.get_json()['run_id']
+        table = pq.read_table(tmp_path / run_id / 'wricef_items.parquet')
+        assert table.column('project_code').to_pylist() == [code]
+        assert str(table.schema.field('created_at').type) == 'timestamp[us]'
+        assert client.get(f'/api/exports/{run_id}/wricef_items.parquet').status_code == 200
+
+        time.sleep(0.01)
+        client.post('/api/wricef_items', json={'project_id': project_id, 'code': 'WR-2', 'wricef_type': 'R',
+                                               'title': 'Pricing report'})
+        accepted = client.post('/api/exports', json=dict(body, incremental=True)).get_json()
+        assert accepted['incremental_from'] == run_id
+        delta = self._wait(client, accepted['job_id'])['result']
+        assert delta['incremental'] and delta['tables']['wricef_items']['rows'] == 1
+        assert delta['tables']['projects']['rows'] == 0
+        assert [run['run_id'] for run in client.get('/api/exports').get_json()] == [accepted['run_id'], run_id]
+
+    def test_incremental_keeps_rows_at_the_watermark(self, client, tmp_path):
+        """A row written later with the same timestamp as the watermark is exported once"""
+        import sqlite3
+        import data_export
+        pytest.importorskip('pyarrow')
+        project_id, _ = self._project(client)
+        conn = sqlite3.connect(os.path.join(os.path.dirname(data_export.__file__), 'project_copilot.db'))
+        try:
+            def run(name, since=None):
+                manifest = data_export.export(conn, str(tmp_path / name), tables=['wricef_items'],
+                                              project_id=project_id, since=since)
+                return manifest['tables']['wricef_items']['rows'], data_export.watermarks(manifest)
+
+            assert run('full')[0] == 1
+            client.post('/api/wricef_items', json={'project_id': project_id, 'code': 'WR-2', 'wricef_type': 'R',
+                                                   'title': 'Pricing report'})
+            conn.execute("UPDATE wricef_items SET updated_at = (SELECT MIN(updated_at) FROM wricef_items "
+                         "WHERE project_id = ?) WHERE project_id = ?", (project_id, project_id))
+            conn.commit()
+            rows, since = run('delta', data_export.watermarks(data_export.load_manifest(str(tmp_path / 'full'))))
+            assert rows == 1 and len(since['wricef_items'][1]) == 2
+            assert run('empty', since)[0] == 0
+        finally:
+            conn.close()
+
+    def test_arrow_cli_api_and_validation(self, client, tmp_path):
+        import sqlite3
+        import data_export
+        ipc = pytest.importorskip('pyarrow.ipc')
+        project_id, code = self._project(client)
+        conn = sqlite3.connect(os.path.join(os.path.dirname(data_export.__file__), 'project_copilot.db'))
+        try:
+            manifest = data_export.export(conn, str(tmp_path), 'arrow', tables=['requirements', 'defects'],
+                                          project_id=project_id, batch_size=1)
+        finally:
+            conn.close()
+        assert manifest['tables']['requirements']['batches'] == 1
+        rows = ipc.open_file(str(tmp_path / 'requirements.arrow')).read_all().to_pylist()
+        assert [(row['code'], row['project_code']) for row in rows] == [('REQ-1', code)]
+        assert client.post('/api/exports', json={'format': 'csv'}).status_code == 400
+        assert client.post('/api/exports', json={'tables': ['nope']}).status_code == 400
+        assert client.post('/api/exports', json={'project_id': 'abc'}).status_code == 400
+
+    def test_exports_use_their_own_job_pool(self, client, monkeypatch, tmp_path):
+        pytest.importorskip('pyarrow')
+        monkeypatch.setitem(client.application.config, 'EXPORT_DIR', str(tmp_path))
+        project_id, _ = self._project(client)
+        submitted = client.get('/api/system/ai-jobs').get_json()['submitted']
+        accepted = client.post('/api/exports', json={'project_id': str(project_id), 'tables': ['projects']})
+        assert accepted.status_code == 202
+        assert accepted.get_json()['status_url'].startswith('/api/exports/jobs/')
+        assert self._wait(client, accepted.get_json()['job_id'])['result']['project_id'] == project_id
+        assert client.get('/api/system/ai-jobs').get_json()['submitted'] == submitted
+        assert client.get('/api/system/export-jobs').get_json()['workers'] == 1
+
+
+class TestScenarioGraph:
+    """Composite scenario expansion (scenario_graph.py, /api/scenarios/<id>/expanded)"""
+
+    def _scenario(self, client, project_id, name, includes=None):
+        body = {'project_id': project_id, 'name': name}
+        if includes is not None:
+            body.update(is_composite=True, included_scenario_ids=includes)
+        return client.post('/api/scenarios', json=body).get_json()
+
+    def _link(self, client, scenario_id, project_id, code):
+        from models import db, TestCase, scenario_test_case
+        with client.application.app_context():
+            test = TestCase(project_id=project_id, code=code, test_type='SIT', title=f'Test {code}')
+            db.session.add(test)
+            db.session.flush()
+            db.session.execute(scenario_test_case.insert().values(scenario_id=scenario_id, test_case_id=test.id))
+            db.session.commit()
+            return test.id
+
+    def test_nested_expansion_and_deduplicated_tests(self, client):
+        import json
+        project_id = client.post('/api/projects', json={'project_code': unique_code('SG'),
+                                                        'project_name': 'Graph'}).get_json()['id']
+        a = self._scenario(client, project_id, 'Order')
+        b = self._scenario(client, project_id, 'Delivery')
+        c = self._scenario(client, project_id, 'Billing')
+        inner = self._scenario(client, project_id, 'Logistics', f"{b['scenario_id']}; {c['id']}")
+        outer = self._scenario(client, project_id, 'Order to cash', json.dumps([a['id'], inner['id'], 'S-NOPE']))
+        assert outer['unresolved_inclusions'] == ['S-NOPE']
+        shared = self._link(client, b['id'], project_id, 'TST-1')
+        self._link(client, c['id'], project_id, 'TST-2')
+        self._link(client, inner['id'], project_id, 'TST-3')
+        with client.application.app_context():
+            from models import db, scenario_test_case
+            db.session.execute(scenario_test_case.insert().values(scenario_id=a['id'], test_case_id=shared))
+            db.session.commit()
+
+        data = client.get(f"/api/scenarios/{outer['id']}/expanded").get_json()
+        assert [leaf['id'] for leaf in data['leaves']] == [a['id'], b['id'], c['id']]
+        assert data['descendant_count'] == 4 and data['cycle'] is None
+        codes = {test['code']: test['scenario_ids'] for test in data['test_cases']}
+        assert codes == {'TST-1': sorted([a['id'], b['id']]), 'TST-2': [c['id']], 'TST-3': [inner['id']]}
+
+        client.put(f"/api/scenarios/{inner['id']}", json={'included_scenario_ids': str(b['id'])})
+        data = client.get(f"/api/scenarios/{outer['id']}/expanded").get_json()
+        assert [leaf['id'] for leaf in data['leaves']] == [a['id'], b['id']]
+        leaf = client.get(f"/api/scenarios/{a['id']}/expanded").get_json()
+        assert [s['id'] for s in leaf['leaves']] == [a['id']]
+
+    def test_cycles_rejected_and_closure(self, client):
+        import scenario_graph
+        project_id = client.post('/api/projects', json={'project_code': unique_code('SG'),
+                                                        'project_name': 'Graph'}).get_json()['id']
+        leaf = self._scenario(client, project_id, 'Leaf')
+        child = self._scenario(client, project_id, 'Child', str(leaf['id']))
+        parent = self._scenario(client, project_id, 'Parent', str(child['id']))
+        res = client.put(f"/api/scenarios/{child['id']}", json={'included_scenario_ids': f"{leaf['id']},{parent['id']}"})
+        assert res.status_code == 400 and 'cycle' in res.get_json()['error']
+        data = client.get(f"/api/scenarios/{parent['id']}/expanded").get_json()
+        assert [s['id'] for s in data['leaves']] == [leaf['id']]
+
+        graph = scenario_graph.ProjectGraph(1, [(1, 2), (2, 3), (3, 2), (3, 4), (5, 1)])
+        assert graph.cycles == [[2, 3]]
+        assert graph.descendants(5) == {1, 2, 3, 4} and graph.leaves(1) == [4]
+        assert scenario_graph.parse('[3, "S-1", 3]') == ['3', 'S-1']
+
+
+class TestTraceability:
+    """GET /api/projects/<id>/traceability (traceability.py)"""
+
+    def _project(self, client):
+        project_id = client.post('/api/projects', json={'project_code': unique_code('TR'),
+                                                        'project_name': 'Trace'}).get_json()['id']
+        scenario = client.post('/api/scenarios', json={'project_id': project_id, 'name': 'Procure to pay'}).get_json()
+        analysis_id = client.post(f"/api/scenarios/{scenario['id']}/analyses",
+                                  json={'title': 'Purchasing workshop'}).get_json()['id']
+        covered = client.post('/api/new_requirements', json={
+            'project_id': project_id, 'analysis_id': analysis_id, 'code': 'REQ-1', 'title': 'Approval'}).get_json()['id']
+        client.post('/api/new_requirements', json={
+            'project_id': project_id, 'analysis_id': analysis_id, 'code': 'REQ-2', 'title': 'Pricing'})
+        item_id = client.post('/api/wricef_items', json={
+            'project_id': project_id, 'requirement_id': covered, 'code': 'WR-1', 'wricef_type': 'W',
+            'title': 'Approval workflow'}).get_json()['id']
+        client.post(f'/api/wricef-items/{item_id}/convert-to-test')
+        return project_id, scenario, covered
+
+    def test_matrix_rows_and_coverage(self, client):
+        project_id, scenario, covered = self._project(client)
+        rows = client.get(f'/api/projects/{project_id}/traceability').get_json()
+        assert [(r['requirement_code'], r['item_code'], r['test_case_code']) for r in rows] == [
+            ('REQ-1', 'WR-1', 'TST-001'), ('REQ-2', None, None)]
+        assert {r['scenario_code'] for r in rows} == {scenario['scenario_id']}
+        assert rows[0]['executions'] == 0 and rows[0]['analysis_title'] == 'Purchasing workshop'
+
+        gaps = client.get(f'/api/projects/{project_id}/traceability?gap=no_test_case&fields=requirement_code')
+        assert gaps.get_json() == [{'requirement_code': 'REQ-2'}]
+        summary = client.get(f'/api/projects/{project_id}/traceability/summary').get_json()
+        assert summary['requirements'] == 2 and summary['requirement_test_coverage_pct'] == 50.0
+        assert summary['gaps']['no_deliverable'] == 1 and summary['gaps']['not_executed'] == 1
+        assert client.get(f'/api/projects/{project_id}/traceability?gap=nope').status_code == 400
+
+    def test_cache_invalidated_by_writes_and_streaming(self, client):
+        import json
+        project_id, _, covered = self._project(client)
+        url = f'/api/projects/{project_id}/traceability'
+        version = client.get(url).headers['X-Trace-Version']
+        before = client.get('/api/system/trace-cache').get_json()
+        assert client.get(url).headers['X-Trace-Version'] == version
+        assert client.get('/api/system/trace-cache').get_json()['hits'] == before['hits'] + 1
+
+        client.post('/api/config_items', json={'project_id': project_id, 'requirement_id': covered,
+                                               'code': 'CFG-1', 'title': 'Release strategy'})
+        response = client.get(f'{url}?stream=ndjson')
+        assert response.headers['X-Trace-Version'] != version
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [(r['item_type'], r['item_code']) for r in rows if r['requirement_code'] == 'REQ-1'] == [
+            ('wricef', 'WR-1'), ('config', 'CFG-1')]
+        assert client.get('/api/projects/999999999/traceability').status_code == 404
+
+
+class TestLoadProfiles:
+    """?include= eager-loading profiles (load_profiles.py)"""
+
+    def _count_queries(self, client, url):
+        import threading
+        from sqlalchemy import event
+        from models import db
+        statements, request_thread = [], threading.get_ident()
+
+        def count(conn, cursor, statement, *args):
+            # embedding_pipeline worker'ı aynı engine'i kullanır; yalnızca istek thread'i sayılır
+            if threading.get_ident() == request_thread:
+                statements.append(statement)
+
+        with client.application.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        return response, len(statements)
+
+    def _project(self, client, requirements):
+        from models import db, Requirement, WricefItem, ConfigItem
+        project_id = client.post('/api/projects', json={'project_code': unique_code('LP'),
+                                                        'project_name': 'Profiles'}).get_json()['id']
+        with client.application.app_context():
+            for i in range(requirements):
+                requirement = Requirement(project_id=project_id, code=f'REQ-{i}', title=f'Requirement {i}')
+                db.session.add(requirement)
+                db.session.flush()
+                db.session.add_all([WricefItem(project_id=project_id, requirement_id=requirement.id, code=f'WR-{i}-{n}',
+                                               wricef_type='E', title='Enhancement') for n in range(2)])
+                db.session.add(ConfigItem(project_id=project_id, requirement_id=requirement.id, code=f'CFG-{i}',
+                                          title='Config'))
+            db.session.commit()
+            db.session.remove()
+        return project_id
+
+    def test_query_count_independent_of_parent_count(self, client):
+        counts = []
+        for size in (2, 12):
+            project_id = self._project(client, size)
+            response, queries = self._count_queries(
+                client, f'/api/new_requirements?project_id={project_id}&include=wricef_items,config_items')
+            data = response.get_json()
+            assert len(data) == size
+            assert all(len(r['wricef_items']) == 2 and len(r['config_items']) == 1 for r in data)
+            assert data[0]['wricef_items'][0]['requirement_id'] == data[0]['id']
+            counts.append(queries)
+        # requirements + wricef_items IN (...) + config_items IN (...)
+        assert counts == [3, 3]
+
+        _, plain = self._count_queries(client, f'/api/new_requirements?project_id={project_id}')
+        assert plain == 1
+
+    def test_nested_and_many_to_one_includes(self, client):
+        project_id = self._project(client, 3)
+        response, queries = self._count_queries(
+            client, f'/api/projects/{project_id}?include=requirements.wricef_items,config_items')
+        data = response.get_json()
+        assert [len(r['wricef_items']) for r in data['requirements']] == [2, 2, 2]
+        assert len(data['config_items']) == 3 and queries == 4
+
+        items = client.get(f'/api/wricef_items?project_id={project_id}&include=requirement,project'
+                           f'&fields=code').get_json()
+        assert {item['requirement']['code'] for item in items} == {'REQ-0', 'REQ-1', 'REQ-2'}
+        assert set(items[0]) == {'id', 'code', 'requirement', 'project'}
+        response = client.get(f'/api/new_requirements?project_id={project_id}&include=defects')
+        assert response.status_code == 400 and 'wricef_items' in response.get_json()['error']
@@ -0,0 +1,365 @@
+"""
+ProjektCoPilot — Traceability Matrix
+====================================
+Scenario → analysis_sessions → Analysis → Requirement → WRICEF / Config →
+TestCase → TestExecution → Defect zinciri UI'da onlarca istekle
+(/api/scenarios/<id>/analyses, /api/new_requirements, /api/wricef_items,
+/api/test_management ...) kuruluyordu.
+
+build() matrisi proje başına sabit sayıda set tabanlı sorguyla kurar
+(requirement + analiz/oturum/senaryo JOIN'i, WRICEF, config, test case,
+execution ve defect özetleri GROUP BY ile); birleştirme bellekte
+sözlüklerle yapılır, satır başına sorgu yoktur.
+
+- Satır = requirement × deliverable (WRICEF / config) × test case. Teslimatı
+  olmayan requirement, testi olmayan deliverable ve requirement'a bağlı
+  olmayan deliverable'lar da null alanlarla birer satırdır.
+- Execution / defect alanları test case başına özettir (sayı, passed /
+  failed, son execution durumu, açık defect); test_execution / defect
+  tabloları yoksa 0 / null döner ve özet `executions_tracked=false` olur.
+- GAPS kapsama sorularını satır filtresi olarak tanımlar
+  (ör. no_test_case: hiçbir test case'e ulaşmayan requirement'lar).
+- Önbellek: izlenen tablolardaki AFTER INSERT / UPDATE / DELETE
+  trigger'ları trace_versions(project_id, version) sayacını artırır
+  (counters.py ile aynı desen; ORM ve raw SQL yazmaları aynı şekilde
+  kapsanır). TraceCache her okumada bu sayacı tek PK okumasıyla kontrol
+  eder; sürüm değiştiyse matris yeniden kurulur.
+- Trigger'lar yalnızca mevcut tablolara kurulur; test_execution / defect
+  tablolarını oluşturan migration install()'ı yeniden çağırmalıdır.
+
+  GET /api/projects/<id>/traceability[?gap=no_test_case][&stream=ndjson][&fields=...]
+  GET /api/projects/<id>/traceability/summary
+
+CLI:
+  python traceability.py <project_id> [--gap no_test_case]
+"""
+
+import threading
+
+VERSION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS trace_versions (
+        project_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+_SESSION_PROJECT = '(SELECT project_id FROM analysis_sessions WHERE id = {r}.session_id)'
+_TEST_CASE_PROJECT = '(SELECT project_id FROM test_management WHERE id = {r}.test_case_id)'
+
+# (tablo, proje ifadesi); {r}: trigger'da NEW / OLD
+TRACED_TABLES = (
+    ('scenarios', '{r}.project_id'),
+    ('analysis_sessions', '{r}.project_id'),
+    ('analyses', _SESSION_PROJECT),
+    ('new_requirements', '{r}.project_id'),
+    ('wricef_items', '{r}.project_id'),
+    ('config_items', '{r}.project_id'),
+    ('test_management', '{r}.project_id'),
+    ('test_execution', _TEST_CASE_PROJECT),
+    ('defect', '{r}.project_id'),
+)
+
+_BUMP_SQL = '''
+    INSERT INTO trace_versions (project_id, version)
+    SELECT {project}, 1 WHERE {project} IS NOT NULL
+    ON CONFLICT (project_id) DO UPDATE SET version = version + 1;'''
+
+OPEN_DEFECT_EXCLUDED = ('Closed', 'Rejected', 'Verified')
+
+FIELDS = (
+    'scenario_id', 'scenario_code', 'scenario_name',
+    'session_id', 'session_name',
+    'analysis_id', 'analysis_title',
+    'requirement_id', 'requirement_code', 'requirement_title', 'classification', 'priority', 'requirement_status',
+    'item_type', 'item_id', 'item_code', 'item_title', 'item_status', 'item_open_defects',
+    'test_case_id', 'test_case_code', 'test_case_title', 'test_status',
+    'executions', 'passed', 'failed', 'last_execution_status', 'defects', 'open_defects',
+)
+
+# Kapsama soruları → satır filtresi
+GAPS = {
+    'no_deliverable': lambda row, covered: row['requirement_id'] is not None and row['item_id'] is None,
+    'no_test_case': lambda row, covered: row['requirement_id'] is not None and row['requirement_id'] not in covered,
+    'untested_item': lambda row, covered: row['item_id'] is not None and row['test_case_id'] is None,
+    'not_executed': lambda row, covered: row['test_case_id'] is not None and not row['executions'],
+    'failing': lambda row, covered: row['last_execution_status'] == 'Failed',
+    'open_defects': lambda row, covered: bool(row['open_defects'] or row['item_open_defects']),
+    'orphan_item': lambda row, covered: row['item_id'] is not None and row['requirement_id'] is None,
+}
+
+REQUIREMENTS_SQL = '''
+    SELECT r.id, r.code, r.title, r.classification, r.priority, r.status,
+           a.id, a.title, s.id, s.session_name, sc.id, sc.scenario_id, sc.name
+    FROM new_requirements r
+    LEFT JOIN analyses a ON a.id = r.analysis_id
+    LEFT JOIN analysis_sessions s ON s.id = COALESCE(a.session_id, r.session_id)
+    LEFT JOIN scenarios sc ON sc.id = s.scenario_id
+    WHERE r.project_id = ?
+    ORDER BY r.code, r.id
+'''
+
+ITEMS_SQL = '''
+    SELECT 'wricef', id, requirement_id, code, title, status FROM wricef_items WHERE project_id = ?
+    UNION ALL
+    SELECT 'config', id, requirement_id, code, title, status FROM config_items WHERE project_id = ?
+    ORDER BY 1 DESC, 4, 2
+'''
+
+TEST_CASES_SQL = '''
+    SELECT id, LOWER(source_type), source_id, code, title, status
+    FROM test_management
+    WHERE project_id = ? AND LOWER(source_type) IN ('wricef', 'config')
+    ORDER BY code, id
+'''
+
+# Test case başına execution özeti; son durum en büyük (execution_date, id) satırından
+EXECUTIONS_SQL = '''
+    SELECT e.test_case_id, COUNT(*),
+           SUM(e.status = 'Passed'), SUM(e.status = 'Failed'),
+           (SELECT l.status FROM test_execution l WHERE l.test_case_id = e.test_case_id
+            ORDER BY l.execution_date DESC, l.id DESC LIMIT 1)
+    FROM test_execution e
+    JOIN test_management tm ON tm.id = e.test_case_id
+    WHERE tm.project_id = ?
+    GROUP BY e.test_case_id
+'''
+
+_OPEN = f"d.status NOT IN ({', '.join(repr(status) for status in OPEN_DEFECT_EXCLUDED)})"
+
+TEST_DEFECTS_SQL = f'''
+    SELECT e.test_case_id, COUNT(*), SUM({_OPEN})
+    FROM defect d
+    JOIN test_execution e ON e.id = d.test_execution_id
+    WHERE d.project_id = ?
+    GROUP BY e.test_case_id
+'''
+
+ITEM_DEFECTS_SQL = f'''
+    SELECT d.wricef_id, SUM({_OPEN})
+    FROM defect d
+    WHERE d.project_id = ? AND d.wricef_id IS NOT NULL
+    GROUP BY d.wricef_id
+'''
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _bump(project, row):
+    return _BUMP_SQL.format(project=project.format(r=row))
+
+
+def install(conn):
+    """trace_versions + mevcut izlenen tablolar için trigger'lar; kurulan tablolar döner."""
+    conn.execute(VERSION_TABLE_SQL)
+    installed = []
+    for table, project in TRACED_TABLES:
+        if not _table_exists(conn, table):
+            continue
+        name = f'trg_trace_{table}'
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_ins AFTER INSERT ON {table} BEGIN"
+                     f"{_bump(project, 'NEW')}\nEND")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_del AFTER DELETE ON {table} BEGIN"
+                     f"{_bump(project, 'OLD')}\nEND")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_upd AFTER UPDATE ON {table} BEGIN"
+                     f"{_bump(project, 'OLD')}"
+                     f"{_bump(project, 'NEW')}\nEND")
+        installed.append(table)
+    return installed
+
+
+def read_version(conn, project_id):
+    row = conn.execute("SELECT version FROM trace_versions WHERE project_id = ?", (project_id,)).fetchone()
+    return row[0] if row else 0
+
+
+# ---------------------------------------------------------------------------
+# Matris
+# ---------------------------------------------------------------------------
+
+class Matrix:
+    """Bir projenin izlenebilirlik satırları + kapsama özeti (build() üretir)."""
+
+    def __init__(self, project_id, version, rows, executions_tracked):
+        self.project_id = project_id
+        self.version = version
+        self.rows = rows
+        self.executions_tracked = executions_tracked
+        self.covered = {row['requirement_id'] for row in rows
+                        if row['requirement_id'] is not None and row['test_case_id'] is not None}
+        self.summary = self._summarize()
+
+    def filter(self, gap=None):
+        if gap is None:
+            return iter(self.rows)
+        test = GAPS[gap]
+        return (row for row in self.rows if test(row, self.covered))
+
+    def _summarize(self):
+        requirements, delivered, items, tested_items, tests, executed = set(), set(), set(), set(), set(), set()
+        failing, open_defects = set(), 0
+        for row in self.rows:
+            if row['requirement_id'] is not None:
+                requirements.add(row['requirement_id'])
+                if row['item_id'] is not None:
+                    delivered.add(row['requirement_id'])
+            if row['item_id'] is not None:
+                items.add((row['item_type'], row['item_id']))
+                if row['test_case_id'] is not None:
+                    tested_items.add((row['item_type'], row['item_id']))
+            if row['test_case_id'] is not None and row['test_case_id'] not in tests:
+                tests.add(row['test_case_id'])
+                open_defects += row['open_defects'] or 0
+                if row['executions']:
+                    executed.add(row['test_case_id'])
+                if row['last_execution_status'] == 'Failed':
+                    failing.add(row['test_case_id'])
+
+        def pct(part, whole):
+            return round(100.0 * len(part) / len(whole), 1) if whole else 0.0
+
+        return {
+            'project_id': self.project_id,
+            'version': self.version,
+            'rows': len(self.rows),
+            'requirements': len(requirements),
+            'requirements_with_deliverable': len(delivered),
+            'requirements_with_test_case': len(self.covered),
+            'requirement_test_coverage_pct': pct(self.covered, requirements),
+            'deliverables': len(items),
+            'deliverables_with_test_case': len(tested_items),
+            'test_cases': len(tests),
+            'test_cases_executed': len(executed),
+            'test_cases_failing': len(failing),
+            'open_defects': open_defects,
+            'executions_tracked': self.executions_tracked,
+            'gaps': {gap: sum(1 for _ in self.filter(gap)) for gap in GAPS},
+        }
+
+
+def _empty_row():
+    return dict.fromkeys(FIELDS)
+
+
+def build(conn, project_id):
+    """Matrisi kurar: 4 sorgu + (tablolar varsa) 3 özet sorgusu."""
+    version = read_version(conn, project_id)
+    executions_tracked = _table_exists(conn, 'test_execution')
+    defects_tracked = executions_tracked and _table_exists(conn, 'defect')
+
+    executions = {}
+    test_defects, item_defects = {}, {}
+    if executions_tracked:
+        executions = {row[0]: row[1:] for row in conn.execute(EXECUTIONS_SQL, (project_id,)).fetchall()}
+    if defects_tracked:
+        test_defects = {row[0]: row[1:] for row in conn.execute(TEST_DEFECTS_SQL, (project_id,)).fetchall()}
+        item_defects = {row[0]: row[1] for row in conn.execute(ITEM_DEFECTS_SQL, (project_id,)).fetchall()}
+
+    tests_by_item = {}
+    for test_id, source_type, source_id, code, title, status in conn.execute(TEST_CASES_SQL,
+                                                                             (project_id,)).fetchall():
+        count, passed, failed, last_status = executions.get(test_id, (0, 0, 0, None))
+        defects, open_defects = test_defects.get(test_id, (0, 0))
+        tests_by_item.setdefault((source_type, source_id), []).append({
+            'test_case_id': test_id, 'test_case_code': code, 'test_case_title': title, 'test_status': status,
+            'executions': count, 'passed': passed or 0, 'failed': failed or 0,
+            'last_execution_status': last_status, 'defects': defects, 'open_defects': open_defects or 0,
+        })
+
+    items_by_requirement = {}
+    for item_type, item_id, requirement_id, code, title, status in conn.execute(
+            ITEMS_SQL, (project_id, project_id)).fetchall():
+        items_by_requirement.setdefault(requirement_id, []).append({
+            'item_type': item_type, 'item_id': item_id, 'item_code': code, 'item_title': title,
+            'item_status': status,
+            'item_open_defects': (item_defects.get(item_id) or 0) if item_type == 'wricef' else 0,
+        })
+
+    rows = []
+
+    def expand(base, items):
+        if not items:
+            rows.append(base)
+            return
+        for item in items:
+            tests = tests_by_item.get((item['item_type'], item['item_id']))
+            if not tests:
+                rows.append(dict(base, **item))
+                continue
+            for test in tests:
+                rows.append(dict(base, **item, **test))
+
+    for (requirement_id, code, title, classification, priority, status, analysis_id, analysis_title,
+         session_id, session_name, scenario_id, scenario_code, scenario_name) in conn.execute(
+            REQUIREMENTS_SQL, (project_id,)).fetchall():
+        base = _empty_row()
+        base.update(scenario_id=scenario_id, scenario_code=scenario_code, scenario_name=scenario_name,
+                    session_id=session_id, session_name=session_name,
+                    analysis_id=analysis_id, analysis_title=analysis_title,
+                    requirement_id=requirement_id, requirement_code=code, requirement_title=title,
+                    classification=classification, priority=priority, requirement_status=status)
+        expand(base, items_by_requirement.pop(requirement_id, None))
+    # requirement'ı olmayan (veya başka projedeki requirement'a bağlı) deliverable'lar
+    for items in items_by_requirement.values():
+        expand(_empty_row(), items)
+    return Matrix(project_id, version, rows, executions_tracked)
+
+
+class TraceCache:
+    """project_id → Matrix; her get()'te trace_versions ile doğrulanır."""
+
+    def __init__(self, max_projects=32):
+        self.max_projects = max_projects
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conn, project_id):
+        version = read_version(conn, project_id)
+        with self._lock:
+            matrix = self._entries.get(project_id)
+            if matrix is not None and matrix.version == version:
+                self.hits += 1
+                return matrix
+            self.misses += 1
+        matrix = build(conn, project_id)
+        with self._lock:
+            self._entries.pop(project_id, None)
+            while len(self._entries) >= self.max_projects:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[project_id] = matrix
+        return matrix
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+if __name__ == '__main__':
+    import argparse
+    import csv
+    import os
+    import sqlite3
+    import sys
+
+    parser = argparse.ArgumentParser(description='Print a project traceability matrix as CSV')
+    parser.add_argument('project_id', type=int)
+    parser.add_argument('--gap', choices=GAPS)
+    args = parser.parse_args()
+
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    matrix = build(conn, args.project_id)
+    conn.close()
+    writer = csv.DictWriter(sys.stdout, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(matrix.filter(args.gap))
+    print(f"# {matrix.summary}", file=sys.stderr)
@@ -0,0 +1,305 @@
+"""
+ProjektCoPilot — Vector Similarity Index
+========================================
+ai_embedding.embedding_vector JSON olarak saklanıyor; her aramada JSON'u
+çözüp Python'da taramak ölçeklenmez. Bu modül entity_type başına tüm
+vektörleri L2-normalize edilmiş, bitişik bir float32 matriste tutar:
+
+  <directory>/<entity_type>.f32        (n, dim) matris — np.memmap
+  <directory>/<entity_type>.meta.npz   satır → ai_embedding.id, entity_id,
+                                       content_hash, project_id, valid
+
+- Bir entity'nin geçerli vektörü en büyük ai_embedding.id'li satırıdır
+  (content_hash değişince yeni satır eklenir).
+- sync() yalnızca değişen satırların vektörünü okur (embedding_blob; yoksa JSON): yeni entity'ler
+  matrisin sonuna eklenir, hash'i değişenler yerinde güncellenir,
+  silinenler işaretlenir (tombstone) ve oranları COMPACT_RATIO'yu geçince
+  dosya sıkıştırılır.
+- Sorgu öncesi (COUNT(*), MAX(id)) imzası kontrol edilir; değişmemişse
+  veritabanına başka sorgu gitmez.
+- project_id, ai_embedding.metadata içindeki "project_id" alanından okunur.
+- entity_types verilirse yalnızca o türler için index açılır; tür adı
+  dosya adına girdiğinden istemciden gelen değer buradan geçmelidir.
+
+Sorgu: normalize vektörlerle matris @ q (cosine), argpartition ile top-k.
+
+  GET /api/ai/similar?entity_type=defect&entity_id=12&k=10[&project_id=3]
+
+CLI:
+  python vector_index.py sync [entity_type ...]   # index'i diskte güncelle
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from embeddings import load_vector
+
+DTYPE = np.float32
+COMPACT_RATIO = 0.25
+FETCH_CHUNK = 500
+NO_PROJECT = -1
+
+SIGNATURE_SQL = "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM ai_embedding WHERE entity_type = ?"
+ROWS_SQL = '''
+    SELECT id, entity_id, content_hash, json_extract(metadata, '$.project_id')
+    FROM ai_embedding
+    WHERE entity_type = ?
+    ORDER BY id
+'''
+
+
+def normalize(vectors):
+    """Satırları birim uzunluğa getirir (sıfır vektörler sıfır kalır)."""
+    vectors = np.asarray(vectors, dtype=DTYPE)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class TypeIndex:
+    """Tek bir entity_type'ın matrisi ve satır meta verisi."""
+
+    def __init__(self, directory, entity_type):
+        self.entity_type = entity_type
+        self.vectors_path = os.path.join(directory, f'{entity_type}.f32')
+        self.meta_path = os.path.join(directory, f'{entity_type}.meta.npz')
+        self.lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    # -- kalıcılık ----------------------------------------------------------
+
+    def _reset(self):
+        self.dim = 0
+        self.signature = (0, 0)
+        self.vectors = None
+        self.row_ids = np.zeros(0, dtype=np.int64)
+        self.entity_ids = np.zeros(0, dtype=np.int64)
+        self.project_ids = np.zeros(0, dtype=np.int64)
+        self.valid = np.zeros(0, dtype=bool)
+        self.hashes = np.zeros(0, dtype='U64')
+        self._positions = {}
+
+    def _load(self):
+        if not os.path.exists(self.meta_path) or not os.path.exists(self.vectors_path):
+            return
+        with np.load(self.meta_path) as meta:
+            self.dim = int(meta['dim'])
+            self.signature = tuple(int(v) for v in meta['signature'])
+            self.row_ids = meta['row_ids']
+            self.entity_ids = meta['entity_ids']
+            self.project_ids = meta['project_ids']
+            self.valid = meta['valid']
+            self.hashes = meta['hashes']
+        expected = len(self.row_ids) * self.dim * np.dtype(DTYPE).itemsize
+        if os.path.getsize(self.vectors_path) != expected:
+            # Yarım kalmış yazma: boş index ile başla, ilk sync sıfırdan kurar
+            self._reset()
+            return
+        self._open()
+        self._reindex()
+
+    def _save(self):
+        if self.vectors is not None:
+            self.vectors.flush()
+        tmp = self.meta_path + '.tmp.npz'
+        np.savez(tmp, dim=self.dim, signature=np.array(self.signature), row_ids=self.row_ids,
+                 entity_ids=self.entity_ids, project_ids=self.project_ids, valid=self.valid,
+                 hashes=self.hashes)
+        os.replace(tmp, self.meta_path)
+
+    def _open(self):
+        self.vectors = None
+        if len(self.row_ids):
+            self.vectors = np.memmap(self.vectors_path, dtype=DTYPE, mode='r+', shape=(len(self.row_ids), self.dim))
+
+    def _reindex(self):
+        self._positions = {int(e): i for i, e in enumerate(self.entity_ids) if self.valid[i]}
+
+    # -- senkronizasyon -----------------------------------------------------
+
+    def sync(self, conn, force=False):
+        """Index'i ai_embedding ile eşitler; {"added", "updated", "removed", "skipped", "compacted"}."""
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'skipped': 0, 'compacted': False}
+        signature = tuple(conn.execute(SIGNATURE_SQL, (self.entity_type,)).fetchone())
+        if signature == self.signature and not force:
+            return stats
+
+        latest = {}
+        for row_id, entity_id, content_hash, project_id in conn.execute(ROWS_SQL, (self.entity_type,)).fetchall():
+            latest[entity_id] = (row_id, content_hash, NO_PROJECT if project_id is None else int(project_id))
+
+        changed = [entity_id for entity_id, (row_id, _, _) in latest.items()
+                   if entity_id not in self._positions
+                   or self.row_ids[self._positions[entity_id]] != row_id]
+        removed = [entity_id for entity_id in self._positions if entity_id not in latest]
+
+        vectors = self._fetch(conn, [latest[entity_id][0] for entity_id in changed])
+        appended = []
+        for entity_id in changed:
+            row_id, content_hash, project_id = latest[entity_id]
+            vector = vectors.get(row_id)
+            if vector is None or (self.dim and len(vector) != self.dim):
+                stats['skipped'] += 1
+                continue
+            self.dim = self.dim or len(vector)
+            position = self._positions.get(entity_id)
+            if position is None:
+                appended.append((row_id, entity_id, content_hash, project_id, vector))
+                stats['added'] += 1
+            else:
+                self.vectors[position] = normalize(vector)
+                self.row_ids[position] = row_id
+                self.hashes[position] = content_hash
+                self.project_ids[position] = project_id
+                stats['updated'] += 1
+
+        for entity_id in removed:
+            position = self._positions[entity_id]
+            self.valid[position] = False
+            self.vectors[position] = 0
+            stats['removed'] += 1
+
+        if appended:
+            self._append(appended)
+        if len(self.valid) and (~self.valid).sum() > COMPACT_RATIO * len(self.valid):
+            self._compact()
+            stats['compacted'] = True
+        self.signature = signature
+        self._reindex()
+        self._save()
+        return stats
+
+    def _fetch(self, conn, row_ids):
+        vectors = {}
+        for start in range(0, len(row_ids), FETCH_CHUNK):
+            chunk = row_ids[start:start + FETCH_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            for row_id, blob, metadata, json_vector in conn.execute(
+                    f"SELECT id, embedding_blob, metadata, embedding_vector FROM ai_embedding WHERE id IN ({placeholders})",
+                    chunk).fetchall():
+                vectors[row_id] = load_vector(blob, metadata, json_vector)
+        return vectors
+
+    def _append(self, rows):
+        block = normalize([row[4] for row in rows])
+        if self.vectors is not None:
+            self.vectors.flush()
+        mode = 'ab' if len(self.row_ids) else 'wb'
+        with open(self.vectors_path, mode) as f:
+            f.write(block.tobytes())
+        self.row_ids = np.concatenate([self.row_ids, np.array([r[0] for r in rows], dtype=np.int64)])
+        self.entity_ids = np.concatenate([self.entity_ids, np.array([r[1] for r in rows], dtype=np.int64)])
+        self.hashes = np.concatenate([self.hashes, np.array([r[2] for r in rows], dtype='U64')])
+        self.project_ids = np.concatenate([self.project_ids, np.array([r[3] for r in rows], dtype=np.int64)])
+        self.valid = np.concatenate([self.valid, np.ones(len(rows), dtype=bool)])
+        self._open()
+
+    def _compact(self):
+        keep = self.valid
+        block = np.array(self.vectors[keep]) if self.vectors is not None else np.zeros((0, self.dim), DTYPE)
+        self.vectors = None
+        tmp = self.vectors_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(block.tobytes())
+        os.replace(tmp, self.vectors_path)
+        self.row_ids, self.entity_ids = self.row_ids[keep], self.entity_ids[keep]
+        self.hashes, self.project_ids = self.hashes[keep], self.project_ids[keep]
+        self.valid = self.valid[keep]
+        self._open()
+
+    # -- sorgu --------------------------------------------------------------
+
+    def search(self, vector, k=10, project_id=None, exclude_entity_id=None):
+        """[(entity_id, score)] cosine benzerliğine göre azalan."""
+        if self.vectors is None or k <= 0:
+            return []
+        scores = np.asarray(self.vectors @ normalize(vector))
+        mask = ~self.valid
+        if project_id is not None:
+            mask |= self.project_ids != project_id
+        if exclude_entity_id is not None and exclude_entity_id in self._positions:
+            mask[self._positions[exclude_entity_id]] = True
+        scores[mask] = -np.inf
+        candidates = int((~mask).sum())
+        k = min(k, candidates)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.entity_ids[i]), float(scores[i])) for i in top]
+
+    def vector_of(self, entity_id):
+        position = self._positions.get(entity_id)
+        return None if position is None else np.array(self.vectors[position])
+
+    def stats(self):
+        return {'entity_type': self.entity_type, 'dim': self.dim, 'rows': int(len(self.valid)),
+                'live': int(self.valid.sum()), 'signature': list(self.signature)}
+
+
+class VectorIndex:
+    """entity_type → TypeIndex; sorgular okumadan önce sync eder."""
+
+    def __init__(self, directory, entity_types=None):
+        self.directory = directory
+        self.entity_types = None if entity_types is None else frozenset(entity_types)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, entity_type):
+        if self.entity_types is not None and entity_type not in self.entity_types:
+            raise ValueError(f"Unknown entity_type '{entity_type}'")
+        with self._lock:
+            if entity_type not in self._indexes:
+                os.makedirs(self.directory, exist_ok=True)
+                self._indexes[entity_type] = TypeIndex(self.directory, entity_type)
+            return self._indexes[entity_type]
+
+    def sync(self, conn, entity_type, force=False):
+        index = self.index(entity_type)
+        with index.lock:
+            return index.sync(conn, force=force)
+
+    def similar(self, conn, entity_type, entity_id, k=10, project_id=None):
+        """entity'nin güncel vektörüne en yakın k entity; embedding'i yoksa None."""
+        index = self.index(entity_type)
+        with index.lock:
+            index.sync(conn)
+            vector = index.vector_of(entity_id)
+            if vector is None:
+                return None
+            return index.search(vector, k, project_id=project_id, exclude_entity_id=entity_id)
+
+    def search(self, conn, entity_type, vector, k=10, project_id=None):
+        index = self.index(entity_type)
+        with index.lock:
+            index.sync(conn)
+            return index.search(vector, k, project_id=project_id)
+
+    def stats(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return [index.stats() for index in indexes]
+
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vector_index')
+
+
+if __name__ == '__main__':
+    import sqlite3
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'sync':
+        print("Usage: python vector_index.py sync [entity_type ...]")
+        sys.exit(1)
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project_copilot.db')
+    conn = sqlite3.connect(db_path)
+    entity_types = sys.argv[2:] or [row[0] for row in conn.execute(
+        "SELECT DISTINCT entity_type FROM ai_embedding").fetchall()]
+    vector_index = VectorIndex(os.environ.get('VECTOR_INDEX_DIR', DEFAULT_DIR))
+    for entity_type in entity_types:
+        print(f"✓ {entity_type}: {vector_index.sync(conn, entity_type)}")
+    conn.close()